@@ -0,0 +1,119 @@
+"""
+Benchmark backend inferensi deteksi (PyTorch, ONNX Runtime, OpenVINO) pada gambar JagaPadi.
+
+Setiap backend diekspor sekali (artefak di-cache di samping model_hama.pt), dipanaskan,
+lalu dijalankan satu per satu pada gambar yang sama. Latensi per gambar dilaporkan
+bersama kecocokan label dan confidence terhadap backend PyTorch sebagai acuan.
+
+Contoh:
+    python benchmark_backend.py --folder original_images --backend pytorch onnx openvino
+"""
+import sys
+import time
+import argparse
+
+import deteksi
+from utils.alat_ukur import persentil, muat_gambar
+
+TOLERANSI_CONF = 0.05   # Selisih confidence maksimum agar deteksi dianggap sama
+IOU_MIN = 0.5           # IoU minimum antara kotak acuan dan kotak backend
+
+def ringkas_hasil(result):
+    """list (kelas, confidence, kotak xyxy) dari satu hasil YOLO"""
+    boxes = result.boxes
+    return list(zip([int(c) for c in boxes.cls.tolist()], boxes.conf.tolist(), boxes.xyxy.tolist()))
+
+def iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    irisan = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    gabungan = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - irisan
+    return irisan / gabungan if gabungan > 0 else 0.0
+
+def bandingkan(acuan, kandidat):
+    """
+    Cocokkan deteksi kandidat dengan acuan (kelas sama, IoU >= IOU_MIN).
+    Returns:
+        tuple: (semua cocok dalam toleransi, selisih confidence terbesar)
+    """
+    sisa = list(kandidat)
+    selisih_maks = 0.0
+    cocok = len(acuan) == len(kandidat)
+    for kelas, conf, kotak in acuan:
+        pasangan = [d for d in sisa if d[0] == kelas and iou(kotak, d[2]) >= IOU_MIN]
+        if not pasangan:
+            cocok = False
+            continue
+        terbaik = max(pasangan, key=lambda d: iou(kotak, d[2]))
+        sisa.remove(terbaik)
+        selisih = abs(conf - terbaik[1])
+        selisih_maks = max(selisih_maks, selisih)
+        if selisih > TOLERANSI_CONF:
+            cocok = False
+    return cocok, selisih_maks
+
+def jalankan_backend(backend, gambar, pemanasan):
+    mulai = time.time()
+    yolo = deteksi.buat_model(backend)
+    waktu_muat = time.time() - mulai
+
+    for _ in range(pemanasan):
+        deteksi.prediksi(yolo, gambar[0][1])
+
+    latensi = []
+    hasil = []
+    for _, data in gambar:
+        mulai = time.perf_counter()
+        result = deteksi.prediksi(yolo, data)[0]
+        latensi.append(time.perf_counter() - mulai)
+        hasil.append(ringkas_hasil(result))
+    return waktu_muat, latensi, hasil
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend inferensi JagaPadi")
+    parser.add_argument('--folder', default='original_images', help="Folder gambar uji")
+    parser.add_argument('--jumlah', type=int, default=50, help="Jumlah gambar maksimum")
+    parser.add_argument('--backend', nargs='+', default=['pytorch', 'onnx', 'openvino'],
+                        choices=['pytorch'] + list(deteksi.BACKEND_EKSPOR))
+    parser.add_argument('--pemanasan', type=int, default=3, help="Inferensi pemanasan per backend")
+    parser.add_argument('--kalibrasi', default=deteksi.DATA_KALIBRASI_INT8,
+                        help="YAML dataset kalibrasi untuk backend openvino_int8")
+    args = parser.parse_args()
+    deteksi.DATA_KALIBRASI_INT8 = args.kalibrasi
+
+    gambar = muat_gambar(args.folder, args.jumlah, deteksi.dekode_gambar)
+    if not gambar:
+        print(f"[!] Tidak ada gambar di {args.folder}")
+        sys.exit(1)
+    print(f"[+] {len(gambar)} gambar dari {args.folder}, imgsz {deteksi.UKURAN_INPUT_MODEL}")
+
+    # PyTorch selalu dijalankan pertama sebagai acuan kecocokan dan speedup
+    urutan = ['pytorch'] + [b for b in args.backend if b != 'pytorch']
+    laporan = {}
+    acuan = None
+    for backend in urutan:
+        print(f"[+] Menjalankan backend {backend}...")
+        waktu_muat, latensi, hasil = jalankan_backend(backend, gambar, args.pemanasan)
+        if acuan is None:
+            acuan = hasil
+        perbandingan = [bandingkan(a, h) for a, h in zip(acuan, hasil)]
+        laporan[backend] = {
+            'muat': waktu_muat,
+            'rata': sum(latensi) / len(latensi),
+            'p50': persentil(latensi, 0.50),
+            'p95': persentil(latensi, 0.95),
+            'cocok': sum(1 for c, _ in perbandingan if c) / len(perbandingan) * 100,
+            'selisih_conf': max(s for _, s in perbandingan)
+        }
+
+    rata_acuan = laporan['pytorch']['rata']
+    print()
+    print(f"{'Backend':<15} {'Muat':>8} {'Rata':>9} {'p50':>9} {'p95':>9} {'Speedup':>8} {'Cocok':>7} {'Δconf':>7}")
+    print("-" * 80)
+    for backend, r in laporan.items():
+        print(f"{backend:<15} {r['muat']:>7.2f}s {r['rata'] * 1000:>7.1f}ms {r['p50'] * 1000:>7.1f}ms "
+              f"{r['p95'] * 1000:>7.1f}ms {rata_acuan / r['rata']:>7.2f}x {r['cocok']:>6.1f}% {r['selisih_conf']:>7.3f}")
+    print(f"\nCocok = label sama, IoU >= {IOU_MIN} dan selisih confidence <= {TOLERANSI_CONF} terhadap PyTorch")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+"""
+Micro-benchmark jalur panas JagaPadi: enkripsi/dekripsi AES-CTR, encoding base64 clipper,
+framing protokol (v1/v2) lewat socket lokal, logger session (TXT/CSV/database),
+penyimpanan history client dan pembaca statistik di utils/logger.py.
+
+Hasil disimpan sebagai JSON bersama info lingkungan. Mode --bandingkan membandingkan
+median setiap kasus dengan file hasil sebelumnya dan menandai regresi yang melebihi ambang.
+
+Contoh:
+    python benchmark_mikro.py --output bench_sebelum.json
+    python benchmark_mikro.py --output bench_sesudah.json --bandingkan bench_sebelum.json
+    python benchmark_mikro.py --filter aes --ulang 20
+"""
+import os
+import sys
+import json
+import time
+import base64
+import shutil
+import socket
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+from datetime import datetime, timedelta
+
+from aes_enkripsi import encrypt_AES_CTR, KEY
+from aes_deskripsi import decrypt_AES_CTR
+from utils.transport import FRAME_V2, HEADER_V1, PANJANG, terima_tepat, kirim_bagian, kirim_frame
+from utils.alat_ukur import log
+
+# Ukuran payload gambar yang diuji (50 KB sampai 10 MB)
+UKURAN_PAYLOAD = [50 * 1024, 500 * 1024, 2 * 1024 * 1024, 10 * 1024 * 1024]
+# Jumlah file per session untuk benchmark logger
+JUMLAH_FILE_SESI = [100, 1000, 5000]
+# Jumlah baris database untuk benchmark pembaca statistik
+JUMLAH_BARIS_DB = 20000
+ULANG_DEFAULT = 10
+AMBANG_REGRESI = 0.10   # Median lebih lambat dari 10% dianggap regresi
+
+def label_ukuran(ukuran):
+    if ukuran >= 1024 * 1024:
+        return f"{ukuran // (1024 * 1024)}MB"
+    return f"{ukuran // 1024}KB"
+
+def ukur(fungsi, ulang):
+    """Jalankan fungsi sekali untuk pemanasan lalu `ulang` kali; kembalikan list durasi (detik)"""
+    fungsi()
+    durasi = []
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        fungsi()
+        durasi.append(time.perf_counter() - mulai)
+    return durasi
+
+def contoh_file_log(i):
+    return {
+        'filename': f"IMG_{i:06d}.jpg",
+        'labels': ['wereng_coklat', 'walang_sangit'] if i % 3 else [],
+        'size_ori': 2048.5, 'size_enc': 312.25,
+        'waktu_terima': 0.0123, 'waktu_deteksi': 0.2345, 'waktu_antri': 0.0101,
+        'waktu_enkripsi': 0.0012, 'waktu_kirim': 0.0034,
+        'kecepatan_terima': 16654.1, 'kecepatan_kirim': 91838.2,
+        'confidence': 0.871, 'cache_hit': i % 5 == 0,
+        'waktu_dekripsi_client': 0.0021, 'ukuran_hasil_client_kb': 312.0, 'waktu_simpan_client': 0.0043
+    }
+
+# === Kasus benchmark: setiap fungsi mengembalikan list (nama, callable, byte per panggilan) ===
+
+def kasus_aes():
+    kasus = []
+    for ukuran in UKURAN_PAYLOAD:
+        data = os.urandom(ukuran)
+        ciphertext, nonce = encrypt_AES_CTR(data)
+        kasus.append((f"aes_enkripsi/{label_ukuran(ukuran)}", lambda d=data: encrypt_AES_CTR(d), ukuran))
+        kasus.append((f"aes_dekripsi/{label_ukuran(ukuran)}",
+                      lambda c=ciphertext, n=nonce: decrypt_AES_CTR(c, n, KEY), ukuran))
+    return kasus
+
+def kasus_clipper():
+    kasus = []
+    for ukuran in UKURAN_PAYLOAD:
+        ciphertext, nonce = encrypt_AES_CTR(os.urandom(ukuran))
+        # Sama dengan encoding di server.simpan_clipper (tanpa menulis file)
+        kasus.append((f"clipper_base64/{label_ukuran(ukuran)}",
+                      lambda c=ciphertext, n=nonce: base64.b64encode(bytes(n) + bytes(c)).decode(), ukuran))
+    return kasus
+
+class _PasanganSocket:
+    """Socket lokal dengan thread penerima; kirim() mengembalikan setelah semua byte diterima"""
+
+    def __init__(self, penerima):
+        self.kirim_sock, self.terima_sock = socket.socketpair()
+        self.penerima = penerima
+        self.selesai = threading.Semaphore(0)
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def _loop(self):
+        try:
+            while True:
+                self.penerima(self.terima_sock)
+                self.selesai.release()
+        except (ConnectionError, OSError):
+            pass
+
+def _terima_v1(sock):
+    panjang_nama, panjang_data = HEADER_V1.unpack(terima_tepat(sock, HEADER_V1.size))
+    terima_tepat(sock, panjang_nama)
+    terima_tepat(sock, panjang_data)
+
+def _terima_v2(sock):
+    _, _, panjang = FRAME_V2.unpack(terima_tepat(sock, FRAME_V2.size))
+    terima_tepat(sock, panjang)
+
+def kasus_framing():
+    kasus = []
+    nama = b"IMG_20240101_120000.jpg"
+    v1 = _PasanganSocket(_terima_v1)
+    v2 = _PasanganSocket(_terima_v2)
+
+    def kirim_v1(data):
+        kirim_bagian(v1.kirim_sock, HEADER_V1.pack(len(nama), len(data)), nama, data)
+        v1.selesai.acquire()
+
+    def kirim_v2(data):
+        kirim_frame(v2.kirim_sock, b'FILE', 1, PANJANG.pack(len(nama)), nama, data)
+        v2.selesai.acquire()
+
+    for ukuran in UKURAN_PAYLOAD:
+        data = os.urandom(ukuran)
+        kasus.append((f"framing_v1/{label_ukuran(ukuran)}", lambda d=data: kirim_v1(d), ukuran))
+        kasus.append((f"framing_v2/{label_ukuran(ukuran)}", lambda d=data: kirim_v2(d), ukuran))
+    return kasus
+
+def kasus_logger():
+    from utils import logger
+    kasus = []
+    for jumlah in JUMLAH_FILE_SESI:
+        log_data = {
+            'ip': '192.168.1.50',
+            'connect_time': datetime.now() - timedelta(minutes=5),
+            'file_logs': [contoh_file_log(i) for i in range(jumlah)]
+        }
+        kasus.append((f"tulis_log_txt/{jumlah}_file",
+                       lambda d=log_data: logger.tulis_log_txt(d, datetime.now(), 300.0), None))
+        kasus.append((f"tulis_log_csv/{jumlah}_file", lambda d=log_data: logger.tulis_log_csv(d), None))
+    return kasus
+
+def kasus_pembaca():
+    from utils import logger, database_deteksi
+    # Isi database dengan riwayat beberapa hari; hanya sebagian yang jatuh pada hari ini
+    rows = []
+    for i in range(JUMLAH_BARIS_DB):
+        row = logger._baris_csv(f"192.168.1.{i % 20}", contoh_file_log(i))
+        row['timestamp'] = (datetime.now() - timedelta(days=i % 7)).strftime('%Y-%m-%d %H:%M:%S')
+        rows.append(row)
+    database_deteksi.simpan_baris(rows, "logs")
+    agregat = logger.ambil_agregat("logs")
+    for i in range(JUMLAH_BARIS_DB // 7):
+        agregat.tambah(f"192.168.1.{i % 20}", contoh_file_log(i))
+
+    return [
+        ("baca_statistik_hari_ini/agregat", logger.baca_statistik_hari_ini, None),
+        ("baca_statistik_hari_ini/db", logger._baca_statistik_hari_ini_db, None),
+        ("baca_analisis_performa_client/agregat", logger.baca_analisis_performa_client, None),
+        ("baca_analisis_performa_client/db", logger._baca_analisis_performa_client_db, None),
+        ("buat_log_summary_harian", logger.buat_log_summary_harian, None),
+    ]
+
+def kasus_history():
+    try:
+        import client
+    except ImportError as e:
+        log(f"[!] Benchmark history dilewati (client.py tidak bisa diimpor: {e})")
+        return []
+    from pathlib import Path
+    client.FOLDER_HISTORY = Path(os.getcwd()) / "cache_history"
+    client.FOLDER_HISTORY.mkdir(exist_ok=True)
+    klien = client.JagaPadiClient()
+    timing = {'filename': 'IMG_000001.jpg', 'ukuran_asli_kb': 2048.5, 'ukuran_hasil_kb': 312.0,
+              'waktu_kirim': 0.1, 'waktu_terima': 0.3, 'waktu_dekripsi': 0.002, 'waktu_simpan': 0.004}
+    # Penuhi history sampai retensi agar setiap panggilan mengukur kasus terburuk (ring buffer penuh)
+    for i in range(client.RIWAYAT_RETENSI + 10):
+        klien._save_history(f"IMG_{i:06d}.jpg", f"{i:032x}.jpg", timing)
+    return [("save_history/penuh",
+             lambda: klien._save_history("IMG_999999.jpg", f"{999999:032x}.jpg", timing), None),
+            ("get_history/halaman", klien.get_history, None)]
+
+# (awalan nama kasus, pembangun): --filter disaring per grup lewat awalan sebelum pembangun
+# dipanggil, karena persiapan grup (database, client.py, history) mahal dan punya efek samping
+GRUP_KASUS = [
+    (('aes_enkripsi', 'aes_dekripsi'), kasus_aes),
+    (('clipper_base64',), kasus_clipper),
+    (('framing_v1', 'framing_v2'), kasus_framing),
+    (('tulis_log_txt', 'tulis_log_csv'), kasus_logger),
+    (('baca_statistik_hari_ini', 'baca_analisis_performa_client', 'buat_log_summary_harian'), kasus_pembaca),
+    (('save_history', 'get_history'), kasus_history),
+]
+
+def grup_cocok(awalan, filter_nama):
+    """Grup mungkin berisi kasus yang namanya (awalan/sufiks) mengandung filter_nama"""
+    if not filter_nama:
+        return True
+    if '/' in filter_nama:
+        # Teks sebelum '/' harus menjadi ujung awalan, misalnya "enkripsi/50KB" -> aes_enkripsi
+        kepala = filter_nama.split('/', 1)[0]
+        return any(a.endswith(kepala) for a in awalan)
+    return any(filter_nama in a for a in awalan)
+
+def info_lingkungan():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    try:
+        import Crypto
+        versi_crypto = Crypto.__version__
+    except (ImportError, AttributeError):
+        versi_crypto = ""
+    return {
+        'waktu': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'host': platform.node(),
+        'platform': platform.platform(),
+        'mesin': platform.machine(),
+        'prosesor': platform.processor(),
+        'cpu': os.cpu_count(),
+        'python': platform.python_version(),
+        'pycryptodome': versi_crypto,
+        'commit': commit
+    }
+
+def jalankan(filter_nama, ulang):
+    hasil = {}
+    for awalan, grup in GRUP_KASUS:
+        if not grup_cocok(awalan, filter_nama):
+            continue
+        for nama, fungsi, byte in grup():
+            if filter_nama and filter_nama not in nama:
+                continue
+            durasi = ukur(fungsi, ulang)
+            median = statistics.median(durasi)
+            hasil[nama] = {
+                'ulang': ulang,
+                'median': median,
+                'min': min(durasi),
+                'rata': statistics.mean(durasi),
+                'std': statistics.pstdev(durasi),
+                'mb_per_detik': round(byte / median / 1024 / 1024, 2) if byte and median else None
+            }
+            kecepatan = f" {hasil[nama]['mb_per_detik']:>9.1f} MB/s" if hasil[nama]['mb_per_detik'] else ""
+            log(f"{nama:<42} median {median * 1000:>10.3f} ms  min {min(durasi) * 1000:>10.3f} ms{kecepatan}")
+    return hasil
+
+def bandingkan(hasil, path_acuan, ambang):
+    """Bandingkan median dengan file acuan. Kembalikan list nama kasus yang mengalami regresi"""
+    with open(path_acuan, 'r', encoding='utf-8') as f:
+        acuan = json.load(f)['hasil']
+
+    regresi = []
+    log(f"\n{'Kasus':<42} {'Acuan':>11} {'Sekarang':>11} {'Perubahan':>10}")
+    log("-" * 78)
+    for nama, data in hasil.items():
+        if nama not in acuan:
+            log(f"{nama:<42} {'-':>11} {data['median'] * 1000:>9.3f}ms {'baru':>10}")
+            continue
+        lama = acuan[nama]['median']
+        perubahan = (data['median'] - lama) / lama if lama else 0.0
+        tanda = ""
+        if perubahan > ambang:
+            tanda = "  << REGRESI"
+            regresi.append(nama)
+        log(f"{nama:<42} {lama * 1000:>9.3f}ms {data['median'] * 1000:>9.3f}ms {perubahan * 100:>+9.1f}%{tanda}")
+    log(f"\n{len(regresi)} regresi di atas {ambang * 100:.0f}%")
+    return regresi
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark jalur panas JagaPadi")
+    parser.add_argument('--output', help="Simpan hasil JSON ke file ini")
+    parser.add_argument('--bandingkan', help="File hasil sebelumnya untuk deteksi regresi")
+    parser.add_argument('--ambang', type=float, default=AMBANG_REGRESI, help="Ambang regresi (0.1 = 10%%)")
+    parser.add_argument('--ulang', type=int, default=ULANG_DEFAULT, help="Pengulangan per kasus")
+    parser.add_argument('--filter', help="Hanya jalankan kasus yang namanya mengandung teks ini")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    acuan = os.path.abspath(args.bandingkan) if args.bandingkan else None
+
+    # Logger dan history menulis ke folder relatif (logs/, cache_history/): jalankan di folder sementara
+    folder_kerja = tempfile.mkdtemp(prefix="jagapadi_bench_")
+    folder_awal = os.getcwd()
+    os.chdir(folder_kerja)
+    os.makedirs("logs", exist_ok=True)
+    try:
+        hasil = jalankan(args.filter, args.ulang)
+    finally:
+        os.chdir(folder_awal)
+        shutil.rmtree(folder_kerja, ignore_errors=True)
+
+    laporan = {'lingkungan': info_lingkungan(), 'hasil': hasil}
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(laporan, f, indent=2)
+        log(f"[+] Hasil disimpan ke {output}")
+    else:
+        print(json.dumps(laporan, indent=2))
+
+    if acuan and bandingkan(hasil, acuan, args.ambang):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
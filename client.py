@@ -4,27 +4,98 @@ JAGAPADI v2.0 Flask Server untuk Raspberry Pi
 Integrated dengan tampilan HTML/CSS/JS yang sudah ada
 """
 
-from flask import Flask, render_template, request, jsonify, send_from_directory, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, send_file
 import socket
-import base64
-import struct
 import hashlib
+import re
 import os
 import json
 import time
 import threading
+import itertools
+import select
+from io import BytesIO
 from datetime import datetime
 from pathlib import Path
 from aes_deskripsi import decrypt_AES_CTR
+from utils.transport import (
+    FRAME_V2, HEADER_V1, PANJANG,
+    atur_buffer_socket, atur_keepalive, terima_tepat, kirim_bagian, kirim_frame
+)
+from utils.pool_koneksi import PoolKoneksi
+from utils.riwayat import PenyimpanRiwayat
+from utils.antrian_job import AntrianJob, AntrianPenuh, STATUS_SELESAI
+from utils.jejak import buat_id_jejak, id_ke_bytes, span_relatif
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow opsional, tanpa Pillow gambar dikirim apa adanya
+    Image = None
 
 # Konfigurasi
 SERVER_HOST = '192.168.1.100'  # Sesuaikan dengan server AI
 SERVER_PORT = 12345
 AES_KEY = b'tEaXKE1f8Xe8k3SlVRMGxQAoGIcDAq0C'
 
+# Protokol: minta v2 (pipelined, request ID) saat AUTH, fallback ke v1 untuk server lama
+PROTOKOL_DIMINTA = 2
+
+# Jenis respon yang diminta saat AUTH (protokol v2): 'deteksi' = JSON ringkas berisi kotak,
+# label dan confidence (overlay digambar di browser), 'gambar' = JPEG hasil anotasi dari server
+RESPON_DIMINTA = 'deteksi'
+
+# Tracing per upload: trace ID dikirim di header frame FILE (v2, opsi AUTH "jejak=1") dan
+# span client (upload, respon, dekripsi, simpan) dikirim bersama TIME/TIMING ke server
+JEJAK_AKTIF = True
+
+# Pool koneksi terautentikasi: setiap upload meminjam satu socket sehingga upload dari
+# beberapa tab/thread Flask berjalan paralel tanpa connect + AUTH per permintaan
+POOL_UKURAN = 4
+POOL_TIMEOUT_PINJAM = 60   # detik menunggu koneksi bebas sebelum upload dianggap gagal
+POOL_INTERVAL_CEK = 30     # detik antar pemeriksaan koneksi idle (putus -> buka + AUTH ulang)
+KEEPALIVE_IDLE = 30        # TCP keepalive: probe pertama setelah idle sekian detik
+
+# Job upload di background: /api/upload langsung mengembalikan job ID, worker mengirim ke server
+JOB_WORKERS = POOL_UKURAN  # Satu worker per koneksi pool
+JOB_ANTRIAN_MAKS = 32      # Upload tertunda maksimum; lebih dari ini ditolak (HTTP 503)
+JOB_SIMPAN_MAKS = 50       # Job selesai yang masih bisa ditanyakan lewat /api/jobs/<id>
+JOB_SSE_KEEPALIVE = 15     # detik antar komentar keepalive di /api/jobs/events
+JOB_SSE_MAKS_DETIK = 300   # Stream ditutup setelah sekian detik; browser tersambung ulang dengan Last-Event-ID
+
+# Backoff saat server menjawab BUSY (antrian inferensi server penuh)
+BUSY_MAKS_PERCOBAAN = 5
+BUSY_JEDA_AWAL = 0.5  # detik, dilipatgandakan setiap percobaan
+# BUSY dengan status NOT_READY (model masih dimuat/diekspor) tidak dihitung sebagai percobaan:
+# gambar dicoba lagi setiap BUSY_JEDA_MODEL detik selama paling lama BUSY_TUNGGU_MODEL_DETIK
+BUSY_JEDA_MODEL = 2
+BUSY_TUNGGU_MODEL_DETIK = 900
+
+# Praproses sebelum upload: perkecil sisi terpanjang dan encode ulang JPEG (butuh Pillow).
+# YOLO tetap me-resize ke resolusi input model, jadi piksel di atas batas ini hanya
+# memperlambat upload. File asli tetap disimpan di folder uploads untuk ditampilkan.
+PRAPROSES_AKTIF = True
+PRAPROSES_SISI_MAKS = 1280
+PRAPROSES_KUALITAS_JPEG = 85
+
+# Upload batch (/api/upload-batch): banyak file dalam satu request multipart, dikirim
+# pipelined lewat satu koneksi pool
+BATCH_MAKS_FILE = 100
+BATCH_MAKS_MB = 128       # Batas request multipart /api/upload-batch saja (per file tetap maksimal 10MB)
+
+# Riwayat client: ring buffer di memori + log append-only cache_history/history.jsonl
+RIWAYAT_RETENSI = 5000         # Item riwayat upload yang disimpan (dan dilayani dari memori)
+RIWAYAT_BATCH_RETENSI = 500    # Ringkasan batch yang disimpan
+RIWAYAT_HALAMAN = 50           # Item per halaman default /api/history
+
+# File hasil diberi nama hash SHA-256 isinya (content-addressed): URL /hasil/<hash>.jpg
+# tidak pernah berubah isi sehingga di-cache browser permanen dengan ETag kuat
+PANJANG_HASH_HASIL = 32
+POLA_HASIL_CA = re.compile(rf'^([0-9a-f]{{{PANJANG_HASH_HASIL}}})\.(jpg|json)$')
+CACHE_HASIL_MAKS_UMUR = 365 * 24 * 3600
+
 # Flask setup
 app = Flask(__name__)
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size (upload-batch: BATCH_MAKS_MB)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 
 # Path untuk Raspberry Pi
@@ -39,12 +110,139 @@ UPLOAD_FOLDER = BASE_DIR / "uploads"
 for folder in [FOLDER_HASIL, FOLDER_HISTORY, FOLDER_LOG_CLIENT, UPLOAD_FOLDER]:
     folder.mkdir(parents=True, exist_ok=True)
 
-class JagaPadiClient:
+def item_riwayat_url(item):
+    """
+    Item riwayat lama hanya menyimpan "path" lokal: ganti dengan hash + URL /hasil/ jika
+    nama filenya content-addressed. Item baru dikembalikan apa adanya (tanpa salinan).
+    """
+    if 'path' not in item:
+        return item
+    baru = {kunci: nilai for kunci, nilai in item.items() if kunci != 'path'}
+    nama = os.path.basename(item['path'] or '')
+    cocok = POLA_HASIL_CA.match(nama)
+    baru['hash'] = cocok.group(1) if cocok else None
+    baru['url'] = f"/hasil/{nama}" if cocok else None
+    return baru
+
+def muat_data(sumber):
+    """Isi gambar: bytes apa adanya, Path (file upload batch di UPLOAD_FOLDER) dibaca saat akan dikirim"""
+    return sumber.read_bytes() if isinstance(sumber, Path) else sumber
+
+def ukuran_data(sumber):
+    return sumber.stat().st_size if isinstance(sumber, Path) else len(sumber)
+
+class AutentikasiGagal(Exception):
+    """Server menjawab AUTH_NO: password ditolak (bukan gangguan jaringan)"""
+
+class KoneksiServer:
+    """Satu socket ke server AI yang sudah lolos AUTH, beserta hasil negosiasi protokolnya"""
+
     def __init__(self):
         self.sock = None
+        self.protocol = 1
+        self.max_inflight = 1
+        self.respon = 'gambar'
+        self.server_status = None  # READY / NOT_READY / FAILED dari info AUTH (protokol v2)
+        self.jejak = False  # Trace ID dikirim di frame FILE (disepakati saat AUTH v2)
+        self.request_ids = itertools.count(1)
+        self.waktu_koneksi = 0
+        self.waktu_auth = 0
+        self.terhubung = False  # connect() berhasil (membedakan server mati dari AUTH yang diputus)
+        self.versi_ditolak = None  # Byte versi di AUTH_NO: 0 = server tidak mengenal opsi negosiasi
+
+    def buka(self, password_hash, proto):
+        """
+        Buka socket baru ke server dan lakukan AUTH.
+        Returns: (berhasil, waktu_koneksi, waktu_auth)
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.settimeout(30)
+        atur_buffer_socket(self.sock)
+        atur_keepalive(self.sock, KEEPALIVE_IDLE)
+        
+        connect_start = time.time()
+        self.sock.connect((SERVER_HOST, SERVER_PORT))
+        connect_time = time.time() - connect_start
+        self.terhubung = True
+
+        auth_start = time.time()
+        payload = password_hash
+        if proto >= 2:
+            payload += f";proto={proto};respon={RESPON_DIMINTA}"
+            if JEJAK_AKTIF:
+                payload += ";jejak=1"
+        payload = payload.encode()
+        kirim_bagian(self.sock, b'AUTH', PANJANG.pack(len(payload)), payload)
+
+        response = self.terima(8)
+        if response[:7] != b'AUTH_OK':
+            auth_time = time.time() - auth_start
+            self.versi_ditolak = response[7]
+            self.sock.close()
+            return False, connect_time, auth_time
+
+        # Byte terakhir = versi protokol yang disepakati (0 = server/protokol v1)
+        if response[7] == 0:
+            self.protocol = 1
+            self.max_inflight = 1
+            self.respon = 'gambar'
+            self.server_status = None  # Server v1 tidak melaporkan status model
+            self.jejak = False
+        else:
+            info_len = PANJANG.unpack(self.terima(PANJANG.size))[0]
+            info = json.loads(self.terima(info_len).decode('utf-8'))
+            self.protocol = info.get('proto', response[7])
+            self.max_inflight = max(1, info.get('max_inflight', 1))
+            self.respon = info.get('respon', 'gambar')
+            self.server_status = info.get('status')
+            self.jejak = bool(info.get('jejak'))
+        auth_time = time.time() - auth_start
+        self.waktu_koneksi, self.waktu_auth = connect_time, auth_time
+        return True, connect_time, auth_time
+
+    def terima(self, size):
+        return terima_tepat(self.sock, size)
+
+    def sehat(self):
+        """
+        Cek tanpa blocking apakah koneksi idle masih bisa dipakai. Koneksi idle tidak
+        seharusnya menerima apa pun: data yang siap dibaca berarti server menutup koneksi
+        (EOF/RST) atau ada sisa frame yang membuat protokol tidak sinkron.
+        """
+        if self.sock is None:
+            return False
+        try:
+            siap, _, _ = select.select([self.sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not siap
+
+    def tutup(self):
+        if self.sock:
+            try:
+                self.sock.close()
+            except:
+                pass
+            self.sock = None
+
+class JagaPadiClient:
+    def __init__(self):
+        self.pool = None
+        self.password_hash = None
         self.connected = False
         self.authenticated = False
         self.lock = threading.Lock()
+        self.riwayat = PenyimpanRiwayat(
+            FOLDER_HISTORY / "history.jsonl", RIWAYAT_RETENSI, path_lama=FOLDER_HISTORY / "history.json"
+        )
+        self.riwayat_batch = PenyimpanRiwayat(
+            FOLDER_HISTORY / "batch_history.jsonl", RIWAYAT_BATCH_RETENSI,
+            path_lama=FOLDER_HISTORY / "batch_history.json"
+        )
+        # Hasil negosiasi koneksi terakhir yang dibuka (untuk status)
+        self.protocol = 1
+        self.respon = 'gambar'
+        self.server_status = None
         self.connection_info = {
             'last_connected': None,
             'connection_attempts': 0,
@@ -54,45 +252,73 @@ class JagaPadiClient:
     def hash_password(self, password):
         return hashlib.sha256(password.encode()).hexdigest()
 
+    def _buat_koneksi(self):
+        """
+        Buka satu koneksi terautentikasi untuk pool (juga dipakai untuk AUTH ulang
+        setelah koneksi putus). Server lama yang menolak opsi negosiasi (AUTH_NO dengan
+        byte versi 0, atau koneksi diputus setelah AUTH) diulang dengan v1.
+        Raises:
+            AutentikasiGagal: server menolak password
+            OSError: server tidak bisa dihubungi
+        """
+        koneksi = KoneksiServer()
+        try:
+            success, connect_time, auth_time = koneksi.buka(self.password_hash, PROTOKOL_DIMINTA)
+            ulang_v1 = not success and PROTOKOL_DIMINTA >= 2 and koneksi.versi_ditolak == 0
+        except ConnectionError:
+            if not koneksi.terhubung or PROTOKOL_DIMINTA < 2:
+                raise
+            koneksi.tutup()
+            ulang_v1 = True
+        if ulang_v1:
+            koneksi = KoneksiServer()
+            success, connect_time, auth_time = koneksi.buka(self.password_hash, 1)
+        self._log_connection(success, connect_time, auth_time, None if success else "Password salah")
+        if not success:
+            raise AutentikasiGagal("Password salah atau server menolak koneksi")
+
+        self.protocol = koneksi.protocol
+        self.respon = koneksi.respon
+        self.server_status = koneksi.server_status
+        return koneksi
+
     def connect_to_server(self, password):
         with self.lock:
             try:
-                # Close existing connection if any
-                if self.sock:
-                    try:
-                        self.sock.close()
-                    except:
-                        pass
-                
-                self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.sock.settimeout(30)
+                # Close existing connections if any
+                if self.pool:
+                    self.pool.tutup()
+                    self.pool = None
                 
-                connect_start = time.time()
-                self.sock.connect((SERVER_HOST, SERVER_PORT))
-                connect_time = time.time() - connect_start
+                self.password_hash = self.hash_password(password)
+                try:
+                    koneksi = self._buat_koneksi()
+                except AutentikasiGagal:
+                    self.connection_info['last_error'] = "Password salah"
+                    return False, "Password salah atau server menolak koneksi"
 
-                auth_start = time.time()
-                password_hash = self.hash_password(password).encode()
-                self.sock.sendall(b'AUTH' + struct.pack('>I', len(password_hash)) + password_hash)
+                # Koneksi pertama masuk pool, sisanya dibuka + AUTH di background
+                self.pool = PoolKoneksi(self._buat_koneksi, POOL_UKURAN, POOL_INTERVAL_CEK)
+                self.pool.tambah(koneksi)
+                threading.Thread(target=self.pool.isi, name="pool-isi", daemon=True).start()
 
-                response = self.sock.recv(8)
-                auth_time = time.time() - auth_start
+                self.connected = True
+                self.authenticated = True
+                self.connection_info['last_connected'] = datetime.now()
+                self.connection_info['connection_attempts'] += 1
+                self.connection_info['last_error'] = None
+                self.connection_info['protocol'] = self.protocol
+                self.connection_info['respon'] = self.respon
+                self.connection_info['server_status'] = self.server_status
                 
-                if response == b'AUTH_OK\x00':
-                    self.connected = True
-                    self.authenticated = True
-                    self.connection_info['last_connected'] = datetime.now()
-                    self.connection_info['connection_attempts'] += 1
-                    self.connection_info['last_error'] = None
-                    
-                    self._log_connection(True, connect_time, auth_time)
-                    
-                    return True, f"Terhubung ke server (koneksi: {connect_time:.3f}s, auth: {auth_time:.3f}s)"
-                else:
-                    self.sock.close()
-                    self.connection_info['last_error'] = "Password salah"
-                    self._log_connection(False, connect_time, auth_time, "Password salah")
-                    return False, "Password salah atau server menolak koneksi"
+                pesan = (f"Terhubung ke server (koneksi: {koneksi.waktu_koneksi:.3f}s, auth: {koneksi.waktu_auth:.3f}s, "
+                         f"protokol v{self.protocol}, pool {POOL_UKURAN} koneksi)")
+                if self.server_status == 'NOT_READY':
+                    pesan += (f" - model server masih dimuat, gambar ditahan sampai model siap "
+                              f"(maksimal {BUSY_TUNGGU_MODEL_DETIK // 60} menit)")
+                elif self.server_status == 'FAILED':
+                    pesan += " - model server gagal dimuat"
+                return True, pesan
                     
             except Exception as e:
                 self.connection_info['last_error'] = str(e)
@@ -100,93 +326,337 @@ class JagaPadiClient:
                 return False, f"Gagal koneksi: {e}"
 
     def send_image(self, filename, image_data):
-        if not self.connected or not self.authenticated:
-            return False, "Belum terhubung ke server", None
+        return self.send_images([(filename, image_data)])[0]
+
+    def send_images(self, items):
+        """
+        Kirim beberapa gambar lewat satu koneksi pinjaman dari pool. Protokol v2 mengirim
+        secara pipelined (lihat _kirim_pipeline), protokol v1 satu per satu. Upload lain
+        yang berjalan bersamaan meminjam koneksi pool yang berbeda.
+
+        Args:
+            items: list of (filename, image_data); image_data boleh Path agar gambar baru
+                   dibaca dari disk saat gilirannya dikirim (lihat muat_data)
 
+        Returns:
+            list of (success, status, hasil_respon), urutan sama dengan items
+        """
+        pool = self.pool
+        if not self.connected or not self.authenticated or pool is None:
+            return [(False, "Belum terhubung ke server", None)] * len(items)
+
+        hasil = [None] * len(items)
         try:
+            with pool.pinjam(POOL_TIMEOUT_PINJAM) as koneksi:
+                if koneksi.protocol >= 2:
+                    self._kirim_pipeline(koneksi, items, hasil)
+                else:
+                    for index, (filename, image_data) in enumerate(items):
+                        hasil[index] = self._kirim_v1(koneksi, filename, muat_data(image_data))
+        except Exception as e:
+            # Koneksi sudah dibuang oleh pool; gambar yang belum selesai dilaporkan gagal
+            for index in range(len(items)):
+                if hasil[index] is None:
+                    hasil[index] = (False, f"Gagal proses gambar: {e}", None)
+
+        return hasil
+
+    def _kirim_v1(self, koneksi, filename, image_data):
+        """Kirim satu gambar dengan protokol v1 (request/response + TIMING/ACK)"""
+        data_kirim, praproses = self._praproses(image_data)
+        trace_id = buat_id_jejak()
+        jeda = BUSY_JEDA_AWAL
+        for _ in range(BUSY_MAKS_PERCOBAAN):
             # Timing preparation
             prep_start = time.time()
             filename_bytes = filename.encode('utf-8')
-            header = struct.pack('>II', len(filename_bytes), len(image_data))
+            header = HEADER_V1.pack(len(filename_bytes), len(data_kirim))
             prep_time = time.time() - prep_start
 
-            # Send data
-            send_start = time.time()
-            self.sock.sendall(header + filename_bytes + image_data)
-            send_time = time.time() - send_start
+            # Send data (scatter-gather, tanpa menggabungkan header dan gambar)
+            send_start = time.perf_counter()
+            kirim_bagian(koneksi.sock, header, filename_bytes, data_kirim)
+            send_time = time.perf_counter() - send_start
 
             # Receive encrypted result
-            receive_start = time.time()
-            expected_len = struct.unpack('>I', self._receive_exact(4))[0]
-            encrypted_data = self._receive_exact(expected_len)
-            receive_time = time.time() - receive_start
-
-            # Decrypt
-            decrypt_start = time.time()
-            nonce = encrypted_data[:8]
-            ciphertext = encrypted_data[8:]
-            hasil_bytes = decrypt_AES_CTR(ciphertext, nonce, AES_KEY)
-            decrypt_time = time.time() - decrypt_start
-
-            # Save result
-            save_start = time.time()
-            hasil_filename = f"hasil_{filename}"
-            path_hasil = FOLDER_HASIL / hasil_filename
-            with open(path_hasil, "wb") as f:
-                f.write(hasil_bytes)
-            save_time = time.time() - save_start
+            receive_start = time.perf_counter()
+            expected_len = PANJANG.unpack(koneksi.terima(PANJANG.size))[0]
+            if expected_len == 0:
+                # Hasil kosong = server BUSY, tetap kirim TIMING agar protokol sinkron
+                self._send_timing(koneksi, {'filename': filename, 'status': 'BUSY'})
+                print(f"[!] Server sibuk, mencoba lagi {filename} dalam {jeda:.1f}s")
+                time.sleep(jeda)
+                jeda *= 2
+                continue
 
-            # Send timing data to server
-            timing_data = {
-                'filename': filename,
-                'waktu_dekripsi_client': round(decrypt_time, 4),
-                'ukuran_hasil_kb': len(hasil_bytes) / 1024,
-                'waktu_simpan_client': round(save_time, 4)
+            encrypted_data = koneksi.terima(expected_len)
+            receive_time = time.perf_counter() - receive_start
+
+            span = {
+                'upload': (send_start, send_start + send_time),
+                'respon': (receive_start, receive_start + receive_time)
             }
+            status, hasil_respon, timing_data = self._process_result(
+                filename, image_data, encrypted_data, send_time, receive_time, praproses, koneksi.respon,
+                jejak=(trace_id, send_start, span)
+            )
+
+            # Send timing data to server
+            self._send_timing(koneksi, timing_data)
+
+            return True, status, hasil_respon
+
+        return False, f"Server sibuk, gagal setelah {BUSY_MAKS_PERCOBAAN} percobaan", None
+
+    def _send_timing(self, koneksi, timing_data):
+        """Kirim frame TIMING (protokol v1) dan tunggu ACK"""
+        try:
+            timing_json = json.dumps(timing_data).encode('utf-8')
+            kirim_bagian(koneksi.sock, b'TIMING', PANJANG.pack(len(timing_json)), timing_json)
             
+            ack = koneksi.terima(3)
+            if ack != b'ACK':
+                print("[!] Server tidak acknowledge timing data")
+        except Exception as e:
+            print(f"[!] Gagal kirim timing data: {e}")
+
+    def _kirim_pipeline(self, koneksi, items, hasil):
+        """
+        Kirim gambar lewat satu koneksi secara pipelined (protokol v2).
+        Hingga max_inflight gambar dikirim tanpa menunggu hasil; setiap hasil diproses
+        begitu datang dan dicocokkan lewat request ID. `hasil` diisi per index; error
+        koneksi diteruskan ke pemanggil (send_images) agar koneksi dibuang dari pool.
+        """
+        inflight = {}  # request_id -> (index, jumlah_busy, waktu_mulai_kirim, waktu_selesai_kirim)
+        # Antrian kirim: [waktu_siap, index, jumlah_busy]; gambar yang dijawab BUSY masuk lagi dengan jeda
+        antrian = [[0.0, index, 0] for index in range(len(items))]
+        # index -> (data yang dikirim, info praproses); dipakai ulang saat retry BUSY
+        siap_kirim = {}
+        # index -> trace ID; tetap sama untuk percobaan ulang setelah BUSY
+        trace_ids = {}
+        # Batas menunggu model server siap, dihitung sejak BUSY NOT_READY pertama
+        batas_model = None
+
+        while antrian or inflight:
+            # Isi pipa sampai max_inflight gambar yang sudah siap dikirim
+            sekarang = time.time()
+            for entri in list(antrian):
+                if len(inflight) >= koneksi.max_inflight:
+                    break
+                if entri[0] > sekarang:
+                    continue
+                antrian.remove(entri)
+                _, index, jumlah_busy = entri
+                filename, image_data = items[index]
+                if index not in siap_kirim:
+                    siap_kirim[index] = self._praproses(muat_data(image_data))
+                data_kirim = siap_kirim[index][0]
+                request_id = next(koneksi.request_ids)
+                filename_bytes = filename.encode('utf-8')
+                trace_id = trace_ids.setdefault(index, buat_id_jejak())
+                header_jejak = (id_ke_bytes(trace_id),) if koneksi.jejak else ()
+
+                send_start = time.perf_counter()
+                kirim_frame(
+                    koneksi.sock, b'FILE', request_id,
+                    *header_jejak, PANJANG.pack(len(filename_bytes)), filename_bytes, data_kirim
+                )
+                send_end = time.perf_counter()
+
+                inflight[request_id] = (index, jumlah_busy, send_start, send_end)
+
+            if not inflight:
+                # Semua sisa gambar sedang menunggu jeda BUSY
+                time.sleep(max(0.0, min(entri[0] for entri in antrian) - time.time()))
+                continue
+
+            # Tunggu hasil mana pun yang selesai lebih dulu
+            tag, request_id, panjang = FRAME_V2.unpack(koneksi.terima(FRAME_V2.size))
+            payload = koneksi.terima(panjang)
+            if request_id not in inflight:
+                continue
+            receive_end = time.perf_counter()
+            index, jumlah_busy, send_start, send_end = inflight.pop(request_id)
+            filename, image_data = items[index]
+
+            if tag == b'HASL':
+                span = {'upload': (send_start, send_end), 'respon': (send_end, receive_end)}
+                status, hasil_respon, timing_data = self._process_result(
+                    filename, image_data, payload, send_end - send_start, receive_end - send_end,
+                    siap_kirim.pop(index)[1], koneksi.respon, jejak=(trace_ids.pop(index), send_start, span)
+                )
+                kirim_frame(koneksi.sock, b'TIME', request_id, json.dumps(timing_data).encode('utf-8'))
+                hasil[index] = (True, status, hasil_respon)
+            elif tag == b'BUSY':
+                try:
+                    info = json.loads(bytes(payload).decode('utf-8'))
+                except ValueError:
+                    info = {}
+                saran = info.get('retry_after_ms', 0) / 1000
+                if info.get('status') == 'NOT_READY':
+                    # Model masih dimuat: tunggu kesiapan, bukan jatah percobaan antrian penuh
+                    if batas_model is None:
+                        batas_model = time.time() + BUSY_TUNGGU_MODEL_DETIK
+                    if time.time() >= batas_model:
+                        hasil[index] = (False, f"Model server belum siap setelah {BUSY_TUNGGU_MODEL_DETIK}s", None)
+                        continue
+                    print(f"[⏳] Model server masih dimuat, {filename} dicoba lagi dalam {BUSY_JEDA_MODEL}s")
+                    antrian.append([time.time() + max(saran, BUSY_JEDA_MODEL), index, jumlah_busy])
+                    continue
+                jumlah_busy += 1
+                if jumlah_busy >= BUSY_MAKS_PERCOBAAN:
+                    hasil[index] = (False, f"Server sibuk, gagal setelah {BUSY_MAKS_PERCOBAAN} percobaan", None)
+                    continue
+                jeda = max(saran, BUSY_JEDA_AWAL * (2 ** (jumlah_busy - 1)))
+                print(f"[!] Server sibuk, mencoba lagi {filename} dalam {jeda:.1f}s")
+                antrian.append([time.time() + jeda, index, jumlah_busy])
+            else:
+                hasil[index] = (False, f"Server gagal memproses gambar: {payload.decode('utf-8', 'replace')}", None)
+
+
+    def send_batch(self, items):
+        """
+        Kirim satu batch gambar back-to-back lewat satu koneksi (send_images, pipelined pada
+        protokol v2: upload gambar berikutnya tumpang tindih dengan inferensi gambar sebelumnya),
+        lalu catat timing tingkat batch ke cache_history dan log client.
+
+        Returns:
+            tuple: (list hasil per file seperti send_images, dict ringkasan batch)
+        """
+        waktu_mulai = datetime.now()
+        mulai = time.perf_counter()
+        hasil = self.send_images(items)
+        durasi = time.perf_counter() - mulai
+
+        berhasil = sum(1 for success, _, _ in hasil if success)
+        ukuran_total_kb = sum(ukuran_data(data) for _, data in items) / 1024
+        ringkasan = {
+            'batch_id': waktu_mulai.strftime('%Y%m%d%H%M%S%f'),
+            'waktu': waktu_mulai.strftime('%Y-%m-%d %H:%M:%S'),
+            'protokol': self.protocol,
+            'jumlah_file': len(items),
+            'berhasil': berhasil,
+            'gagal': len(items) - berhasil,
+            'ukuran_total_kb': round(ukuran_total_kb, 1),
+            'durasi': round(durasi, 4),
+            'rata_per_gambar': round(durasi / len(items), 4) if items else 0,
+            'throughput_gambar': round(berhasil / durasi, 2) if durasi > 0 else 0,
+            'throughput_kb': round(ukuran_total_kb / durasi, 1) if durasi > 0 else 0,
+            'files': [
+                {'filename': filename, 'success': success, 'message': message}
+                for (filename, _), (success, message, _) in zip(items, hasil)
+            ]
+        }
+        self._save_batch(ringkasan)
+        return hasil, ringkasan
+
+    def _praproses(self, image_data):
+        """
+        Perkecil gambar ke PRAPROSES_SISI_MAKS (sisi terpanjang) dan encode ulang sebagai JPEG.
+        Gambar dikirim apa adanya jika praproses nonaktif, Pillow tidak tersedia, gambar gagal
+        dibaca, atau hasil encode ulang tidak lebih kecil.
+
+        Returns:
+            tuple: (data yang dikirim, dict info praproses untuk log timing)
+        """
+        praproses_start = time.time()
+        data_kirim = image_data
+        if PRAPROSES_AKTIF and Image is not None:
             try:
-                timing_json = json.dumps(timing_data).encode('utf-8')
-                timing_header = b'TIMING' + struct.pack('>I', len(timing_json))
-                self.sock.sendall(timing_header + timing_json)
-                
-                ack = self.sock.recv(3)
-                if ack != b'ACK':
-                    print("[!] Server tidak acknowledge timing data")
+                img = Image.open(BytesIO(image_data))
+                sisi = PRAPROSES_SISI_MAKS
+                # Decoder JPEG bisa langsung men-decode pada skala 1/2, 1/4, 1/8 (jauh lebih cepat)
+                img.draft('RGB', (sisi, sisi))
+                img = ImageOps.exif_transpose(img)
+                diperkecil = max(img.size) > sisi
+                if diperkecil:
+                    img.thumbnail((sisi, sisi), Image.BILINEAR)
+                buffer = BytesIO()
+                img.convert('RGB').save(buffer, format='JPEG', quality=PRAPROSES_KUALITAS_JPEG)
+                if diperkecil or buffer.tell() < len(image_data):
+                    data_kirim = buffer.getvalue()
             except Exception as e:
-                print(f"[!] Gagal kirim timing data: {e}")
+                print(f"[!] Praproses gagal, gambar dikirim apa adanya: {e}")
+        praproses_time = time.time() - praproses_start
 
-            # Create result base64 for response
-            result_b64 = "data:image/jpeg;base64," + base64.b64encode(hasil_bytes).decode()
-            
-            # Log timing
-            full_timing = {
-                'filename': filename,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'ukuran_asli_kb': len(image_data) / 1024,
-                'ukuran_hasil_kb': len(hasil_bytes) / 1024,
-                'waktu_kirim': round(send_time, 4),
-                'waktu_terima': round(receive_time, 4),
-                'waktu_dekripsi': round(decrypt_time, 4),
-                'waktu_simpan': round(save_time, 4)
-            }
-            
-            self._save_history(filename, str(path_hasil), full_timing)
+        return data_kirim, {
+            'ukuran_kirim_kb': len(data_kirim) / 1024,
+            'waktu_praproses': round(praproses_time, 4)
+        }
 
-            status = f"Berhasil - Upload: {send_time:.2f}s, Download: {receive_time:.2f}s, Dekripsi: {decrypt_time:.3f}s"
-            
-            return True, status, result_b64
-            
-        except Exception as e:
-            return False, f"Gagal proses gambar: {e}", None
+    def _process_result(self, filename, image_data, encrypted_data, send_time, receive_time, praproses, respon,
+                        jejak=None):
+        """
+        Dekripsi hasil dari server, simpan, catat history. `respon` = jenis respon koneksi asal.
+        `jejak` = (trace_id, awal upload, span upload/respon) dari perf_counter; span dekripsi
+        dan simpan ditambahkan di sini lalu dikirim ke server bersama timing_data.
+        Returns: (status, hasil_respon, timing_data untuk server)
+
+        hasil_respon berisi 'result_url' (URL /hasil/ JPEG anotasi, respon 'gambar') atau
+        'detections' (dict kotak/label/confidence, respon 'deteksi'); yang lain bernilai None.
+        File hasil diberi nama hash isinya sehingga URL-nya bisa di-cache permanen oleh browser.
+        """
+        # Decrypt
+        decrypt_start = time.perf_counter()
+        view = memoryview(encrypted_data)
+        nonce = bytes(view[:8])
+        ciphertext = view[8:]
+        hasil_bytes = decrypt_AES_CTR(ciphertext, nonce, AES_KEY)
+        decrypt_time = time.perf_counter() - decrypt_start
+
+        # Save result
+        save_start = time.perf_counter()
+        digest = hashlib.sha256(hasil_bytes).hexdigest()[:PANJANG_HASH_HASIL]
+        hasil_filename = digest + (".json" if respon == 'deteksi' else ".jpg")
+        path_hasil = FOLDER_HASIL / hasil_filename
+        if not path_hasil.exists():  # Isi sama = file sama, tidak perlu ditulis ulang
+            with open(path_hasil, "wb") as f:
+                f.write(hasil_bytes)
+        save_time = time.perf_counter() - save_start
+
+        # Timing data untuk server
+        timing_data = {
+            'filename': filename,
+            'waktu_dekripsi_client': round(decrypt_time, 4),
+            'ukuran_hasil_kb': len(hasil_bytes) / 1024,
+            'waktu_simpan_client': round(save_time, 4),
+            'waktu_praproses_client': praproses['waktu_praproses']
+        }
+        if jejak is not None:
+            trace_id, awal, span = jejak
+            span['dekripsi'] = (decrypt_start, decrypt_start + decrypt_time)
+            span['simpan'] = (save_start, save_start + save_time)
+            timing_data['trace_id'] = trace_id
+            timing_data['span'] = span_relatif(span, awal)
+
+        if respon == 'deteksi':
+            # Overlay kotak digambar oleh browser di atas gambar yang sudah dimilikinya
+            hasil_respon = {'result_url': None, 'detections': json.loads(bytes(hasil_bytes))}
+        else:
+            # Browser mengambil gambar lewat URL (cache-able) alih-alih data URI base64 di JSON
+            hasil_respon = {'result_url': f"/hasil/{hasil_filename}", 'detections': None}
+        
+        # Log timing
+        full_timing = {
+            'filename': filename,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'ukuran_asli_kb': ukuran_data(image_data) / 1024,
+            'ukuran_kirim_kb': praproses['ukuran_kirim_kb'],
+            'ukuran_hasil_kb': len(hasil_bytes) / 1024,
+            'waktu_praproses': praproses['waktu_praproses'],
+            'waktu_kirim': round(send_time, 4),
+            'waktu_terima': round(receive_time, 4),
+            'waktu_dekripsi': round(decrypt_time, 4),
+            'waktu_simpan': round(save_time, 4)
+        }
+        if jejak is not None:
+            full_timing['trace_id'] = timing_data['trace_id']
+        hasil_respon['timing'] = full_timing
+        
+        self._save_history(filename, hasil_filename, full_timing)
 
-    def _receive_exact(self, size):
-        buffer = b""
-        while len(buffer) < size:
-            chunk = self.sock.recv(size - len(buffer))
-            if not chunk:
-                raise ConnectionError("Koneksi terputus")
-            buffer += chunk
-        return buffer
+        status = f"Berhasil - Upload: {send_time:.2f}s, Download: {receive_time:.2f}s, Dekripsi: {decrypt_time:.3f}s"
+        return status, hasil_respon, timing_data
 
     def _log_connection(self, success, connect_time, auth_time, error=None):
         log_data = {
@@ -208,51 +678,57 @@ class JagaPadiClient:
                 f.write(f"  Error: {error}\n")
             f.write("-" * 50 + "\n")
 
-    def _save_history(self, filename, path_hasil, timing_data):
-        history_file = FOLDER_HISTORY / "history.json"
-        
+    def _save_batch(self, ringkasan):
+        """Simpan ringkasan batch ke cache_history/batch_history.jsonl dan log batch harian"""
+        self.riwayat_batch.tambah(ringkasan)
+
+        log_file = FOLDER_LOG_CLIENT / f"batch_{datetime.now().strftime('%Y%m%d')}.log"
+        with open(log_file, 'a', encoding='utf-8') as f:
+            f.write(f"[{ringkasan['waktu']}] BATCH {ringkasan['batch_id']}\n")
+            f.write(f"  File: {ringkasan['berhasil']}/{ringkasan['jumlah_file']} berhasil (protokol v{ringkasan['protokol']})\n")
+            f.write(f"  Ukuran Total: {ringkasan['ukuran_total_kb']} KB\n")
+            f.write(f"  Durasi: {ringkasan['durasi']}s (rata-rata {ringkasan['rata_per_gambar']}s/gambar)\n")
+            f.write(f"  Throughput: {ringkasan['throughput_gambar']} gambar/s, {ringkasan['throughput_kb']} KB/s\n")
+            for item in ringkasan['files']:
+                if not item['success']:
+                    f.write(f"  Gagal: {item['filename']} - {item['message']}\n")
+            f.write("-" * 50 + "\n")
+
+    def _save_history(self, filename, hasil_filename, timing_data):
+        """Catat satu hasil; hasil dirujuk lewat hash dan URL /hasil/ content-addressed, bukan path lokal"""
         item = {
             "nama_file": filename,
-            "path": path_hasil,
+            "hash": hasil_filename.rsplit('.', 1)[0],
+            "url": f"/hasil/{hasil_filename}",
             "waktu": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             "timing": timing_data
         }
 
-        if history_file.exists():
-            with open(history_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        else:
-            data = []
-
-        data.append(item)
-        
-        if len(data) > 50:
-            data = data[-50:]
-            
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Satu baris append + ring buffer, tanpa membaca/menulis ulang seluruh riwayat
+        self.riwayat.tambah(item)
 
-    def get_history(self):
-        history_file = FOLDER_HISTORY / "history.json"
-        if history_file.exists():
-            with open(history_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+    def get_history(self, offset=0, limit=RIWAYAT_HALAMAN):
+        """Satu halaman riwayat dari memori (offset dihitung dari item terbaru), beserta total item"""
+        items, total = self.riwayat.halaman(offset, limit)
+        return [item_riwayat_url(item) for item in items], total
 
     def get_status(self):
         return {
             'connected': self.connected,
             'authenticated': self.authenticated,
             'server': f"{SERVER_HOST}:{SERVER_PORT}",
+            'protocol': self.protocol,
+            'respon': self.respon,
+            'server_status': self.server_status,
+            'pool': self.pool.statistik() if self.pool else None,
             'connection_info': self.connection_info
         }
 
     def disconnect(self):
-        if self.sock:
-            try:
-                self.sock.close()
-            except:
-                pass
+        with self.lock:
+            if self.pool:
+                self.pool.tutup()
+                self.pool = None
         self.connected = False
         self.authenticated = False
         
@@ -265,6 +741,35 @@ class JagaPadiClient:
 # Global client instance
 client_app = JagaPadiClient()
 
+def balas_dengan_etag(etag, buat_data, cache_control='no-cache'):
+    """
+    Conditional GET untuk endpoint JSON: 304 tanpa body jika If-None-Match cocok dengan
+    `etag`, selain itu jsonify(buat_data()). buat_data hanya dipanggil jika perlu, sehingga
+    polling UI saat tidak ada perubahan hampir tidak memakan biaya.
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(buat_data())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+def proses_job_upload(filename, file_data):
+    """Dikerjakan worker antrian job: kirim ke server AI, exception = job gagal"""
+    success, message, hasil_respon = client_app.send_image(filename, file_data)
+    if not success:
+        raise RuntimeError(message)
+    return dict(hasil_respon, message=message)
+
+antrian_job = AntrianJob(proses_job_upload, JOB_WORKERS, JOB_ANTRIAN_MAKS, JOB_SIMPAN_MAKS)
+
+def ringkas_job(job):
+    """Snapshot job tanpa data hasil (gambar/deteksi) untuk daftar dan event stream"""
+    ringkas = {k: v for k, v in job.items() if k != 'hasil'}
+    ringkas['ada_hasil'] = job['hasil'] is not None
+    return ringkas
+
 # === FLASK ROUTES ===
 
 @app.route('/')
@@ -274,8 +779,10 @@ def index():
 
 @app.route('/api/status')
 def status():
-    """API untuk mengecek status koneksi"""
-    return jsonify(client_app.get_status())
+    """API untuk mengecek status koneksi (ETag dari isi status)"""
+    data = client_app.get_status()
+    etag = hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+    return balas_dengan_etag(etag, lambda: data)
 
 @app.route('/api/connect', methods=['POST'])
 def connect():
@@ -307,7 +814,11 @@ def disconnect():
 
 @app.route('/api/upload', methods=['POST'])
 def upload():
-    """API untuk upload dan proses gambar"""
+    """
+    API untuk upload gambar. Gambar dimasukkan ke antrian job dan langsung dibalas
+    job ID (HTTP 202); progres dipantau lewat /api/jobs/<id> atau /api/jobs/events.
+    Dengan ?tunggu=1 permintaan ditahan sampai job selesai dan membalas hasil lengkap.
+    """
     if 'file' not in request.files:
         return jsonify({
             'success': False,
@@ -344,13 +855,38 @@ def upload():
         with open(upload_path, 'wb') as f:
             f.write(file_data)
         
-        # Send to AI server
-        success, message, result_image = client_app.send_image(filename, file_data)
-        
+        if not client_app.connected:
+            return jsonify({
+                'success': False,
+                'message': 'Belum terhubung ke server'
+            })
+
+        # Masukkan ke antrian job, dikirim ke AI server oleh worker
+        try:
+            job = antrian_job.kirim(filename, file_data)
+        except AntrianPenuh as e:
+            return jsonify({'success': False, 'message': str(e)}), 503
+
+        if request.args.get('tunggu') != '1':
+            return jsonify({
+                'success': True,
+                'message': 'Gambar masuk antrian',
+                'job_id': job['id'],
+                'job': job,
+                'filename': filename,
+                'size': len(file_data)
+            }), 202
+
+        job = antrian_job.tunggu_selesai(job['id'])
+        success = job is not None and job['status'] == STATUS_SELESAI
+        hasil_respon = job['hasil'] if success else {}
         return jsonify({
             'success': success,
-            'message': message,
-            'result_image': result_image if success else None,
+            'message': hasil_respon.get('message') if success else (job['pesan'] if job else 'Job tidak ditemukan'),
+            'job_id': job['id'] if job else None,
+            'result_url': hasil_respon.get('result_url'),
+            'detections': hasil_respon.get('detections'),
+            'timing': hasil_respon.get('timing'),
             'filename': filename,
             'size': len(file_data)
         })
@@ -361,16 +897,174 @@ def upload():
             'message': f'Error memproses file: {str(e)}'
         })
 
+@app.route('/api/upload-batch', methods=['POST'])
+def upload_batch():
+    """
+    API untuk upload banyak gambar dalam satu request multipart (field 'files').
+    Gambar dikirim back-to-back ke AI server lewat satu koneksi; balasan berisi hasil
+    per file (deteksi + URL gambar hasil) dan throughput keseluruhan batch.
+    """
+    # Batas request lebih besar hanya untuk route ini (Flask >= 3.1); route lain tetap 16MB
+    request.max_content_length = BATCH_MAKS_MB * 1024 * 1024
+    files = request.files.getlist('files') or request.files.getlist('file')
+    if not files:
+        return jsonify({
+            'success': False,
+            'message': 'Tidak ada file yang dikirim'
+        })
+
+    if len(files) > BATCH_MAKS_FILE:
+        return jsonify({
+            'success': False,
+            'message': f'Terlalu banyak file (maksimal {BATCH_MAKS_FILE} per batch)'
+        })
+
+    if not client_app.connected:
+        return jsonify({
+            'success': False,
+            'message': 'Belum terhubung ke server'
+        })
+
+    try:
+        # Validasi per file; file yang ditolak tetap muncul di hasil tanpa dikirim.
+        # File disalin ke UPLOAD_FOLDER tanpa dibaca ke memori; isinya baru dibaca saat dikirim
+        hasil_file = []
+        items = []
+        for file in files:
+            filename = file.filename
+            if filename == '' or not file.content_type.startswith('image/'):
+                hasil_file.append({'filename': filename, 'success': False, 'message': 'File harus berupa gambar'})
+                continue
+            file.stream.seek(0, os.SEEK_END)
+            ukuran = file.stream.tell()
+            file.stream.seek(0)
+            if ukuran > 10 * 1024 * 1024:  # 10MB
+                hasil_file.append({'filename': filename, 'success': False, 'message': 'Ukuran file terlalu besar (maksimal 10MB)'})
+                continue
+
+            # Nama unik per upload: file bernama sama (di batch ini atau /api/upload bersamaan)
+            # tidak saling menimpa sebelum dibaca saat dikirim. Nama asli tetap untuk tampilan dan log
+            path = UPLOAD_FOLDER / f"{os.urandom(8).hex()}_{os.path.basename(filename)}"
+            file.save(path)
+            items.append((filename, path))
+            hasil_file.append(None)
+
+        if items:
+            hasil_kirim, ringkasan = client_app.send_batch(items)
+        else:
+            hasil_kirim, ringkasan = [], None
+
+        # Isi slot file yang dikirim sesuai urutan aslinya
+        hasil_kirim = iter(zip(items, hasil_kirim))
+        for index, entri in enumerate(hasil_file):
+            if entri is not None:
+                continue
+            (filename, sumber), (success, message, hasil_respon) = next(hasil_kirim)
+            hasil_file[index] = {
+                'filename': filename,
+                'success': success,
+                'message': message,
+                'size': ukuran_data(sumber),
+                'detections': hasil_respon['detections'] if success else None,
+                'result_url': hasil_respon['result_url'] if success else None,
+                'timing': hasil_respon['timing'] if success else None
+            }
+
+        berhasil = sum(1 for entri in hasil_file if entri['success'])
+        return jsonify({
+            'success': berhasil > 0,
+            'message': f'{berhasil}/{len(hasil_file)} gambar berhasil diproses',
+            'files': hasil_file,
+            'batch': {k: v for k, v in ringkasan.items() if k != 'files'} if ringkasan else None
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error memproses batch: {str(e)}'
+        })
+
+@app.route('/api/jobs')
+def jobs():
+    """API daftar job upload (tanpa data hasil) dan statistik antrian"""
+    return jsonify({
+        'jobs': [ringkas_job(job) for job in antrian_job.daftar()],
+        'antrian': antrian_job.statistik()
+    })
+
+@app.route('/api/jobs/<job_id>')
+def job_detail(job_id):
+    """API status satu job; hasil (gambar/deteksi + timing) tersedia setelah status 'selesai'"""
+    job = antrian_job.ambil(job_id)
+    if job is None:
+        return jsonify({'error': 'Job tidak ditemukan'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/events')
+def job_events():
+    """
+    Server-Sent Events: satu event 'job' (JSON ringkas) setiap kali status job berubah.
+    Tanpa versi, event pertama berisi semua job yang masih tersimpan; ?versi=n melanjutkan dari versi n.
+    """
+    try:
+        # Browser yang tersambung ulang mengirim Last-Event-ID = versi event terakhir
+        versi_awal = int(request.headers.get('Last-Event-ID') or request.args.get('versi', 0))
+    except ValueError:
+        versi_awal = 0
+
+    def stream():
+        # Umur stream dibatasi agar thread Flask tidak tertahan oleh tab yang ditinggal terbuka
+        versi = versi_awal
+        batas = time.time() + JOB_SSE_MAKS_DETIK
+        while time.time() < batas:
+            versi, berubah = antrian_job.tunggu_perubahan(
+                versi, min(JOB_SSE_KEEPALIVE, max(0.0, batas - time.time()))
+            )
+            if not berubah:
+                yield ": keepalive\n\n"
+                continue
+            for job in berubah:
+                yield f"id: {job['versi']}\nevent: job\ndata: {json.dumps(ringkas_job(job))}\n\n"
+
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
 @app.route('/api/history')
 def history():
-    """API untuk mendapatkan riwayat deteksi"""
-    return jsonify(client_app.get_history())
+    """
+    API untuk mendapatkan riwayat deteksi (urut kronologis).
+    Paginasi: ?offset=n&limit=m dihitung dari item terbaru; total item di header X-Total-Count.
+    """
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(max(1, int(request.args.get('limit', RIWAYAT_HALAMAN))), RIWAYAT_RETENSI)
+    except ValueError:
+        return jsonify({'error': 'offset dan limit harus berupa angka'}), 400
+
+    # ETag dari token proses + versi riwayat: 304 dikirim tanpa menyalin atau menyerialisasi item
+    etag = f"riwayat-{client_app.riwayat.token}-{client_app.riwayat.versi}-{offset}-{limit}"
+    response = balas_dengan_etag(etag, lambda: client_app.get_history(offset, limit)[0])
+    response.headers['X-Total-Count'] = str(len(client_app.riwayat.items))
+    return response
+
+@app.route('/api/history/batch')
+def history_batch():
+    """API untuk mendapatkan ringkasan upload batch terakhir"""
+    items, _ = client_app.riwayat_batch.halaman(0, RIWAYAT_HALAMAN)
+    return jsonify(items)
 
 @app.route('/hasil/<filename>')
 def serve_result(filename):
-    """Serve file hasil deteksi"""
+    """
+    Serve file hasil deteksi. Nama content-addressed (<hash>.jpg) memakai hash sebagai
+    ETag kuat dan Cache-Control immutable; If-None-Match yang cocok dibalas 304.
+    """
     try:
-        return send_from_directory(FOLDER_HASIL, filename)
+        cocok = POLA_HASIL_CA.match(filename)
+        if not cocok:
+            return send_from_directory(FOLDER_HASIL, filename)
+        response = send_from_directory(FOLDER_HASIL, filename, etag=cocok.group(1), max_age=CACHE_HASIL_MAKS_UMUR)
+        response.headers['Cache-Control'] = f"public, max-age={CACHE_HASIL_MAKS_UMUR}, immutable"
+        return response
     except FileNotFoundError:
         return jsonify({'error': 'File tidak ditemukan'}), 404
 
@@ -418,20 +1112,27 @@ def system_info():
 
 @app.route('/api/logs')
 def logs():
-    """API untuk mendapatkan log terbaru"""
+    """API untuk mendapatkan log terbaru (ETag dari nama, ukuran dan mtime file log)"""
     try:
-        log_files = []
-        for log_file in FOLDER_LOG_CLIENT.glob("*.log"):
-            with open(log_file, 'r', encoding='utf-8') as f:
-                content = f.read().split('\n')[-50:]  # Last 50 lines
-            log_files.append({
-                'filename': log_file.name,
-                'content': '\n'.join(content),
-                'size': log_file.stat().st_size,
-                'modified': datetime.fromtimestamp(log_file.stat().st_mtime).isoformat()
-            })
+        daftar = [(log_file, log_file.stat()) for log_file in FOLDER_LOG_CLIENT.glob("*.log")]
+        etag = hashlib.sha1(
+            repr(sorted((log_file.name, st.st_size, st.st_mtime_ns) for log_file, st in daftar)).encode()
+        ).hexdigest()
+
+        def buat_data():
+            log_files = []
+            for log_file, st in daftar:
+                with open(log_file, 'r', encoding='utf-8') as f:
+                    content = f.read().split('\n')[-50:]  # Last 50 lines
+                log_files.append({
+                    'filename': log_file.name,
+                    'content': '\n'.join(content),
+                    'size': st.st_size,
+                    'modified': datetime.fromtimestamp(st.st_mtime).isoformat()
+                })
+            return log_files
         
-        return jsonify(log_files)
+        return balas_dengan_etag(etag, buat_data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -439,9 +1140,7 @@ def logs():
 def clear_history():
     """API untuk menghapus riwayat"""
     try:
-        history_file = FOLDER_HISTORY / "history.json"
-        if history_file.exists():
-            history_file.unlink()
+        client_app.riwayat.hapus()
         
         return jsonify({
             'success': True,
@@ -468,10 +1167,10 @@ def export_logs():
             for log_file in FOLDER_LOG_CLIENT.glob("*.log"):
                 zip_file.write(log_file, log_file.name)
             
-            # Add history file
-            history_file = FOLDER_HISTORY / "history.json"
-            if history_file.exists():
-                zip_file.write(history_file, "history.json")
+            # Add history (dari memori, format list JSON seperti sebelumnya)
+            zip_file.writestr(
+                "history.json", json.dumps([item_riwayat_url(item) for item in client_app.riwayat.semua()], indent=2, ensure_ascii=False)
+            )
         
         zip_buffer.seek(0)
         
@@ -1,25 +1,293 @@
 import os
-from ultralytics import YOLO
-from PIL import Image
+import json
+import hashlib
+import multiprocessing
+import queue
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
 import numpy as np
 
 MODEL_PATH = "model_hama.pt"
 HASIL_FOLDER = "hasil_identifikasi/"
 
-# Inisialisasi model saat file diimpor
-model = YOLO(MODEL_PATH)
+# Backend inferensi CPU: 'pytorch' (model_hama.pt langsung), 'onnx' (ONNX Runtime),
+# 'openvino' (OpenVINO IR FP32) atau 'openvino_int8' (OpenVINO IR terkuantisasi INT8).
+# Selain 'pytorch', model diekspor sekali dan artefaknya disimpan di samping bobot
+# bersama file sidik (<artefak>.sidik.json); ekspor diulang jika isi model_hama.pt,
+# opsi ekspor (termasuk UKURAN_INPUT_MODEL) atau YAML kalibrasi INT8 berubah.
+BACKEND_INFERENSI = 'pytorch'
+UKURAN_INPUT_MODEL = 640      # imgsz saat ekspor dan inferensi
+# YAML dataset kalibrasi INT8 berisi gambar lapangan, wajib untuk 'openvino_int8' (tanpa ini
+# ultralytics mengunduh dan memakai dataset COCO). Ubah isi YAML setelah mengganti gambarnya
+# agar sidik ekspor berubah.
+DATA_KALIBRASI_INT8 = None
 
-def jalankan_deteksi(path_input, nama_file):
+# backend -> (opsi YOLO.export, akhiran nama artefak). Semua diekspor dengan batch dinamis
+# karena penjadwal micro-batch (BATCH_MAKS) dan inferensi tile mengirim beberapa gambar sekaligus
+BACKEND_EKSPOR = {
+    'onnx': ({'format': 'onnx', 'dynamic': True, 'simplify': True}, '.onnx'),
+    'openvino': ({'format': 'openvino', 'dynamic': True}, '_openvino_model'),
+    'openvino_int8': ({'format': 'openvino', 'dynamic': True, 'int8': True}, '_int8_openvino_model'),
+}
+
+# Konfigurasi micro-batching lintas koneksi
+BATCH_MAKS = 8          # Jumlah gambar maksimum dalam satu batch YOLO
+BATCH_TUNGGU_MS = 25    # Waktu tunggu maksimum (ms) untuk mengumpulkan batch
+KUALITAS_JPEG_HASIL = 95  # Kualitas JPEG gambar hasil anotasi
+
+# Jenis respon hasil deteksi (dinegosiasikan per koneksi saat AUTH)
+RESPON_GAMBAR = 'gambar'    # JPEG hasil anotasi (default, kompatibel dengan client lama)
+RESPON_DETEKSI = 'deteksi'  # JSON ringkas: ukuran gambar, kotak, label dan confidence
+
+# Mode inferensi: 'batch' (penjadwal micro-batch di proses server),
+# 'pool' (beberapa proses worker, masing-masing memuat model sendiri)
+# atau 'stub' (tanpa YOLO, untuk uji beban jaringan/enkripsi/log; bisa juga lewat
+# argumen: python server.py --stub-deteksi)
+MODE_INFERENSI = 'batch'
+if '--stub-deteksi' in sys.argv:
+    MODE_INFERENSI = 'stub'
+STUB_DETEKSI_MS = 0   # Jeda tiruan waktu inferensi di mode stub
+POOL_WORKERS = 2
+POOL_THREADS_PER_WORKER = max(1, (os.cpu_count() or 2) // POOL_WORKERS)
+
+# Jumlah permintaan maksimum yang boleh menunggu/diproses; lebih dari ini server menjawab BUSY
+ANTRIAN_INFERENSI_MAKS = 16
+
+# Inferensi tile untuk foto resolusi tinggi (drone/DSLR): gambar dipotong menjadi tile
+# yang saling tumpang tindih, dideteksi sebagai satu batch, lalu kotak dipetakan kembali
+# ke koordinat gambar penuh dan digabung dengan NMS lintas tile
+TILE_AKTIF = True
+TILE_AMBANG_PIKSEL = 2000     # Aktif otomatis jika sisi terpanjang gambar melebihi ini
+TILE_UKURAN = 960             # Sisi tile (piksel gambar asli)
+TILE_OVERLAP = 0.2            # Porsi tumpang tindih antar tile yang bersebelahan
+TILE_SERTAKAN_GLOBAL = True   # Tambahkan satu pass gambar penuh untuk objek besar
+TILE_NMS_AMBANG = 0.6         # Ambang irisan/luas kotak terkecil untuk menganggap dua kotak sama
+
+# Pemanasan setelah model dimuat: inferensi dummy agar gambar pertama client tidak
+# menanggung biaya inisialisasi (0 = tanpa pemanasan)
+PEMANASAN_JUMLAH = 1
+PEMANASAN_UKURAN = 640  # Sisi gambar dummy (piksel)
+
+# Status kesiapan model, dilaporkan ke client v2 di info AUTH_OK
+STATUS_MEMUAT = 'NOT_READY'
+STATUS_SIAP = 'READY'
+STATUS_GAGAL = 'FAILED'
+
+model = None
+_model_lock = threading.Lock()
+
+_status = STATUS_MEMUAT
+_error_persiapan = None
+_model_siap = threading.Event()
+_persiapan_selesai = threading.Event()  # Diset saat persiapan berhasil maupun gagal
+_thread_persiapan = None
+
+class ServerSibuk(Exception):
+    """Antrian inferensi penuh atau model belum siap, client diminta mencoba lagi nanti"""
+
+def _impor_yolo():
+    """Impor ultralytics (lambat, menarik torch) hanya saat model benar-benar dimuat"""
+    from ultralytics import YOLO
+    return YOLO
+
+def path_model_backend(backend=None):
+    """Path bobot/artefak yang dimuat untuk backend (default BACKEND_INFERENSI)"""
+    backend = backend or BACKEND_INFERENSI
+    if backend == 'pytorch':
+        return MODEL_PATH
+    if backend not in BACKEND_EKSPOR:
+        raise ValueError(f"Backend inferensi tidak dikenal: {backend}")
+    return os.path.splitext(MODEL_PATH)[0] + BACKEND_EKSPOR[backend][1]
+
+def _hash_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for blok in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(blok)
+    return h.hexdigest()
+
+def _sidik_ekspor(opsi):
+    """Sidik artefak ekspor: hash isi bobot, opsi YOLO.export dan hash YAML kalibrasi (jika ada)"""
+    sidik = {'model': _hash_file(MODEL_PATH)[:16], 'opsi': opsi}
+    if opsi.get('data'):
+        sidik['kalibrasi'] = _hash_file(opsi['data'])[:16]
+    return sidik
+
+def _baca_sidik(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def ekspor_model(backend=None):
     """
-    Jalankan deteksi YOLO pada file gambar.
-    Simpan hasil ke folder hasil_identifikasi.
-    Kembalikan: (path_output, list_label, rata_rata_confidence)
+    Pastikan artefak backend tersedia dan sidiknya cocok dengan bobot dan opsi ekspor
+    sekarang, ekspor dengan ultralytics jika belum. Kembalikan path artefak.
     """
-    # Jalankan deteksi
-    results = model(path_input)
-    result = results[0]
+    backend = backend or BACKEND_INFERENSI
+    tujuan = path_model_backend(backend)
+    if backend == 'pytorch':
+        return tujuan
+
+    opsi, _ = BACKEND_EKSPOR[backend]
+    opsi = dict(opsi, imgsz=UKURAN_INPUT_MODEL)
+    if opsi.get('int8'):
+        if not DATA_KALIBRASI_INT8 or not os.path.exists(DATA_KALIBRASI_INT8):
+            raise ValueError(
+                f"Backend {backend} butuh DATA_KALIBRASI_INT8 berisi YAML dataset gambar lapangan "
+                f"(sekarang: {DATA_KALIBRASI_INT8!r}); tanpa itu kalibrasi memakai dataset COCO"
+            )
+        opsi['data'] = DATA_KALIBRASI_INT8
+
+    sidik = _sidik_ekspor(opsi)
+    path_sidik = tujuan + ".sidik.json"
+    if os.path.exists(tujuan) and _baca_sidik(path_sidik) == sidik:
+        return tujuan
+
+    mulai = time.time()
+    print(f"[⚙] Mengekspor {MODEL_PATH} ke backend {backend}...")
+    hasil = str(_impor_yolo()(MODEL_PATH).export(**opsi))
+    # Nama bawaan ultralytics bisa sama untuk beberapa varian (mis. FP32/INT8), pindahkan ke nama backend
+    if os.path.abspath(hasil) != os.path.abspath(tujuan):
+        if os.path.isdir(tujuan):
+            shutil.rmtree(tujuan)
+        elif os.path.exists(tujuan):
+            os.remove(tujuan)
+        shutil.move(hasil, tujuan)
+    with open(path_sidik, 'w', encoding='utf-8') as f:
+        json.dump(sidik, f)
+    print(f"[⚙] Artefak {tujuan} siap dalam {time.time() - mulai:.1f}s")
+    return tujuan
+
+def buat_model(backend=None):
+    """Buat instance YOLO baru untuk backend tertentu (ekspor dulu jika perlu)"""
+    return _impor_yolo()(ekspor_model(backend), task='detect')
+
+def muat_model():
+    """Muat model YOLO (backend BACKEND_INFERENSI) sekali per proses dan kembalikan instance-nya"""
+    global model
+    with _model_lock:
+        if model is None:
+            model = buat_model()
+    return model
+
+def prediksi(yolo, gambar):
+    """Jalankan satu panggilan YOLO (gambar tunggal atau list) dengan ukuran input model"""
+    return yolo(gambar, imgsz=UKURAN_INPUT_MODEL)
+
+def _siapkan_model(jumlah_pemanasan=PEMANASAN_JUMLAH):
+    """
+    Impor ultralytics, muat model dan jalankan inferensi pemanasan di proses ini.
+    Kembalikan: dict durasi (detik) tahap 'impor', 'muat' dan 'pemanasan'
+    """
+    waktu = {}
+    mulai = time.time()
+    _impor_yolo()
+    waktu['impor'] = time.time() - mulai
+
+    mulai = time.time()
+    yolo = muat_model()
+    waktu['muat'] = time.time() - mulai
 
-    # Ekstrak label dan confidence
+    mulai = time.time()
+    gambar_dummy = np.zeros((PEMANASAN_UKURAN, PEMANASAN_UKURAN, 3), dtype=np.uint8)
+    for _ in range(jumlah_pemanasan):
+        yolo(gambar_dummy, imgsz=UKURAN_INPUT_MODEL, verbose=False)
+    waktu['pemanasan'] = time.time() - mulai
+    return waktu
+
+def status_model():
+    """Status kesiapan model: STATUS_MEMUAT, STATUS_SIAP atau STATUS_GAGAL"""
+    return _status
+
+def tunggu_model_siap(timeout=None):
+    """Blok sampai persiapan model selesai. Kembalikan False jika timeout atau persiapan gagal"""
+    _persiapan_selesai.wait(timeout)
+    return _model_siap.is_set()
+
+def _pastikan_siap():
+    if _model_siap.is_set():
+        return
+    if _error_persiapan is not None:
+        raise RuntimeError(f"Model gagal dimuat: {_error_persiapan}")
+    raise ServerSibuk("Model belum siap")
+
+def persiapkan_model():
+    """
+    Muat dan panaskan model di thread background sehingga server bisa langsung menerima
+    koneksi. Selama persiapan, deteksi() melempar ServerSibuk (BUSY di protokol v2;
+    server menahan gambar client v1 lewat tunggu_model_siap).
+    Pemanggilan berikutnya tidak melakukan apa-apa.
+    """
+    global _thread_persiapan
+    with _model_lock:
+        if _thread_persiapan is not None:
+            return _thread_persiapan
+        _thread_persiapan = threading.Thread(target=_jalankan_persiapan, name="persiapan-model", daemon=True)
+    print(f"[⏳] Memuat model {MODEL_PATH} di background...")
+    _thread_persiapan.start()
+    return _thread_persiapan
+
+def _jalankan_persiapan():
+    global _status, _error_persiapan
+    mulai = time.time()
+    try:
+        waktu = inferensi.siapkan()
+    except Exception as e:
+        _error_persiapan = e
+        _status = STATUS_GAGAL
+        _persiapan_selesai.set()
+        print(f"[!] Gagal memuat model: {e}")
+        return
+    _status = STATUS_SIAP
+    _model_siap.set()
+    _persiapan_selesai.set()
+    backend = 'stub' if MODE_INFERENSI == 'stub' else BACKEND_INFERENSI
+    print(f"[⏱] Model siap (backend {backend}) dalam {time.time() - mulai:.2f}s - impor: {waktu['impor']:.2f}s, "
+          f"muat: {waktu['muat']:.2f}s, pemanasan ({PEMANASAN_JUMLAH}x): {waktu['pemanasan']:.2f}s")
+
+def _hitung_identitas_model(path):
+    """
+    Identitas model untuk kunci cache hasil: hash isi file bobot + semua pengaturan yang
+    mengubah hasil (kualitas output, imgsz, inferensi tile, backend)
+    """
+    identitas = f"{os.path.basename(path)}:{_hash_file(path)[:16]}:q{KUALITAS_JPEG_HASIL}:s{UKURAN_INPUT_MODEL}"
+    # Hasil gambar besar bergantung pada pengaturan tile; mengubahnya tidak boleh melayani hasil lama
+    if TILE_AKTIF:
+        identitas += (f":t{TILE_AMBANG_PIKSEL}-{TILE_UKURAN}-{TILE_OVERLAP}"
+                      f"-{int(TILE_SERTAKAN_GLOBAL)}-{TILE_NMS_AMBANG}")
+    else:
+        identitas += ":t0"
+    # Backend selain PyTorch bisa sedikit berbeda hasilnya, jangan berbagi entri cache
+    if BACKEND_INFERENSI != 'pytorch':
+        identitas += f":{BACKEND_INFERENSI}"
+    return identitas
+
+_identitas_model = None
+
+def identitas_model():
+    """
+    Identitas model untuk kunci cache, dihitung sekali saat pertama dipakai (bukan saat
+    impor, agar proses worker PoolInferensi tidak ikut meng-hash file bobot)
+    """
+    global _identitas_model
+    if _identitas_model is None:
+        # Mode stub tidak memakai bobot; identitas terpisah agar hasil tiruan tidak tercampur di cache
+        _identitas_model = 'stub' if MODE_INFERENSI == 'stub' else _hitung_identitas_model(MODEL_PATH)
+    return _identitas_model
+
+def _ekstrak_hasil(result):
+    """
+    Ambil label dan rata-rata confidence dari satu objek hasil YOLO.
+    Kembalikan: (list_label, rata_rata_confidence)
+    """
     labels = []
     confidences = []
     for box in result.boxes:
@@ -31,10 +299,382 @@ def jalankan_deteksi(path_input, nama_file):
 
     # Hitung rata-rata confidence
     rata_conf = round(sum(confidences) / len(confidences), 3) if confidences else 0.0
+    return labels, rata_conf
+
+def dekode_gambar(data):
+    """
+    Dekode bytes gambar (JPEG/PNG) langsung dari memori menjadi array BGR.
+    Array yang sudah terdekode dikembalikan apa adanya.
+    """
+    if isinstance(data, np.ndarray):
+        return data
+    gambar = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if gambar is None:
+        raise ValueError("Data gambar tidak valid atau format tidak didukung")
+    return gambar
+
+def enkode_hasil(result):
+    """Render anotasi hasil YOLO dan enkode ke JPEG di memori"""
+    ok, buffer = cv2.imencode(".jpg", result.plot(), [cv2.IMWRITE_JPEG_QUALITY, KUALITAS_JPEG_HASIL])
+    if not ok:
+        raise ValueError("Gagal mengenkode gambar hasil")
+    return buffer.tobytes()
+
+def enkode_deteksi(result):
+    """
+    Enkode hasil YOLO sebagai JSON ringkas tanpa render gambar:
+    {"lebar", "tinggi", "deteksi": [{"label", "kelas", "conf", "kotak": [x1, y1, x2, y2]}]}
+    Koordinat kotak dalam piksel gambar yang diterima server.
+    """
+    tinggi, lebar = result.orig_shape[:2]
+    deteksi = []
+    for box in result.boxes:
+        cls = int(box.cls[0])
+        deteksi.append({
+            'label': model.names[cls],
+            'kelas': cls,
+            'conf': round(float(box.conf[0]), 3),
+            'kotak': [round(float(v), 1) for v in box.xyxy[0]]
+        })
+    return json.dumps({'lebar': lebar, 'tinggi': tinggi, 'deteksi': deteksi}, separators=(',', ':')).encode('utf-8')
+
+def enkode_respon(result, respon=RESPON_GAMBAR):
+    """Enkode hasil sesuai jenis respon yang disepakati dengan client"""
+    if respon == RESPON_DETEKSI:
+        return enkode_deteksi(result)
+    return enkode_hasil(result)
+
+def perlu_tile(gambar):
+    """True jika gambar cukup besar untuk dideteksi per tile"""
+    return TILE_AKTIF and max(gambar.shape[:2]) > TILE_AMBANG_PIKSEL
+
+def _posisi_tile(panjang, ukuran, langkah):
+    if panjang <= ukuran:
+        return [0]
+    posisi = list(range(0, panjang - ukuran, langkah))
+    posisi.append(panjang - ukuran)  # Tile terakhir rata dengan tepi gambar
+    return posisi
+
+def potong_tile(gambar):
+    """
+    Potong gambar menjadi tile TILE_UKURAN yang tumpang tindih TILE_OVERLAP.
+    Kembalikan: list (x0, y0, array_tile); pass global (0, 0, gambar) di depan jika aktif
+    """
+    tinggi, lebar = gambar.shape[:2]
+    langkah = max(1, int(TILE_UKURAN * (1 - TILE_OVERLAP)))
+    potongan = [(0, 0, gambar)] if TILE_SERTAKAN_GLOBAL else []
+    for y0 in _posisi_tile(tinggi, TILE_UKURAN, langkah):
+        for x0 in _posisi_tile(lebar, TILE_UKURAN, langkah):
+            tile = gambar[y0:y0 + TILE_UKURAN, x0:x0 + TILE_UKURAN]
+            potongan.append((x0, y0, np.ascontiguousarray(tile)))
+    return potongan
+
+def _nms_lintas_tile(data):
+    """
+    NMS serakah per kelas atas baris (x1, y1, x2, y2, conf, cls). Dua kotak dianggap sama
+    jika irisannya >= TILE_NMS_AMBANG dari luas kotak yang lebih kecil, sehingga potongan
+    objek di tepi tile ikut tergabung dengan kotak utuhnya dari tile tetangga.
+    Kembalikan: indeks baris yang dipertahankan
+    """
+    luas = (data[:, 2] - data[:, 0]) * (data[:, 3] - data[:, 1])
+    sisa = np.argsort(-data[:, 4])
+    dipertahankan = []
+    while sisa.size:
+        i = sisa[0]
+        dipertahankan.append(i)
+        lain = sisa[1:]
+        lebar_irisan = np.clip(np.minimum(data[i, 2], data[lain, 2]) - np.maximum(data[i, 0], data[lain, 0]), 0, None)
+        tinggi_irisan = np.clip(np.minimum(data[i, 3], data[lain, 3]) - np.maximum(data[i, 1], data[lain, 1]), 0, None)
+        irisan = lebar_irisan * tinggi_irisan
+        rasio = irisan / np.maximum(np.minimum(luas[i], luas[lain]), 1e-6)
+        sama = (rasio >= TILE_NMS_AMBANG) & (data[lain, 5] == data[i, 5])
+        sisa = lain[~sama]
+    return dipertahankan
+
+def gabung_hasil_tile(gambar, potongan, results):
+    """
+    Petakan kotak hasil tiap tile ke koordinat gambar penuh, gabungkan dengan NMS lintas
+    tile, dan kembalikan satu objek hasil YOLO untuk gambar penuh (plot/label seperti biasa)
+    """
+    import torch
+    from ultralytics.engine.results import Results
+
+    semua = []
+    for (x0, y0, _), result in zip(potongan, results):
+        data = result.boxes.data.cpu().numpy().copy()
+        data[:, [0, 2]] += x0
+        data[:, [1, 3]] += y0
+        semua.append(data)
+    data = np.concatenate(semua) if semua else np.zeros((0, 6), dtype=np.float32)
+    if len(data):
+        data = data[_nms_lintas_tile(data)]
+    return Results(gambar, path="", names=results[0].names, boxes=torch.from_numpy(data))
+
+def deteksi_gambar(yolo, gambar):
+    """Deteksi satu gambar terdekode; gambar besar diproses per tile dalam satu batch"""
+    if not perlu_tile(gambar):
+        return prediksi(yolo, gambar)[0]
+    potongan = potong_tile(gambar)
+    return gabung_hasil_tile(gambar, potongan, prediksi(yolo, [tile for _, _, tile in potongan]))
+
+def jalankan_deteksi_bytes(data, respon=RESPON_GAMBAR):
+    """
+    Jalankan deteksi YOLO langsung dari bytes hasil upload tanpa menyentuh disk.
+    Kembalikan: (bytes_hasil, list_label, rata_rata_confidence)
+    """
+    result = deteksi_gambar(muat_model(), dekode_gambar(data))
+    labels, rata_conf = _ekstrak_hasil(result)
+    return enkode_respon(result, respon), labels, rata_conf
+
+def jalankan_deteksi(path_input, nama_file):
+    """
+    Jalankan deteksi YOLO pada file gambar.
+    Simpan hasil ke folder hasil_identifikasi.
+    Kembalikan: (path_output, list_label, rata_rata_confidence)
+    """
+    with open(path_input, "rb") as f:
+        data_hasil, labels, rata_conf = jalankan_deteksi_bytes(f.read())
 
     # Simpan hasil ke file
-    nama_output = f"hasil_{nama_file}"
-    path_output = os.path.join(HASIL_FOLDER, nama_output)
-    result.save(filename=path_output)
+    path_output = os.path.join(HASIL_FOLDER, f"hasil_{nama_file}")
+    with open(path_output, "wb") as f:
+        f.write(data_hasil)
 
     return path_output, labels, rata_conf
+
+def jalankan_deteksi_batch(daftar_gambar):
+    """
+    Jalankan deteksi YOLO untuk beberapa gambar dalam satu forward pass.
+
+    Args:
+        daftar_gambar: list array gambar BGR yang sudah terdekode
+
+    Returns:
+        list objek hasil YOLO, urutan sama dengan input
+    """
+    return prediksi(muat_model(), list(daftar_gambar))
+
+class PenjadwalInferensi:
+    """
+    Mengumpulkan permintaan deteksi dari semua thread client menjadi batch YOLO.
+
+    Satu thread worker mengambil permintaan dari antrian, menunggu paling lama
+    `tunggu_ms` atau sampai `batch_maks` gambar terkumpul, lalu menjalankan satu
+    panggilan YOLO untuk seluruh batch dan mengembalikan hasil ke masing-masing pemanggil.
+    """
+
+    def __init__(self, batch_maks=BATCH_MAKS, tunggu_ms=BATCH_TUNGGU_MS, antrian_maks=ANTRIAN_INFERENSI_MAKS):
+        self.batch_maks = max(1, batch_maks)
+        self.tunggu = tunggu_ms / 1000
+        self.antrian = queue.Queue()
+        self.slot = threading.BoundedSemaphore(antrian_maks)
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def _pastikan_berjalan(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._loop_worker, daemon=True)
+                self.thread.start()
+
+    def deteksi(self, data, respon=RESPON_GAMBAR):
+        """
+        Antrekan satu gambar (bytes upload atau array terdekode) dan tunggu hasil batch-nya.
+        Dekode dan enkode hasil dikerjakan di thread pemanggil agar worker
+        hanya menjalankan forward pass.
+        Kembalikan: (bytes_hasil, list_label, rata_rata_confidence, waktu_antri)
+        Raise ServerSibuk jika antrian sudah penuh atau model belum siap.
+        """
+        _pastikan_siap()
+        if not self.slot.acquire(blocking=False):
+            raise ServerSibuk("Antrian inferensi penuh")
+        try:
+            gambar = dekode_gambar(data)
+            # Tile gambar besar masuk antrian sebagai item terpisah dan ikut di-batch
+            potongan = potong_tile(gambar) if perlu_tile(gambar) else [(0, 0, gambar)]
+
+            self._pastikan_berjalan()
+            futures = []
+            for _, _, bagian in potongan:
+                future = Future()
+                self.antrian.put((bagian, future, time.time()))
+                futures.append(future)
+            keluaran = [future.result() for future in futures]
+        finally:
+            self.slot.release()
+
+        waktu_antri = max(waktu for _, waktu in keluaran)
+        if len(potongan) == 1:
+            result = keluaran[0][0]
+        else:
+            result = gabung_hasil_tile(gambar, potongan, [result for result, _ in keluaran])
+
+        labels, rata_conf = _ekstrak_hasil(result)
+        return enkode_respon(result, respon), labels, rata_conf, waktu_antri
+
+    def siapkan(self):
+        """Muat dan panaskan model di proses server. Kembalikan durasi tiap tahap"""
+        return _siapkan_model()
+
+    def hentikan(self):
+        """Thread worker bersifat daemon, tidak ada yang perlu dibersihkan"""
+
+    def _kumpulkan_batch(self):
+        """Ambil satu batch dari antrian (blocking sampai ada minimal satu permintaan)"""
+        batch = [self.antrian.get()]
+        batas_waktu = time.time() + self.tunggu
+        while len(batch) < self.batch_maks:
+            sisa = batas_waktu - time.time()
+            if sisa <= 0:
+                break
+            try:
+                batch.append(self.antrian.get(timeout=sisa))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop_worker(self):
+        while True:
+            batch = self._kumpulkan_batch()
+            waktu_mulai = time.time()
+            try:
+                results = jalankan_deteksi_batch([gambar for gambar, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future, waktu_masuk), result in zip(batch, results):
+                future.set_result((result, waktu_mulai - waktu_masuk))
+
+def _inisialisasi_worker(jumlah_thread):
+    """Initializer proses worker: batasi thread CPU (model dimuat oleh tugas persiapan)"""
+    import torch
+    torch.set_num_threads(jumlah_thread)
+    cv2.setNumThreads(1)
+
+def _siapkan_di_worker(jumlah_pemanasan):
+    """Dijalankan di proses worker: muat dan panaskan model, kembalikan (pid, durasi tiap tahap)"""
+    return os.getpid(), _siapkan_model(jumlah_pemanasan)
+
+def _deteksi_di_worker(data, respon):
+    """Dijalankan di proses worker. Kembalikan waktu mulai agar waktu antri bisa dihitung"""
+    waktu_mulai = time.time()
+    data_hasil, labels, rata_conf = jalankan_deteksi_bytes(data, respon)
+    return waktu_mulai, data_hasil, labels, rata_conf
+
+class PoolInferensi:
+    """
+    Pool beberapa proses worker; tiap worker memuat model_hama.pt sekali dengan jumlah
+    thread CPU yang dibatasi. Permintaan didistribusikan lewat antrian terbatas, dan
+    ServerSibuk dilempar segera ketika antrian penuh (tidak menunggu tanpa batas).
+    """
+
+    def __init__(self, jumlah_worker=POOL_WORKERS, thread_per_worker=POOL_THREADS_PER_WORKER,
+                 antrian_maks=ANTRIAN_INFERENSI_MAKS):
+        self.jumlah_worker = jumlah_worker
+        self.thread_per_worker = thread_per_worker
+        self.slot = threading.BoundedSemaphore(antrian_maks)
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def _pastikan_berjalan(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.jumlah_worker,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_inisialisasi_worker,
+                    initargs=(self.thread_per_worker,)
+                )
+            return self.executor
+
+    def deteksi(self, data, respon=RESPON_GAMBAR):
+        """
+        Kirim satu gambar ke worker dan tunggu hasilnya.
+        Kembalikan: (bytes_hasil, list_label, rata_rata_confidence, waktu_antri)
+        Raise ServerSibuk jika antrian sudah penuh atau model belum siap.
+        """
+        _pastikan_siap()
+        if not self.slot.acquire(blocking=False):
+            raise ServerSibuk("Antrian inferensi penuh")
+        try:
+            executor = self._pastikan_berjalan()
+            waktu_masuk = time.time()
+            try:
+                waktu_mulai, data_hasil, labels, rata_conf = executor.submit(_deteksi_di_worker, bytes(data), respon).result()
+            except BrokenProcessPool:
+                # Worker mati (mis. kehabisan memori): buat pool baru untuk permintaan berikutnya
+                with self.lock:
+                    if self.executor is executor:
+                        self.executor = None
+                raise
+        finally:
+            self.slot.release()
+        return data_hasil, labels, rata_conf, max(0.0, waktu_mulai - waktu_masuk)
+
+    def siapkan(self):
+        """
+        Jalankan tugas persiapan sebanyak jumlah worker secara bersamaan agar setiap worker
+        memuat dan memanaskan model sebelum menerima gambar (best effort: executor yang
+        memilih worker). Kembalikan durasi tahap terlama di antara worker.
+        """
+        # Ekspor sekali di proses utama agar worker tidak mengekspor artefak yang sama bersamaan
+        ekspor_model()
+        executor = self._pastikan_berjalan()
+        futures = [executor.submit(_siapkan_di_worker, PEMANASAN_JUMLAH) for _ in range(self.jumlah_worker)]
+        hasil = [future.result() for future in futures]
+        print(f"[⏱] {len({pid for pid, _ in hasil})} worker inferensi siap")
+        return {tahap: max(waktu[tahap] for _, waktu in hasil) for tahap in ('impor', 'muat', 'pemanasan')}
+
+    def hentikan(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True, cancel_futures=True)
+                self.executor = None
+
+class DetektorStub:
+    """
+    Pengganti mesin inferensi tanpa YOLO untuk mengukur lapisan jaringan, enkripsi dan
+    log secara terpisah. Gambar dikembalikan apa adanya (respon gambar) atau sebagai
+    JSON tanpa deteksi, setelah jeda tiruan STUB_DETEKSI_MS.
+    """
+
+    def __init__(self, jeda_ms=STUB_DETEKSI_MS, antrian_maks=ANTRIAN_INFERENSI_MAKS):
+        self.jeda = jeda_ms / 1000
+        self.slot = threading.BoundedSemaphore(antrian_maks)
+
+    def deteksi(self, data, respon=RESPON_GAMBAR):
+        """
+        Kembalikan: (bytes_hasil, list_label, rata_rata_confidence, waktu_antri)
+        Raise ServerSibuk jika antrian tiruan sudah penuh atau persiapan belum selesai.
+        """
+        _pastikan_siap()
+        if not self.slot.acquire(blocking=False):
+            raise ServerSibuk("Antrian inferensi penuh")
+        try:
+            if self.jeda:
+                time.sleep(self.jeda)
+        finally:
+            self.slot.release()
+
+        if respon == RESPON_DETEKSI:
+            data_hasil = json.dumps({'lebar': 0, 'tinggi': 0, 'deteksi': []}, separators=(',', ':')).encode('utf-8')
+        else:
+            data_hasil = bytes(data)
+        return data_hasil, [], 0.0, 0.0
+
+    def siapkan(self):
+        return {'impor': 0.0, 'muat': 0.0, 'pemanasan': 0.0}
+
+    def hentikan(self):
+        """Tidak ada thread atau proses yang perlu dihentikan"""
+
+# Mesin inferensi global yang dipakai bersama oleh semua koneksi client.
+# Model tidak dimuat saat impor; panggil persiapkan_model() setelah socket server siap
+if MODE_INFERENSI == 'pool':
+    inferensi = PoolInferensi()
+elif MODE_INFERENSI == 'stub':
+    inferensi = DetektorStub()
+else:
+    inferensi = PenjadwalInferensi()
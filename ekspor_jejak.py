@@ -0,0 +1,45 @@
+"""
+Ekspor jejak upload JagaPadi (logs/jejak_YYYYMMDD.jsonl) ke format trace JSON Chrome/Perfetto.
+
+Buka file hasil di https://ui.perfetto.dev atau chrome://tracing. Setiap upload tampil
+sebagai satu baris di proses 'client' (upload, respon, dekripsi, simpan) dan satu baris
+di proses 'server' (terima, antri, deteksi, enkripsi, kirim).
+
+Contoh:
+    python ekspor_jejak.py logs/jejak_20241015.jsonl --output jejak.json
+    python ekspor_jejak.py logs/jejak_*.jsonl --min-ms 500
+    python ekspor_jejak.py logs/jejak_20241015.jsonl --trace 3f9a0c1d2e4b5a69
+"""
+import sys
+import json
+import argparse
+
+from utils.jejak import baca_jejak, durasi_total, ekspor_chrome
+
+def main():
+    parser = argparse.ArgumentParser(description="Ekspor jejak upload JagaPadi ke Chrome/Perfetto")
+    parser.add_argument('file', nargs='+', help="File JSONL jejak dari folder log server")
+    parser.add_argument('--output', default='jejak_perfetto.json', help="File trace JSON keluaran")
+    parser.add_argument('--trace', nargs='+', help="Hanya trace ID ini")
+    parser.add_argument('--min-ms', type=float, default=0, help="Hanya upload dengan durasi total >= nilai ini")
+    args = parser.parse_args()
+
+    records = [
+        r for r in baca_jejak(args.file)
+        if (not args.trace or r['trace_id'] in args.trace) and durasi_total(r) * 1000 >= args.min_ms
+    ]
+    if not records:
+        print("[!] Tidak ada jejak yang cocok")
+        sys.exit(1)
+    records.sort(key=lambda r: r['waktu'])
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(ekspor_chrome(records), f)
+
+    tanpa_client = sum(1 for r in records if not r.get('client'))
+    print(f"[+] {len(records)} upload diekspor ke {args.output}")
+    if tanpa_client:
+        print(f"[!] {tanpa_client} upload tanpa span client (client lama atau TIME tidak diterima)")
+
+if __name__ == '__main__':
+    main()
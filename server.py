@@ -1,3 +1,4 @@
+import asyncio
 import socket
 import threading
 import os
@@ -9,16 +10,30 @@ import signal
 import sys
 import select
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from deteksi import jalankan_deteksi
+# Titik awal pengukuran waktu startup (sampai socket siap menerima koneksi)
+WAKTU_MULAI_PROSES = time.time()
+
+from deteksi import (
+    inferensi, ServerSibuk, identitas_model, RESPON_GAMBAR, RESPON_DETEKSI,
+    persiapkan_model, status_model, tunggu_model_siap, MODE_INFERENSI, STATUS_MEMUAT, STATUS_SIAP
+)
 from aes_enkripsi import encrypt_AES_CTR
-from utils.logger import tulis_log_txt, tulis_log_csv
+from utils.logger import LogSesi, simpan_agregat
+from utils.cache_hasil import CacheHasil, buat_kunci
+from utils.penulis_arsip import PenulisArsip
+from utils import metrik
+from utils.jejak import UKURAN_ID, PenulisJejak, buat_id_jejak, bytes_ke_id, span_relatif
+from utils.transport import (
+    FRAME_V2, HEADER_V1, PANJANG,
+    atur_buffer_socket, terima_tepat, kirim_bagian, kirim_frame
+)
 
 # Konstanta
 SERVER_IP = '0.0.0.0'
 SERVER_PORT = 12345
-BUFFER_SIZE = 4096
 PASSWORD_HASH = hashlib.sha256(b"jagapadi2024").hexdigest()
 
 # Folder
@@ -27,22 +42,162 @@ FOLDER_HASIL = "hasil_identifikasi"
 FOLDER_CLIPPER = "clipper_file"
 FOLDER_LOG = "logs"
 
-os.makedirs(FOLDER_ORIGINAL, exist_ok=True)
-os.makedirs(FOLDER_HASIL, exist_ok=True)
-os.makedirs(FOLDER_CLIPPER, exist_ok=True)
-os.makedirs(FOLDER_LOG, exist_ok=True)
+# Simpan gambar asli dan hasil deteksi ke disk (di background, di luar jalur latensi)
+SIMPAN_ARSIP = True
+ANTRIAN_ARSIP_MAKS = 64      # Tugas tulis tertunda maksimum; lebih dari ini dibuang
+PENULIS_ARSIP_THREADS = 1    # Thread penulis arsip/clipper/cache disk
+
+# Cache hasil deteksi berdasarkan SHA-256 upload + identitas model
+CACHE_AKTIF = True
+CACHE_MEMORI_MB = 256           # Batas tier memori (LRU)
+CACHE_FOLDER_DISK = "cache_hasil"  # None untuk menonaktifkan tier disk
+CACHE_DISK_MB = 2048            # Batas ukuran folder tier disk
+
+# Mode server: 'thread' (satu thread per koneksi) atau 'async' (satu event loop)
+# Bisa juga dipilih lewat argumen: python server.py --async
+MODE_SERVER = 'thread'
+ASYNC_CPU_WORKERS = 4    # Ukuran executor untuk deteksi + enkripsi di mode asyncio
+ASYNC_BACKLOG = 128      # Antrian koneksi masuk di mode asyncio
+
+# === PROTOKOL v2 (pipelined) ===
+# AUTH  : client v2 mengirim b'AUTH' + >I panjang + "<sha256>;proto=2".
+#         Server membalas b'AUTH_OK' + byte versi + >I panjang + JSON info.
+#         Client lama (tanpa opsi) tetap menerima b'AUTH_OK\x00' dan memakai protokol v1.
+#         Password salah dibalas b'AUTH_NO' + byte versi (0 jika client tidak mengirim opsi),
+#         agar client v2 bisa membedakannya dari server lama yang menolak opsi negosiasi.
+# Frame : >4sII (tag, request_id, panjang_payload) lalu payload.
+#         FILE  client -> server : [trace ID 8 byte jika "jejak=1"] + >I panjang_nama + nama file + data gambar
+#         TIME  client -> server : JSON timing client (tanpa ACK)
+#         HASL  server -> client : nonce + data terenkripsi
+#         EROR  server -> client : pesan error (utf-8)
+#         BUSY  server -> client : JSON {"retry_after_ms": n, "status": status model}; status
+#                                  NOT_READY = model masih dimuat, READY = antrian inferensi penuh
+# Opsi AUTH "respon=deteksi" meminta HASL berisi JSON ringkas (kotak, label, confidence,
+# ukuran gambar) alih-alih JPEG hasil anotasi; info AUTH_OK memuat respon yang disepakati.
+# Info AUTH_OK juga memuat "status" model: NOT_READY selama model dimuat di background
+# (gambar dijawab BUSY), READY setelah model dimuat dan dipanaskan, atau FAILED.
+# Client v1 tidak mendapat status model: gambarnya ditahan sampai model siap (paling lama
+# MODEL_TUNGGU_V1_DETIK, lalu koneksi ditutup). Antrian inferensi penuh pada protokol v1 juga
+# ditunggu (paling lama ANTRIAN_TUNGGU_V1_DETIK, lalu koneksi ditutup): balasan BUSY hanya ada di v2.
+PROTOKOL_MAKS = 2
+MAKS_INFLIGHT = 4        # Jumlah gambar maksimum yang diproses bersamaan per koneksi v2
+PIPELINE_WORKERS = 8     # Thread pemroses frame FILE v2 di mode thread
+BUSY_RETRY_MS = 500      # Saran jeda sebelum client mencoba lagi setelah BUSY
+MODEL_TUNGGU_V1_DETIK = 120  # Batas menahan gambar client v1 selama model masih dimuat
+ANTRIAN_TUNGGU_V1_DETIK = 30  # Batas menahan gambar client v1 selama antrian inferensi penuh
+
+# Tracing per upload: span server (dan span client bila dikirim) ditulis ke logs/jejak_YYYYMMDD.jsonl
+# Opsi AUTH "jejak=1" (v2) membuat frame FILE diawali trace ID 8 byte dari client;
+# client v1 mengirim trace ID di JSON TIMING. Ekspor ke Chrome/Perfetto: python ekspor_jejak.py
+JEJAK_AKTIF = True
+
+# Endpoint metrik Prometheus (GET /metrics); 0 = nonaktif, perintah 'stats' tetap tersedia
+METRIK_HOST = '127.0.0.1'
+METRIK_PORT = 0
 
 # Global variables untuk shutdown
 server_socket = None
 shutdown_flag = False
 active_threads = []
 
+# State mode asyncio (diisi oleh start_server_async)
+async_loop = None
+async_stop_event = None
+cpu_executor = None
+cpu_slot = None
+
+# Layanan bersama (cache hasil, penulis arsip, executor pipeline, metrik) dibuat oleh
+# siapkan_layanan() saat server dijalankan, bukan saat impor: worker PoolInferensi
+# (multiprocessing 'spawn') mengimpor ulang modul ini sebagai __mp_main__ dan tidak boleh
+# ikut memindai cache disk, menjalankan thread penulis atau mendaftarkan metrik
+cache_hasil = None
+penulis_arsip = None
+penulis_jejak = None
+pipeline_executor = None
+server_metrik = None
+
+def siapkan_layanan():
+    """Buat folder, cache hasil, penulis arsip, executor pipeline dan metrik (sekali saja)"""
+    global cache_hasil, penulis_arsip, penulis_jejak, pipeline_executor
+    global m_waktu_terima, m_waktu_antri, m_waktu_deteksi, m_waktu_enkripsi, m_waktu_kirim
+    global m_gambar, m_cache_hit, m_bytes_masuk, m_bytes_keluar, m_koneksi_aktif, m_auth_gagal
+    global m_arsip_dibuang
+    if penulis_arsip is not None:
+        return
+
+    os.makedirs(FOLDER_ORIGINAL, exist_ok=True)
+    os.makedirs(FOLDER_HASIL, exist_ok=True)
+    os.makedirs(FOLDER_CLIPPER, exist_ok=True)
+    os.makedirs(FOLDER_LOG, exist_ok=True)
+
+    cache_hasil = CacheHasil(
+        CACHE_MEMORI_MB * 1024 * 1024,
+        folder_disk=CACHE_FOLDER_DISK,
+        maks_bytes_disk=CACHE_DISK_MB * 1024 * 1024
+    ) if CACHE_AKTIF else None
+
+    # Penulisan arsip, file clipper dan cache disk dikerjakan setelah respons terkirim
+    penulis_arsip = PenulisArsip(ANTRIAN_ARSIP_MAKS, PENULIS_ARSIP_THREADS)
+    # Jejak punya penulis sendiri agar tidak ikut dibuang saat antrian arsip penuh
+    penulis_jejak = PenulisJejak(FOLDER_LOG)
+
+    # Executor bersama untuk permintaan protokol v2 di mode thread
+    pipeline_executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline")
+
+    # Metrik live (lihat utils/metrik.py)
+    m_waktu_terima = metrik.Histogram('jagapadi_waktu_terima_detik', 'Waktu menerima upload dari client')
+    m_waktu_antri = metrik.Histogram('jagapadi_waktu_antri_detik', 'Waktu tunggu di antrian inferensi')
+    m_waktu_deteksi = metrik.Histogram('jagapadi_waktu_deteksi_detik', 'Waktu deteksi YOLO')
+    m_waktu_enkripsi = metrik.Histogram('jagapadi_waktu_enkripsi_detik', 'Waktu enkripsi AES hasil')
+    m_waktu_kirim = metrik.Histogram('jagapadi_waktu_kirim_detik', 'Waktu mengirim hasil ke client')
+    m_gambar = metrik.Counter('jagapadi_gambar_total', 'Jumlah gambar yang selesai diproses')
+    m_cache_hit = metrik.Counter('jagapadi_cache_hit_total', 'Jumlah gambar yang dilayani dari cache hasil')
+    m_bytes_masuk = metrik.Counter('jagapadi_bytes_masuk_total', 'Total byte gambar yang diterima')
+    m_bytes_keluar = metrik.Counter('jagapadi_bytes_keluar_total', 'Total byte hasil terenkripsi yang dikirim')
+    m_koneksi_aktif = metrik.Gauge('jagapadi_koneksi_aktif', 'Jumlah koneksi client yang sedang terbuka')
+    m_auth_gagal = metrik.Counter('jagapadi_auth_gagal_total', 'Jumlah autentikasi yang ditolak')
+    m_arsip_dibuang = metrik.Counter('jagapadi_arsip_dibuang_total', 'Tugas tulis arsip yang dibuang karena antrian penuh')
+
+def simpan_arsip(nama_file_simpan, data_asli, data_hasil, nama_hasil=None):
+    """Simpan gambar asli dan gambar (atau JSON) hasil deteksi ke folder arsip"""
+    with open(os.path.join(FOLDER_ORIGINAL, nama_file_simpan), "wb") as f:
+        f.write(data_asli)
+    with open(os.path.join(FOLDER_HASIL, nama_hasil or f"hasil_{nama_file_simpan}"), "wb") as f:
+        f.write(data_hasil)
+
+def simpan_clipper(nama_file_simpan, nonce, encrypted_data):
+    """Simpan nonce + data terenkripsi (base64) ke folder clipper"""
+    clipper = base64.b64encode(bytes(nonce) + bytes(encrypted_data)).decode()
+    with open(os.path.join(FOLDER_CLIPPER, nama_file_simpan + ".clip"), "w") as f:
+        f.write(clipper)
+
+def jadwalkan_arsip(hasil):
+    """Serahkan tugas tulis milik satu hasil ke penulis arsip (panggil setelah respons dikirim)"""
+    for fungsi, args in hasil['tugas_arsip']:
+        if not penulis_arsip.kirim(fungsi, *args):
+            m_arsip_dibuang.tambah()
+
+def hentikan_penyimpanan():
+    """Flush tugas tulis arsip yang tertunda, snapshot agregat log, lalu cetak statistik arsip"""
+    if penulis_arsip is None or penulis_arsip.berhenti:
+        return
+    penulis_arsip.hentikan()
+    penulis_jejak.tutup()
+    simpan_agregat()
+    stat = penulis_arsip.statistik()
+    print(f"[💾] Arsip - ditulis: {stat['ditulis']}, dibuang: {stat['dibuang']}, gagal: {stat['gagal']}, antrian maks: {stat['kedalaman_maks']}")
+
 def shutdown_server():
     """Fungsi untuk shutdown server secara manual"""
     global shutdown_flag, server_socket
     print("\n[!] Memulai shutdown server...")
     shutdown_flag = True
     
+    if async_loop is not None:
+        # Mode asyncio: cukup bangunkan event loop, semua koneksi dibatalkan sekaligus
+        async_loop.call_soon_threadsafe(async_stop_event.set)
+        return
+    
     if server_socket:
         try:
             server_socket.close()
@@ -56,6 +211,11 @@ def shutdown_server():
         if thread.is_alive():
             thread.join(timeout=5)
     
+    # Pastikan semua arsip yang tertunda selesai ditulis
+    if pipeline_executor is not None:
+        pipeline_executor.shutdown(wait=True)
+    inferensi.hentikan()
+    hentikan_penyimpanan()
     print("[!] Server berhasil shutdown")
 
 def signal_handler(signum, frame):
@@ -68,7 +228,7 @@ def monitor_terminal_input():
     """Thread untuk memantau input terminal"""
     global shutdown_flag
     print("[+] Thread monitor terminal dimulai")
-    print("[+] Ketik 'shutdown' atau 'exit' untuk menghentikan server")
+    print("[+] Ketik 'shutdown' atau 'exit' untuk menghentikan server, 'stats' untuk metrik")
     
     while not shutdown_flag:
         try:
@@ -80,6 +240,9 @@ def monitor_terminal_input():
                         print(f"[!] Perintah '{command}' diterima")
                         shutdown_server()
                         break
+                    elif command == 'stats':
+                        print(f"Status model: {status_model()}")
+                        print(metrik.ringkasan_teks())
             else:
                 # Untuk Windows, gunakan pendekatan yang berbeda
                 import msvcrt
@@ -89,6 +252,9 @@ def monitor_terminal_input():
                         print(f"[!] Perintah '{command}' diterima")
                         shutdown_server()
                         break
+                    elif command == 'stats':
+                        print(f"Status model: {status_model()}")
+                        print(metrik.ringkasan_teks())
                 time.sleep(0.5)
         except:
             # Jika ada error dalam membaca input, lanjutkan
@@ -107,15 +273,15 @@ def receive_client_timing_data(conn):
         conn.settimeout(2.0)
         
         # Baca header TIMING
-        header = conn.recv(6)  # "TIMING"
+        header = terima_tepat(conn, 6)  # "TIMING"
         if header != b'TIMING':
             return None
         
         # Baca panjang data JSON
-        json_len = struct.unpack('>I', conn.recv(4))[0]
+        json_len = PANJANG.unpack(terima_tepat(conn, PANJANG.size))[0]
         
         # Baca data JSON
-        json_data = conn.recv(json_len).decode('utf-8')
+        json_data = terima_tepat(conn, json_len).decode('utf-8')
         timing_data = json.loads(json_data)
         
         # Kirim acknowledgment
@@ -123,169 +289,448 @@ def receive_client_timing_data(conn):
         
         return timing_data
         
-    except (socket.timeout, json.JSONDecodeError, struct.error):
+    except (socket.timeout, json.JSONDecodeError, struct.error, ConnectionError):
         return None
     except Exception as e:
         print(f"[!] Error menerima timing data: {e}")
         return None
 
+def parse_auth(payload):
+    """
+    Pisahkan hash password dan opsi negosiasi dari payload AUTH.
+    Format: "<sha256>" (v1) atau "<sha256>;proto=2;kunci=nilai" (v2)
+    
+    Returns:
+        tuple: (password_hash, dict opsi)
+    """
+    bagian = payload.decode().split(';')
+    opsi = {}
+    for item in bagian[1:]:
+        kunci, _, nilai = item.partition('=')
+        opsi[kunci.strip()] = nilai.strip()
+    return bagian[0], opsi
+
+def versi_disepakati(opsi):
+    """Versi protokol yang diminta client lewat opsi "proto", dibatasi ke PROTOKOL_MAKS"""
+    try:
+        diminta = int(opsi['proto'])
+    except ValueError:
+        diminta = 1
+    return max(1, min(diminta, PROTOKOL_MAKS))
+
+def balasan_auth(opsi):
+    """
+    Susun balasan AUTH_OK sesuai versi protokol dan jenis respon yang disepakati.
+    Respon ringkas hanya tersedia di protokol v2 karena butuh info balasan untuk konfirmasi.
+    
+    Returns:
+        tuple: (bytes balasan, versi protokol, jenis respon, trace ID di frame FILE)
+    """
+    if 'proto' not in opsi:
+        return b'AUTH_OK\x00', 1, RESPON_GAMBAR, False
+
+    versi = versi_disepakati(opsi)
+    respon = RESPON_DETEKSI if versi >= 2 and opsi.get('respon') == RESPON_DETEKSI else RESPON_GAMBAR
+    jejak = versi >= 2 and opsi.get('jejak') == '1'
+
+    info = json.dumps({
+        'proto': versi, 'max_inflight': MAKS_INFLIGHT, 'respon': respon, 'status': status_model(),
+        'jejak': jejak
+    }).encode('utf-8')
+    return b'AUTH_OK' + bytes([versi]) + PANJANG.pack(len(info)) + info, versi, respon, jejak
+
+def balasan_auth_ditolak(opsi):
+    """Balasan AUTH_NO; byte terakhir = versi yang akan disepakati (0 untuk client v1)"""
+    if 'proto' not in opsi:
+        return b'AUTH_NO\x00'
+    return b'AUTH_NO' + bytes([versi_disepakati(opsi)])
+
+class SesiPipeline:
+    """
+    Mencocokkan hasil yang sudah dikirim dengan frame TIME dari client (protokol v2)
+    berdasarkan request ID, lalu mencatat entri log per file.
+    """
+
+    def __init__(self, log_data):
+        self.log_data = log_data
+        self.lock = threading.Lock()
+        self.terkirim = {}
+        self.timing = {}
+
+    def hasil_terkirim(self, request_id, info):
+        """info: (filename, ukuran_asli, hasil, waktu_terima, waktu_kirim)"""
+        with self.lock:
+            if request_id in self.timing:
+                self._catat(info, self.timing.pop(request_id))
+            else:
+                self.terkirim[request_id] = info
+
+    def timing_diterima(self, request_id, client_timing):
+        with self.lock:
+            if request_id in self.terkirim:
+                self._catat(self.terkirim.pop(request_id), client_timing)
+            else:
+                self.timing[request_id] = client_timing
+
+    def tutup(self):
+        """Catat hasil yang tidak sempat menerima TIME dari client"""
+        with self.lock:
+            for info in self.terkirim.values():
+                self._catat(info, None)
+            self.terkirim.clear()
+            self.timing.clear()
+
+    def _catat(self, info, client_timing):
+        filename, ukuran_asli, hasil, waktu_terima, waktu_kirim = info
+        self.log_data['log'].tambah(
+            buat_file_log(filename, ukuran_asli, hasil, waktu_terima, waktu_kirim, client_timing)
+        )
+        catat_jejak(self.log_data['ip'], filename, hasil, client_timing)
+
+def info_busy():
+    """Payload frame BUSY protokol v2; status NOT_READY = model masih dimuat, bukan antrian penuh"""
+    return json.dumps({'retry_after_ms': BUSY_RETRY_MS, 'status': status_model()}).encode('utf-8')
+
+def pecah_payload_file(payload, jejak=False):
+    """
+    Pisahkan payload frame FILE menjadi (trace ID, filename, data gambar).
+    Jika `jejak` disepakati saat AUTH, payload diawali trace ID UKURAN_ID byte;
+    tanpa itu trace ID bernilai None. Data gambar dikembalikan sebagai memoryview
+    agar tidak disalin ulang.
+    """
+    trace_id = None
+    awal = 0
+    if jejak:
+        trace_id = bytes_ke_id(payload[:UKURAN_ID])
+        awal = UKURAN_ID
+    filename_len = PANJANG.unpack_from(payload, awal)[0]
+    awal_nama = awal + PANJANG.size
+    awal_data = awal_nama + filename_len
+    filename = bytes(payload[awal_nama:awal_data]).decode()
+    return trace_id, filename, memoryview(payload)[awal_data:]
+
+def proses_gambar(filename, file_data, respon=RESPON_GAMBAR):
+    """
+    Pipeline CPU untuk satu gambar: deteksi YOLO dan enkripsi.
+    `respon` menentukan isi hasil: JPEG anotasi (RESPON_GAMBAR) atau JSON ringkas (RESPON_DETEKSI).
+    Dipakai bersama oleh mode thread dan mode asyncio. Penulisan ke disk tidak
+    dilakukan di sini, melainkan dikumpulkan di 'tugas_arsip' untuk jadwalkan_arsip().
+
+    Returns:
+        dict: data hasil terenkripsi beserta label, timing server, span (jam monotonic) dan tugas arsip
+    """
+    nama_file_simpan = f"{int(time.time())}_{filename}"
+    tugas_arsip = []
+    span = {}
+
+    entri_cache = None
+    if cache_hasil is not None:
+        identitas = identitas_model() if respon == RESPON_GAMBAR else f"{identitas_model()}:{respon}"
+        kunci_cache = buat_kunci(file_data, identitas)
+        entri_cache = cache_hasil.ambil(kunci_cache)
+
+    if entri_cache is not None:
+        # Cache hit: lewati YOLO, hanya enkripsi ulang dengan nonce baru
+        data_hasil = entri_cache['data_hasil']
+        labels = entri_cache['labels']
+        rata_conf = entri_cache['confidence']
+        waktu_antri = 0.0
+        waktu_deteksi = 0.0
+    else:
+        # === TIMING: Mulai deteksi YOLO (di memori, lewat mesin inferensi) ===
+        start_deteksi = time.perf_counter()
+        data_hasil, labels, rata_conf, waktu_antri = inferensi.deteksi(file_data, respon)
+        selesai_deteksi = time.perf_counter()
+        waktu_deteksi = selesai_deteksi - start_deteksi - waktu_antri
+        span['antri'] = (start_deteksi, start_deteksi + waktu_antri)
+        span['deteksi'] = (start_deteksi + waktu_antri, selesai_deteksi)
+
+        if cache_hasil is not None:
+            entri_cache_baru = {'labels': labels, 'confidence': rata_conf, 'data_hasil': data_hasil}
+            cache_hasil.simpan(kunci_cache, entri_cache_baru)
+            if CACHE_FOLDER_DISK:
+                tugas_arsip.append((cache_hasil.simpan_disk, (kunci_cache, entri_cache_baru)))
+
+    if SIMPAN_ARSIP:
+        nama_hasil = f"hasil_{nama_file_simpan}" + (".json" if respon == RESPON_DETEKSI else "")
+        tugas_arsip.append((simpan_arsip, (nama_file_simpan, file_data, data_hasil, nama_hasil)))
+
+    # === TIMING: Mulai enkripsi ===
+    start_enkripsi = time.perf_counter()
+    encrypted_data, nonce = encrypt_AES_CTR(data_hasil)
+    selesai_enkripsi = time.perf_counter()
+    waktu_enkripsi = selesai_enkripsi - start_enkripsi
+    span['enkripsi'] = (start_enkripsi, selesai_enkripsi)
+
+    tugas_arsip.append((simpan_clipper, (nama_file_simpan, nonce, encrypted_data)))
+
+    # nonce dan ciphertext disimpan terpisah agar bisa dikirim scatter-gather
+    return {
+        'nonce': nonce,
+        'encrypted_data': encrypted_data,
+        'ukuran_hasil': len(nonce) + len(encrypted_data),
+        'cache_hit': entri_cache is not None,
+        'labels': labels,
+        'confidence': rata_conf,
+        'waktu_deteksi': waktu_deteksi,
+        'waktu_antri': waktu_antri,
+        'waktu_enkripsi': waktu_enkripsi,
+        'span': span,
+        'tugas_arsip': tugas_arsip
+    }
+
+def buat_file_log(filename, ukuran_asli, hasil, waktu_terima, waktu_kirim, client_timing):
+    """
+    Susun entri log per file dengan data komunikasi lengkap + timing client,
+    lalu cetak ringkasan satu baris ke terminal.
+    """
+    ukuran_asli_kb = ukuran_asli / 1024
+    ukuran_enc_kb = hasil['ukuran_hasil'] / 1024
+    waktu_deteksi = hasil['waktu_deteksi']
+    waktu_antri = hasil['waktu_antri']
+    waktu_enkripsi = hasil['waktu_enkripsi']
+
+    # Metrik live
+    m_waktu_terima.catat(waktu_terima)
+    m_waktu_antri.catat(waktu_antri)
+    m_waktu_deteksi.catat(waktu_deteksi)
+    m_waktu_enkripsi.catat(waktu_enkripsi)
+    m_waktu_kirim.catat(waktu_kirim)
+    m_gambar.tambah()
+    m_bytes_masuk.tambah(ukuran_asli)
+    m_bytes_keluar.tambah(hasil['ukuran_hasil'])
+    if hasil['cache_hit']:
+        m_cache_hit.tambah()
+
+    # Hitung kecepatan transfer
+    kecepatan_terima = ukuran_asli_kb / waktu_terima if waktu_terima > 0 else 0
+    kecepatan_kirim = ukuran_enc_kb / waktu_kirim if waktu_kirim > 0 else 0
+
+    file_log_entry = {
+        'filename': filename,
+        'labels': hasil['labels'],
+        'size_ori': ukuran_asli_kb,
+        'size_enc': ukuran_enc_kb,
+        'waktu_terima': round(waktu_terima, 4),
+        'waktu_deteksi': round(waktu_deteksi, 4),
+        'waktu_antri': round(waktu_antri, 4),
+        'waktu_enkripsi': round(waktu_enkripsi, 4),
+        'waktu_kirim': round(waktu_kirim, 4),
+        'kecepatan_terima': round(kecepatan_terima, 1),
+        'kecepatan_kirim': round(kecepatan_kirim, 1),
+        'confidence': hasil['confidence'],
+        'cache_hit': hasil['cache_hit']
+    }
+    penanda_cache = " [cache]" if hasil['cache_hit'] else ""
+
+    # Tambahkan data timing dari client jika tersedia
+    if client_timing:
+        file_log_entry.update({
+            'waktu_dekripsi_client': client_timing.get('waktu_dekripsi_client', 0),
+            'ukuran_hasil_client_kb': client_timing.get('ukuran_hasil_kb', 0),
+            'waktu_simpan_client': client_timing.get('waktu_simpan_client', 0)
+        })
+        
+        print(f"[📊] {filename}{penanda_cache} - Server: Terima {waktu_terima:.3f}s, Antri {waktu_antri:.3f}s, Deteksi {waktu_deteksi:.3f}s, Enkripsi {waktu_enkripsi:.4f}s, Kirim {waktu_kirim:.3f}s | Client: Dekripsi {client_timing.get('waktu_dekripsi_client', 0):.4f}s, Simpan {client_timing.get('waktu_simpan_client', 0):.4f}s")
+    else:
+        # Data default jika client timing tidak tersedia
+        file_log_entry.update({
+            'waktu_dekripsi_client': 0,
+            'ukuran_hasil_client_kb': 0,
+            'waktu_simpan_client': 0
+        })
+        
+        print(f"[📊] {filename}{penanda_cache} - Terima: {waktu_terima:.3f}s, Antri: {waktu_antri:.3f}s, Deteksi: {waktu_deteksi:.3f}s, Enkripsi: {waktu_enkripsi:.4f}s, Kirim: {waktu_kirim:.3f}s [Client timing: N/A]")
+
+    return file_log_entry
+
+def catat_jejak(client_ip, filename, hasil, client_timing):
+    """
+    Gabungkan span server dan span client (dari TIME/TIMING) satu upload menjadi satu
+    record jejak, lalu tambahkan ke file JSONL harian lewat penulis_jejak (satu write per record).
+    Span server relatif terhadap awal terima, span client relatif terhadap awal upload.
+    """
+    span = hasil.get('span')
+    if not JEJAK_AKTIF or not span or 'terima' not in span:
+        return
+    client_timing = client_timing or {}
+    awal = span['terima'][0]
+    record = {
+        'trace_id': hasil.get('trace_id') or client_timing.get('trace_id') or buat_id_jejak(),
+        'filename': filename,
+        'client_ip': client_ip,
+        'waktu': round(time.time() - (time.perf_counter() - awal), 6),
+        'cache_hit': hasil['cache_hit'],
+        'server': span_relatif(span, awal),
+        'client': client_timing.get('span') or {}
+    }
+    penulis_jejak.tulis(record)
+
+def tutup_sesi(log_data):
+    """Tulis log session saat client disconnect, kembalikan durasi koneksi"""
+    waktu_disc = datetime.now()
+    durasi = (waktu_disc - log_data['connect_time']).total_seconds()
+    
+    # Flush sisa baris dan susun log session (hanya ditulis jika ada aktivitas)
+    jumlah_file = log_data['log'].tutup(waktu_disc, durasi)
+    if jumlah_file:
+        print(f"[📝] Log session disimpan untuk {log_data['ip']} - {jumlah_file} file")
+        if cache_hasil is not None:
+            stat = cache_hasil.statistik()
+            print(f"[💾] Cache hasil - hit memori: {stat['hit_memori']}, hit disk: {stat['hit_disk']}, miss: {stat['miss']} (hit rate {stat['hit_rate'] * 100:.1f}%)")
+        stat = penulis_arsip.statistik()
+        print(f"[💾] Antrian arsip - tertunda: {stat['kedalaman']}, ditulis: {stat['ditulis']}, dibuang: {stat['dibuang']}")
+    return durasi
+
+def tunggu_model_v1(filename):
+    """
+    Tahan gambar client v1 sampai model siap (paling lama MODEL_TUNGGU_V1_DETIK), karena
+    client v1 lama tidak bisa membedakan balasan BUSY dari hasil kosong.
+    Kembalikan False jika model gagal dimuat, batas waktu habis atau server shutdown.
+    """
+    if status_model() == STATUS_SIAP:
+        return True
+    print(f"[⏳] {filename} - model belum siap, client v1 ditahan sampai siap")
+    batas = time.monotonic() + MODEL_TUNGGU_V1_DETIK
+    while not shutdown_flag and status_model() == STATUS_MEMUAT and time.monotonic() < batas:
+        tunggu_model_siap(0.5)
+    return status_model() == STATUS_SIAP
+
+async def tunggu_model_v1_async(filename):
+    """Versi asyncio dari tunggu_model_v1, tanpa menahan thread executor"""
+    if status_model() == STATUS_SIAP:
+        return True
+    print(f"[⏳] {filename} - model belum siap, client v1 ditahan sampai siap")
+    batas = time.monotonic() + MODEL_TUNGGU_V1_DETIK
+    while status_model() == STATUS_MEMUAT and time.monotonic() < batas:
+        await asyncio.sleep(0.5)
+    return status_model() == STATUS_SIAP
+
+def proses_gambar_v1(filename, file_data):
+    """
+    proses_gambar untuk client v1: antrian inferensi penuh ditunggu (dicoba lagi setiap
+    BUSY_RETRY_MS, paling lama ANTRIAN_TUNGGU_V1_DETIK) karena client v1 lama membaca hasil
+    kosong sebagai gambar yang berhasil. ServerSibuk diteruskan jika batas waktu habis.
+    """
+    batas = time.monotonic() + ANTRIAN_TUNGGU_V1_DETIK
+    while True:
+        try:
+            return proses_gambar(filename, file_data)
+        except ServerSibuk:
+            if shutdown_flag or time.monotonic() >= batas:
+                raise
+            time.sleep(BUSY_RETRY_MS / 1000)
+
+async def proses_gambar_v1_async(filename, file_data):
+    """Versi asyncio dari proses_gambar_v1; jeda antar percobaan tidak menahan slot executor"""
+    loop = asyncio.get_running_loop()
+    batas = time.monotonic() + ANTRIAN_TUNGGU_V1_DETIK
+    while True:
+        try:
+            async with cpu_slot:
+                return await loop.run_in_executor(cpu_executor, proses_gambar, filename, file_data)
+        except ServerSibuk:
+            if time.monotonic() >= batas:
+                raise
+            await asyncio.sleep(BUSY_RETRY_MS / 1000)
+
 def handle_client(conn, addr):
     global active_threads
     client_ip = addr[0]
-    waktu_connect = datetime.now()
+    connect_time = datetime.now()
     log_data = {
         'ip': client_ip,
-        'connect_time': waktu_connect,
-        'file_logs': []
+        'connect_time': connect_time,
+        'log': LogSesi(client_ip, connect_time, folder=FOLDER_LOG)
     }
 
     print(f"[+] Koneksi dari {client_ip}")
+    m_koneksi_aktif.tambah()
     try:
         # Autentikasi
-        header = conn.recv(4)
+        header = terima_tepat(conn, 4)
         if header != b'AUTH':
+            m_auth_gagal.tambah()
             conn.close()
             return
 
-        panjang_pw = struct.unpack('>I', conn.recv(4))[0]
-        password_hash = conn.recv(panjang_pw).decode()
+        panjang_pw = PANJANG.unpack(terima_tepat(conn, PANJANG.size))[0]
+        password_hash, opsi = parse_auth(terima_tepat(conn, panjang_pw))
         if password_hash != PASSWORD_HASH:
-            conn.sendall(b'AUTH_NO\x00')
+            m_auth_gagal.tambah()
+            conn.sendall(balasan_auth_ditolak(opsi))
             conn.close()
             return
-        conn.sendall(b'AUTH_OK\x00')
+        balasan, versi, respon, jejak = balasan_auth(opsi)
+        conn.sendall(balasan)
 
+        if versi >= 2:
+            layani_pipeline(conn, log_data, respon, jejak)
+            return
+
+        berhenti = lambda: shutdown_flag
         while not shutdown_flag:  # Cek shutdown flag
             # Set timeout untuk recv agar tidak blocking selamanya
             conn.settimeout(1.0)
             try:
-                header_data = conn.recv(8)
-            except socket.timeout:
-                continue  # Coba lagi jika timeout
-            except:
-                break  # Koneksi terputus
-            
-            if not header_data:
-                break
+                header_data = terima_tepat(conn, HEADER_V1.size, berhenti)
+            except (ConnectionError, OSError):
+                break  # Koneksi terputus atau server shutdown
 
             # === TIMING: Mulai menerima data ===
-            waktu_mulai_terima = time.time()
-            
-            filename_len, data_len = struct.unpack('>II', header_data)
-            filename = conn.recv(filename_len).decode()
+            waktu_mulai_terima = time.perf_counter()
             
-            file_data = b''
-            while len(file_data) < data_len and not shutdown_flag:
-                try:
-                    chunk = conn.recv(min(BUFFER_SIZE, data_len - len(file_data)))
-                    if not chunk:
-                        break
-                    file_data += chunk
-                except socket.timeout:
-                    continue
-                except:
-                    break
+            filename_len, data_len = HEADER_V1.unpack(header_data)
+            try:
+                filename = terima_tepat(conn, filename_len, berhenti).decode()
+                file_data = terima_tepat(conn, data_len, berhenti)
+            except (ConnectionError, OSError):
+                break
 
             # === TIMING: Selesai menerima data ===
-            waktu_selesai_terima = time.time()
-            waktu_terima = waktu_selesai_terima - waktu_mulai_terima
+            waktu_terima = time.perf_counter() - waktu_mulai_terima
 
-            if shutdown_flag:
+            if not tunggu_model_v1(filename):
+                print(f"[!] {filename} - model tidak siap ({status_model()}), koneksi v1 ditutup")
                 break
 
-            # Simpan file asli
-            waktu_file = time.time()
-            nama_file_simpan = f"{int(waktu_file)}_{filename}"
-            path_asli = os.path.join(FOLDER_ORIGINAL, nama_file_simpan)
-            with open(path_asli, "wb") as f:
-                f.write(file_data)
-            ukuran_asli_kb = len(file_data) / 1024
-
-            # === TIMING: Mulai deteksi YOLO ===
-            start_deteksi = time.time()
-            path_hasil, labels, rata_conf = jalankan_deteksi(path_asli, nama_file_simpan)
-            waktu_deteksi = time.time() - start_deteksi
-
-            # === TIMING: Mulai enkripsi ===
-            with open(path_hasil, "rb") as f:
-                data_hasil = f.read()
-            start_enkripsi = time.time()
-            encrypted_data, nonce = encrypt_AES_CTR(data_hasil)
-            waktu_enkripsi = time.time() - start_enkripsi
-
-            full_data = nonce + encrypted_data
-            clipper = base64.b64encode(full_data).decode()
-            with open(os.path.join(FOLDER_CLIPPER, nama_file_simpan + ".clip"), "w") as f:
-                f.write(clipper)
+            try:
+                hasil = proses_gambar_v1(filename, file_data)
+            except ServerSibuk as e:
+                # Client v1 tidak mengenal BUSY: tutup koneksi agar client melihat error, bukan hasil kosong
+                print(f"[!] {filename} - {e} selama {ANTRIAN_TUNGGU_V1_DETIK}s, koneksi v1 ditutup")
+                break
 
             # === TIMING: Mulai mengirim data ===
-            waktu_mulai_kirim = time.time()
+            waktu_mulai_kirim = time.perf_counter()
             
             try:
-                conn.sendall(struct.pack('>I', len(full_data)))
-                conn.sendall(full_data)
+                kirim_bagian(conn, PANJANG.pack(hasil['ukuran_hasil']), hasil['nonce'], hasil['encrypted_data'])
             except:
                 break  # Koneksi terputus
+            finally:
+                jadwalkan_arsip(hasil)
 
             # === TIMING: Selesai mengirim data ===
-            waktu_selesai_kirim = time.time()
-            waktu_kirim = waktu_selesai_kirim - waktu_mulai_kirim
+            waktu_kirim = time.perf_counter() - waktu_mulai_kirim
+
+            hasil['span']['terima'] = (waktu_mulai_terima, waktu_mulai_terima + waktu_terima)
+            hasil['span']['kirim'] = (waktu_mulai_kirim, waktu_mulai_kirim + waktu_kirim)
 
             # === TERIMA DATA TIMING DEKRIPSI DARI CLIENT ===
             client_timing = receive_client_timing_data(conn)
 
-            # Hitung kecepatan transfer
-            kecepatan_terima = ukuran_asli_kb / waktu_terima if waktu_terima > 0 else 0
-            kecepatan_kirim = (len(full_data) / 1024) / waktu_kirim if waktu_kirim > 0 else 0
-
-            # Logging per file dengan data komunikasi lengkap + timing client
-            file_log_entry = {
-                'filename': filename,
-                'labels': labels,
-                'size_ori': ukuran_asli_kb,
-                'size_enc': len(full_data) / 1024,
-                'waktu_terima': round(waktu_terima, 4),
-                'waktu_deteksi': round(waktu_deteksi, 4),
-                'waktu_enkripsi': round(waktu_enkripsi, 4),
-                'waktu_kirim': round(waktu_kirim, 4),
-                'kecepatan_terima': round(kecepatan_terima, 1),
-                'kecepatan_kirim': round(kecepatan_kirim, 1),
-                'confidence': rata_conf
-            }
-
-            # Tambahkan data timing dari client jika tersedia
-            if client_timing:
-                file_log_entry.update({
-                    'waktu_dekripsi_client': client_timing.get('waktu_dekripsi_client', 0),
-                    'ukuran_hasil_client_kb': client_timing.get('ukuran_hasil_kb', 0),
-                    'waktu_simpan_client': client_timing.get('waktu_simpan_client', 0)
-                })
-                
-                print(f"[📊] {filename} - Server: Terima {waktu_terima:.3f}s, Deteksi {waktu_deteksi:.3f}s, Enkripsi {waktu_enkripsi:.4f}s, Kirim {waktu_kirim:.3f}s | Client: Dekripsi {client_timing.get('waktu_dekripsi_client', 0):.4f}s, Simpan {client_timing.get('waktu_simpan_client', 0):.4f}s")
-            else:
-                # Data default jika client timing tidak tersedia
-                file_log_entry.update({
-                    'waktu_dekripsi_client': 0,
-                    'ukuran_hasil_client_kb': 0,
-                    'waktu_simpan_client': 0
-                })
-                
-                print(f"[📊] {filename} - Terima: {waktu_terima:.3f}s, Deteksi: {waktu_deteksi:.3f}s, Enkripsi: {waktu_enkripsi:.4f}s, Kirim: {waktu_kirim:.3f}s [Client timing: N/A]")
-
-            log_data['file_logs'].append(file_log_entry)
+            log_data['log'].tambah(
+                buat_file_log(filename, len(file_data), hasil, waktu_terima, waktu_kirim, client_timing)
+            )
+            catat_jejak(client_ip, filename, hasil, client_timing)
 
     except Exception as e:
         if not shutdown_flag:  # Jangan print error saat shutdown
             print(f"[!] Error dengan {client_ip}: {e}")
     finally:
-        waktu_disc = datetime.now()
-        durasi = (waktu_disc - waktu_connect).total_seconds()
-        
-        # Tulis log lengkap
-        if log_data['file_logs']:  # Hanya tulis log jika ada aktivitas
-            tulis_log_txt(log_data, waktu_disc, durasi)
-            tulis_log_csv(log_data)
-            print(f"[📝] Log session disimpan untuk {client_ip} - {len(log_data['file_logs'])} file")
+        m_koneksi_aktif.kurang()
+        durasi = tutup_sesi(log_data)
         
         conn.close()
         print(f"[-] Koneksi ditutup: {client_ip} (durasi: {durasi:.1f}s)")
@@ -295,6 +740,119 @@ def handle_client(conn, addr):
         if current_thread in active_threads:
             active_threads.remove(current_thread)
 
+def kirim_frame_aman(conn, send_lock, tag, request_id, *payload):
+    """Kirim satu frame protokol v2; send_lock mencegah frame dari thread lain bercampur"""
+    with send_lock:
+        kirim_frame(conn, tag, request_id, *payload)
+
+def layani_pipeline(conn, log_data, respon=RESPON_GAMBAR, jejak=False):
+    """
+    Loop protokol v2 di mode thread. Frame FILE diproses paralel di pipeline_executor
+    (maksimal MAKS_INFLIGHT per koneksi) dan hasilnya dikirim begitu siap, ditandai
+    request ID, sementara thread ini terus membaca frame berikutnya.
+    """
+    sesi = SesiPipeline(log_data)
+    send_lock = threading.Lock()
+    slot = threading.BoundedSemaphore(MAKS_INFLIGHT)
+    futures = []
+
+    def kerjakan(request_id, trace_id, filename, file_data, terima):
+        hasil = None
+        try:
+            hasil = proses_gambar(filename, file_data, respon)
+
+            # === TIMING: Kirim hasil ===
+            waktu_mulai_kirim = time.perf_counter()
+            kirim_frame_aman(conn, send_lock, b'HASL', request_id, hasil['nonce'], hasil['encrypted_data'])
+            waktu_kirim = time.perf_counter() - waktu_mulai_kirim
+
+            hasil['trace_id'] = trace_id
+            hasil['span']['terima'] = terima
+            hasil['span']['kirim'] = (waktu_mulai_kirim, waktu_mulai_kirim + waktu_kirim)
+            sesi.hasil_terkirim(request_id, (filename, len(file_data), hasil, terima[1] - terima[0], waktu_kirim))
+        except ServerSibuk as e:
+            print(f"[⏳] {filename} - {e}, client diminta mencoba lagi")
+            try:
+                kirim_frame_aman(conn, send_lock, b'BUSY', request_id, info_busy())
+            except Exception:
+                pass
+        except Exception as e:
+            if not shutdown_flag:
+                print(f"[!] Gagal memproses {filename} (request {request_id}): {e}")
+            try:
+                kirim_frame_aman(conn, send_lock, b'EROR', request_id, str(e).encode('utf-8'))
+            except Exception:
+                pass
+        finally:
+            if hasil is not None:
+                jadwalkan_arsip(hasil)
+            slot.release()
+
+    berhenti = lambda: shutdown_flag
+    try:
+        while not shutdown_flag:
+            conn.settimeout(1.0)
+            tag, request_id, panjang = FRAME_V2.unpack(terima_tepat(conn, FRAME_V2.size, berhenti))
+
+            # === TIMING: Mulai menerima data ===
+            waktu_mulai_terima = time.perf_counter()
+            payload = terima_tepat(conn, panjang, berhenti)
+
+            if tag == b'FILE':
+                terima = (waktu_mulai_terima, time.perf_counter())
+                trace_id, filename, file_data = pecah_payload_file(payload, jejak)
+
+                # Backpressure: berhenti membaca jika sudah MAKS_INFLIGHT gambar diproses
+                slot.acquire()
+                futures.append(pipeline_executor.submit(kerjakan, request_id, trace_id, filename, file_data, terima))
+                futures = [f for f in futures if not f.done()]
+            elif tag == b'TIME':
+                sesi.timing_diterima(request_id, json.loads(payload.decode('utf-8')))
+            else:
+                print(f"[!] Frame tidak dikenal dari {log_data['ip']}: {tag!r}")
+                break
+    except (ConnectionError, OSError):
+        pass  # Koneksi terputus
+    finally:
+        # Tunggu permintaan yang masih diproses sebelum sesi ditutup
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                pass
+        sesi.tutup()
+
+def cetak_banner(mode):
+    print("=" * 70)
+    print("🌾 PESTDETECT SERVER v2.1 - Enhanced with Client Decryption Timing")
+    print("=" * 70)
+    print(f"[+] Server aktif di {SERVER_IP}:{SERVER_PORT}")
+    print(f"[+] Mode server: {mode}")
+    if MODE_INFERENSI == 'stub':
+        print("[!] Mode stub deteksi: YOLO tidak dijalankan, hanya untuk uji beban")
+    print(f"[+] Folder log: {FOLDER_LOG}")
+    print(f"[+] Password: jagapadi2024")
+    print("[+] FITUR BARU: Pencatatan waktu dekripsi dari client")
+    print("[+] Tekan Ctrl+C untuk shutdown server")
+    print("[+] Atau ketik 'shutdown', 'exit', 'quit', atau 'stop'")
+    print("=" * 70)
+
+def mulai_metrik():
+    """Jalankan endpoint metrik Prometheus (thread daemon) jika METRIK_PORT diisi"""
+    global server_metrik
+    if not METRIK_PORT:
+        return
+    try:
+        server_metrik = metrik.mulai_server_metrik(METRIK_HOST, METRIK_PORT)
+        print(f"[+] Metrik Prometheus: http://{METRIK_HOST}:{METRIK_PORT}/metrics")
+    except OSError as e:
+        print(f"[!] Gagal menjalankan endpoint metrik: {e}")
+
+def mulai_persiapan_model():
+    """Catat waktu startup sampai socket siap, lalu muat model di background"""
+    print(f"[⏱] Socket siap menerima koneksi {time.time() - WAKTU_MULAI_PROSES:.2f}s setelah proses dimulai")
+    persiapkan_model()
+
 def start_server():
     global server_socket, active_threads
     
@@ -302,23 +860,21 @@ def start_server():
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
+    siapkan_layanan()
+
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     # Set socket option untuk reuse address
     server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    # Buffer kernel besar diwarisi oleh setiap socket hasil accept()
+    atur_buffer_socket(server_socket)
     server_socket.bind((SERVER_IP, SERVER_PORT))
     server_socket.listen(5)
     
-    print("=" * 70)
-    print("🌾 PESTDETECT SERVER v2.1 - Enhanced with Client Decryption Timing")
-    print("=" * 70)
-    print(f"[+] Server aktif di {SERVER_IP}:{SERVER_PORT}")
-    print(f"[+] Folder log: {FOLDER_LOG}")
-    print(f"[+] Password: jagapadi2024")
-    print("[+] FITUR BARU: Pencatatan waktu dekripsi dari client")
-    print("[+] Tekan Ctrl+C untuk shutdown server")
-    print("[+] Atau ketik 'shutdown', 'exit', 'quit', atau 'stop'")
-    print("=" * 70)
+    cetak_banner("thread per koneksi")
     
+    mulai_persiapan_model()
+    mulai_metrik()
+
     # Start thread untuk monitor input terminal
     terminal_thread = threading.Thread(target=monitor_terminal_input, daemon=True)
     terminal_thread.start()
@@ -354,8 +910,277 @@ def start_server():
     finally:
         if server_socket:
             server_socket.close()
+        hentikan_penyimpanan()
         print("[!] Server dihentikan")
         sys.exit(0)
 
+# === MODE ASYNCIO ===
+
+async def _baca_timing_async(reader, writer):
+    header = await reader.readexactly(6)  # "TIMING"
+    if header != b'TIMING':
+        return None
+    json_len = PANJANG.unpack(await reader.readexactly(PANJANG.size))[0]
+    timing_data = json.loads((await reader.readexactly(json_len)).decode('utf-8'))
+
+    # Kirim acknowledgment
+    writer.write(b'ACK')
+    await writer.drain()
+    return timing_data
+
+async def receive_client_timing_data_async(reader, writer):
+    """Versi asyncio dari receive_client_timing_data (timeout 2 detik)"""
+    try:
+        return await asyncio.wait_for(_baca_timing_async(reader, writer), timeout=2.0)
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, json.JSONDecodeError, struct.error):
+        return None
+    except Exception as e:
+        print(f"[!] Error menerima timing data: {e}")
+        return None
+
+async def handle_client_async(reader, writer):
+    """
+    Handler satu koneksi di mode asyncio. Protokol AUTH / header / TIMING sama persis
+    dengan handle_client; I/O jaringan berjalan di event loop, sedangkan deteksi dan
+    enkripsi diserahkan ke cpu_executor yang ukurannya terbatas.
+    """
+    loop = asyncio.get_running_loop()
+    addr = writer.get_extra_info('peername')
+    client_ip = addr[0] if addr else 'unknown'
+    connect_time = datetime.now()
+    log_data = {
+        'ip': client_ip,
+        'connect_time': connect_time,
+        'log': LogSesi(client_ip, connect_time, folder=FOLDER_LOG)
+    }
+
+    print(f"[+] Koneksi dari {client_ip}")
+    m_koneksi_aktif.tambah()
+    try:
+        # Autentikasi
+        header = await reader.readexactly(4)
+        if header != b'AUTH':
+            m_auth_gagal.tambah()
+            return
+
+        panjang_pw = PANJANG.unpack(await reader.readexactly(PANJANG.size))[0]
+        password_hash, opsi = parse_auth(await reader.readexactly(panjang_pw))
+        if password_hash != PASSWORD_HASH:
+            m_auth_gagal.tambah()
+            writer.write(balasan_auth_ditolak(opsi))
+            await writer.drain()
+            return
+        balasan, versi, respon, jejak = balasan_auth(opsi)
+        writer.write(balasan)
+        await writer.drain()
+
+        if versi >= 2:
+            await layani_pipeline_async(reader, writer, log_data, respon, jejak)
+            return
+
+        while True:
+            # Tidak ada polling: task tidur sampai header berikutnya datang
+            try:
+                header_data = await reader.readexactly(HEADER_V1.size)
+            except asyncio.IncompleteReadError:
+                break  # Client menutup koneksi
+
+            # === TIMING: Mulai menerima data ===
+            waktu_mulai_terima = time.perf_counter()
+
+            filename_len, data_len = HEADER_V1.unpack(header_data)
+            filename = (await reader.readexactly(filename_len)).decode()
+            file_data = await reader.readexactly(data_len)
+
+            # === TIMING: Selesai menerima data ===
+            waktu_terima = time.perf_counter() - waktu_mulai_terima
+
+            if not await tunggu_model_v1_async(filename):
+                print(f"[!] {filename} - model tidak siap ({status_model()}), koneksi v1 ditutup")
+                break
+
+            try:
+                hasil = await proses_gambar_v1_async(filename, file_data)
+            except ServerSibuk as e:
+                # Client v1 tidak mengenal BUSY: tutup koneksi agar client melihat error, bukan hasil kosong
+                print(f"[!] {filename} - {e} selama {ANTRIAN_TUNGGU_V1_DETIK}s, koneksi v1 ditutup")
+                break
+
+            # === TIMING: Mulai mengirim data ===
+            waktu_mulai_kirim = time.perf_counter()
+            try:
+                writer.writelines((PANJANG.pack(hasil['ukuran_hasil']), hasil['nonce'], hasil['encrypted_data']))
+                await writer.drain()
+            finally:
+                jadwalkan_arsip(hasil)
+            waktu_kirim = time.perf_counter() - waktu_mulai_kirim
+
+            hasil['span']['terima'] = (waktu_mulai_terima, waktu_mulai_terima + waktu_terima)
+            hasil['span']['kirim'] = (waktu_mulai_kirim, waktu_mulai_kirim + waktu_kirim)
+
+            # === TERIMA DATA TIMING DEKRIPSI DARI CLIENT ===
+            client_timing = await receive_client_timing_data_async(reader, writer)
+
+            # tambah() bisa flush ke CSV/SQLite, dikerjakan di luar event loop
+            file_log = buat_file_log(filename, len(file_data), hasil, waktu_terima, waktu_kirim, client_timing)
+            await loop.run_in_executor(None, log_data['log'].tambah, file_log)
+            catat_jejak(client_ip, filename, hasil, client_timing)
+
+    except asyncio.CancelledError:
+        pass  # Server sedang shutdown
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass  # Koneksi terputus di tengah frame
+    except Exception as e:
+        if not shutdown_flag:
+            print(f"[!] Error dengan {client_ip}: {e}")
+    finally:
+        m_koneksi_aktif.kurang()
+        # Flush log, CSV dan SQLite memblokir; jangan tahan koneksi lain di event loop
+        durasi = await loop.run_in_executor(None, tutup_sesi, log_data)
+        writer.close()
+        print(f"[-] Koneksi ditutup: {client_ip} (durasi: {durasi:.1f}s)")
+
+async def layani_pipeline_async(reader, writer, log_data, respon=RESPON_GAMBAR, jejak=False):
+    """Versi asyncio dari layani_pipeline: satu task per frame FILE, maksimal MAKS_INFLIGHT"""
+    loop = asyncio.get_running_loop()
+    sesi = SesiPipeline(log_data)
+    write_lock = asyncio.Lock()
+    slot = asyncio.Semaphore(MAKS_INFLIGHT)
+    tugas = set()
+
+    async def kirim(tag, request_id, *payload):
+        async with write_lock:
+            panjang = sum(len(part) for part in payload)
+            writer.writelines((FRAME_V2.pack(tag, request_id, panjang),) + payload)
+            await writer.drain()
+
+    async def kerjakan(request_id, trace_id, filename, file_data, terima):
+        hasil = None
+        try:
+            async with cpu_slot:
+                hasil = await loop.run_in_executor(cpu_executor, proses_gambar, filename, file_data, respon)
+
+            # === TIMING: Kirim hasil ===
+            waktu_mulai_kirim = time.perf_counter()
+            await kirim(b'HASL', request_id, hasil['nonce'], hasil['encrypted_data'])
+            waktu_kirim = time.perf_counter() - waktu_mulai_kirim
+
+            hasil['trace_id'] = trace_id
+            hasil['span']['terima'] = terima
+            hasil['span']['kirim'] = (waktu_mulai_kirim, waktu_mulai_kirim + waktu_kirim)
+            info = (filename, len(file_data), hasil, terima[1] - terima[0], waktu_kirim)
+            await loop.run_in_executor(None, sesi.hasil_terkirim, request_id, info)
+        except asyncio.CancelledError:
+            raise
+        except ServerSibuk as e:
+            print(f"[⏳] {filename} - {e}, client diminta mencoba lagi")
+            try:
+                await kirim(b'BUSY', request_id, info_busy())
+            except Exception:
+                pass
+        except Exception as e:
+            if not shutdown_flag:
+                print(f"[!] Gagal memproses {filename} (request {request_id}): {e}")
+            try:
+                await kirim(b'EROR', request_id, str(e).encode('utf-8'))
+            except Exception:
+                pass
+        finally:
+            if hasil is not None:
+                jadwalkan_arsip(hasil)
+            slot.release()
+
+    try:
+        while True:
+            try:
+                header = await reader.readexactly(FRAME_V2.size)
+            except asyncio.IncompleteReadError:
+                break  # Client menutup koneksi
+            tag, request_id, panjang = FRAME_V2.unpack(header)
+
+            # === TIMING: Mulai menerima data ===
+            waktu_mulai_terima = time.perf_counter()
+            payload = await reader.readexactly(panjang)
+
+            if tag == b'FILE':
+                terima = (waktu_mulai_terima, time.perf_counter())
+                trace_id, filename, file_data = pecah_payload_file(payload, jejak)
+
+                # Backpressure: berhenti membaca jika sudah MAKS_INFLIGHT gambar diproses
+                await slot.acquire()
+                task = asyncio.create_task(kerjakan(request_id, trace_id, filename, file_data, terima))
+                tugas.add(task)
+                task.add_done_callback(tugas.discard)
+            elif tag == b'TIME':
+                client_timing = json.loads(payload.decode('utf-8'))
+                await loop.run_in_executor(None, sesi.timing_diterima, request_id, client_timing)
+            else:
+                print(f"[!] Frame tidak dikenal dari {log_data['ip']}: {tag!r}")
+                break
+    finally:
+        if tugas:
+            await asyncio.gather(*tugas, return_exceptions=True)
+        await loop.run_in_executor(None, sesi.tutup)
+
+async def _jalankan_server_async():
+    global async_loop, async_stop_event, cpu_executor, cpu_slot
+
+    siapkan_layanan()
+
+    async_loop = asyncio.get_running_loop()
+    async_stop_event = asyncio.Event()
+    cpu_executor = ThreadPoolExecutor(max_workers=ASYNC_CPU_WORKERS, thread_name_prefix="cpu")
+    # Batasi jumlah pekerjaan CPU yang menunggu agar antrian executor tidak tumbuh tanpa batas
+    cpu_slot = asyncio.Semaphore(ASYNC_CPU_WORKERS * 2)
+
+    server = await asyncio.start_server(
+        handle_client_async, SERVER_IP, SERVER_PORT,
+        reuse_address=True, backlog=ASYNC_BACKLOG
+    )
+    for sock in server.sockets:
+        atur_buffer_socket(sock)
+
+    # Setup signal handler untuk Ctrl+C
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            async_loop.add_signal_handler(sig, shutdown_server)
+        except NotImplementedError:
+            # Windows: add_signal_handler tidak tersedia
+            signal.signal(sig, lambda signum, frame: shutdown_server())
+
+    cetak_banner("asyncio (event loop tunggal)")
+
+    mulai_persiapan_model()
+    mulai_metrik()
+
+    # Start thread untuk monitor input terminal
+    terminal_thread = threading.Thread(target=monitor_terminal_input, daemon=True)
+    terminal_thread.start()
+
+    await async_stop_event.wait()
+
+    # Berhenti menerima koneksi baru lalu batalkan semua koneksi aktif sekaligus
+    server.close()
+    tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await server.wait_closed()
+
+    cpu_executor.shutdown(wait=False)
+    inferensi.hentikan()
+    hentikan_penyimpanan()
+    print("[!] Server berhasil shutdown")
+
+def start_server_async():
+    """Jalankan server dalam mode asyncio"""
+    try:
+        asyncio.run(_jalankan_server_async())
+    finally:
+        print("[!] Server dihentikan")
+
 if __name__ == '__main__':
-    start_server()
\ No newline at end of file
+    if '--async' in sys.argv or MODE_SERVER == 'async':
+        start_server_async()
+    else:
+        start_server()
@@ -85,13 +85,15 @@ source venv/bin/activate
 # Install Python packages
 print_info "Installing Python packages..."
 pip install --upgrade pip -q
-pip install flask pycryptodome psutil -q
+# flask>=3.1: client.py mengatur request.max_content_length per route (upload-batch)
+pip install "flask>=3.1" pycryptodome psutil pillow -q
 print_status "Python packages installed"
 
 # Check for required files
 print_info "Checking for required files..."
 
-required_files=("aes_deskripsi.py")
+required_files=("aes_deskripsi.py" "utils/transport.py" "utils/pool_koneksi.py" "utils/antrian_job.py"
+                "utils/riwayat.py" "utils/jejak.py")
 missing_files=()
 
 for file in "${required_files[@]}"; do
@@ -281,11 +281,29 @@ class JagaPadiApp {
                 body: formData
             });
             
-            const result = await response.json();
+            let result = await response.json();
+
+            // Upload masuk antrian job di Pi, tunggu sampai dikirim dan diproses server
+            if (result.success && result.job_id) {
+                const job = await this.waitForJob(result.job_id);
+                result = job.status === 'selesai'
+                    ? { success: true, ...job.hasil }
+                    : { success: false, message: job.pesan || 'Gagal menganalisis gambar' };
+            }
             
             const processingTime = ((Date.now() - this.processingStartTime) / 1000).toFixed(1);
             
             if (result.success) {
+                // Gambar hasil dari server diambil lewat URL /hasil/ (di-cache browser)
+                if (!result.result_image && result.result_url) {
+                    result.result_image = result.result_url;
+                }
+
+                // Respon ringkas: gambar overlay kotak deteksi di atas gambar yang sudah ada
+                if (!result.result_image && result.detections && this.selectedBase64) {
+                    result.result_image = await this.renderDetections(this.selectedBase64, result.detections);
+                }
+
                 // Display result image if provided
                 if (result.result_image && this.elements.previewImage) {
                     this.elements.previewImage.src = result.result_image;
@@ -319,6 +337,49 @@ class JagaPadiApp {
         }
     }
 
+    // Tunggu job upload selesai: event stream /api/jobs/events, fallback polling /api/jobs/<id>
+    waitForJob(jobId) {
+        const selesai = job => job && (job.status === 'selesai' || job.status === 'gagal');
+        const ambilDetail = async () => (await fetch(`/api/jobs/${jobId}`)).json();
+
+        return new Promise((resolve, reject) => {
+            const polling = async () => {
+                try {
+                    while (true) {
+                        const job = await ambilDetail();
+                        if (job.error) return reject(new Error(job.error));
+                        if (selesai(job)) return resolve(job);
+                        await new Promise(r => setTimeout(r, 1000));
+                    }
+                } catch (error) {
+                    reject(error);
+                }
+            };
+
+            if (!window.EventSource) {
+                polling();
+                return;
+            }
+
+            // Stream diawali status semua job yang tersimpan, jadi job yang sudah selesai tetap terlihat
+            const source = new EventSource('/api/jobs/events');
+            source.addEventListener('job', async event => {
+                const job = JSON.parse(event.data);
+                if (job.id !== jobId || !selesai(job)) return;
+                source.close();
+                try {
+                    resolve(await ambilDetail());
+                } catch (error) {
+                    reject(error);
+                }
+            });
+            source.onerror = () => {
+                source.close();
+                polling();
+            };
+        });
+    }
+
     async loadHistory() {
         try {
             const response = await fetch('/api/history');
@@ -602,6 +663,49 @@ class JagaPadiApp {
         });
     }
 
+    renderDetections(imageSrc, detections) {
+        // detections: {lebar, tinggi, deteksi: [{label, conf, kotak: [x1, y1, x2, y2]}]}
+        // Koordinat mengacu ke gambar yang diterima server (mungkin sudah diperkecil client)
+        return new Promise((resolve) => {
+            const img = new Image();
+            img.onload = () => {
+                const canvas = document.createElement('canvas');
+                canvas.width = img.naturalWidth;
+                canvas.height = img.naturalHeight;
+                const ctx = canvas.getContext('2d');
+                ctx.drawImage(img, 0, 0);
+
+                const skalaX = img.naturalWidth / (detections.lebar || img.naturalWidth);
+                const skalaY = img.naturalHeight / (detections.tinggi || img.naturalHeight);
+                const tebal = Math.max(2, Math.round(Math.max(canvas.width, canvas.height) / 400));
+                ctx.lineWidth = tebal;
+                ctx.font = `${tebal * 7}px sans-serif`;
+                ctx.textBaseline = 'top';
+
+                (detections.deteksi || []).forEach((det) => {
+                    const [x1, y1, x2, y2] = det.kotak;
+                    const x = x1 * skalaX;
+                    const y = y1 * skalaY;
+                    const teks = `${det.label} ${det.conf.toFixed(2)}`;
+                    const tinggiTeks = tebal * 8;
+
+                    ctx.strokeStyle = '#ff3838';
+                    ctx.strokeRect(x, y, (x2 - x1) * skalaX, (y2 - y1) * skalaY);
+
+                    ctx.fillStyle = '#ff3838';
+                    const yTeks = Math.max(0, y - tinggiTeks);
+                    ctx.fillRect(x, yTeks, ctx.measureText(teks).width + tebal * 2, tinggiTeks);
+                    ctx.fillStyle = '#ffffff';
+                    ctx.fillText(teks, x + tebal, yTeks + tebal / 2);
+                });
+
+                resolve(canvas.toDataURL('image/jpeg', 0.9));
+            };
+            img.onerror = () => resolve(imageSrc);
+            img.src = imageSrc;
+        });
+    }
+
     generateDemoResults() {
         const pestTypes = [
             'Wereng Batang Coklat',
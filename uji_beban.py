@@ -0,0 +1,346 @@
+"""
+Generator beban end-to-end untuk server JagaPadi, berbicara dengan protokol asli.
+
+Setiap client simulasi membuka koneksi sendiri, melakukan handshake AUTH, mengunggah
+gambar dari sebuah folder dengan laju yang bisa diatur, mendekripsi hasil dengan
+decrypt_AES_CTR dan mengirim timing client (TIMING di v1, TIME di v2) seperti client asli.
+Di akhir, throughput, persentil latensi per tahap dan tingkat error dicetak sebagai JSON.
+
+Untuk mengukur lapisan jaringan, enkripsi dan log tanpa YOLO, jalankan server dengan
+    python server.py --stub-deteksi
+
+Contoh:
+    python uji_beban.py --klien 20 --durasi 60 --laju 2 --folder original_images --proto 2
+"""
+import os
+import sys
+import json
+import time
+import socket
+import hashlib
+import argparse
+import itertools
+import threading
+
+from aes_enkripsi import KEY
+from aes_deskripsi import decrypt_AES_CTR
+from utils.transport import (
+    FRAME_V2, HEADER_V1, PANJANG,
+    atur_buffer_socket, terima_tepat, kirim_bagian, kirim_frame
+)
+from utils.alat_ukur import log, persentil, muat_gambar
+
+TAHAP = ('auth', 'upload', 'respon', 'dekripsi', 'total')
+JEDA_BUSY_V1 = 0.5   # Jeda setelah BUSY di protokol v1 (sama dengan BUSY_JEDA_AWAL client)
+TIMEOUT_SOCKET = 60
+
+class Statistik:
+    """Pengumpul hasil dari semua client simulasi (thread-safe)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latensi = {tahap: [] for tahap in TAHAP}
+        self.berhasil = 0
+        self.busy = 0
+        self.error = 0
+        self.pesan_error = {}
+        self.bytes_kirim = 0
+        self.bytes_terima = 0
+        self.terhubung = 0
+        self.gagal_koneksi = 0
+
+    def catat_berhasil(self, upload, respon, dekripsi, total, bytes_kirim, bytes_terima):
+        with self.lock:
+            self.berhasil += 1
+            self.bytes_kirim += bytes_kirim
+            self.bytes_terima += bytes_terima
+            for tahap, nilai in (('upload', upload), ('respon', respon), ('dekripsi', dekripsi), ('total', total)):
+                self.latensi[tahap].append(nilai)
+
+    def catat_auth(self, durasi):
+        with self.lock:
+            self.terhubung += 1
+            self.latensi['auth'].append(durasi)
+
+    def catat_busy(self):
+        with self.lock:
+            self.busy += 1
+
+    def catat_error(self, pesan, koneksi=False):
+        with self.lock:
+            if koneksi:
+                self.gagal_koneksi += 1
+            else:
+                self.error += 1
+            self.pesan_error[pesan] = self.pesan_error.get(pesan, 0) + 1
+
+    def laporan(self, durasi, konfigurasi):
+        with self.lock:
+            total = self.berhasil + self.busy + self.error
+            latensi = {}
+            for tahap, nilai in self.latensi.items():
+                urut = sorted(nilai)
+                latensi[tahap] = {
+                    'n': len(urut),
+                    'rata': round(sum(urut) / len(urut) * 1000, 3) if urut else 0.0,
+                    'p50': round(persentil(urut, 0.50) * 1000, 3),
+                    'p90': round(persentil(urut, 0.90) * 1000, 3),
+                    'p95': round(persentil(urut, 0.95) * 1000, 3),
+                    'p99': round(persentil(urut, 0.99) * 1000, 3),
+                    'maks': round(urut[-1] * 1000, 3) if urut else 0.0
+                }
+            return {
+                'konfigurasi': konfigurasi,
+                'durasi_detik': round(durasi, 3),
+                'klien': {
+                    'diminta': konfigurasi['klien'],
+                    'terhubung': self.terhubung,
+                    'gagal_koneksi': self.gagal_koneksi
+                },
+                'permintaan': {'total': total, 'berhasil': self.berhasil, 'busy': self.busy, 'error': self.error},
+                'tingkat_error': round(self.error / total, 4) if total else 0.0,
+                'tingkat_busy': round(self.busy / total, 4) if total else 0.0,
+                'throughput': {
+                    'gambar_per_detik': round(self.berhasil / durasi, 3) if durasi else 0.0,
+                    'mb_kirim_per_detik': round(self.bytes_kirim / durasi / 1024 / 1024, 3) if durasi else 0.0,
+                    'mb_terima_per_detik': round(self.bytes_terima / durasi / 1024 / 1024, 3) if durasi else 0.0
+                },
+                'latensi_ms': latensi,
+                'error': self.pesan_error
+            }
+
+class KlienSimulasi:
+    """Satu client simulasi dengan koneksi dan jadwal upload sendiri"""
+
+    def __init__(self, nomor, args, gambar, statistik, batas_waktu):
+        self.nomor = nomor
+        self.args = args
+        self.gambar = gambar
+        self.statistik = statistik
+        self.batas_waktu = batas_waktu
+        self.sock = None
+        self.urutan = itertools.cycle(range(nomor, nomor + len(gambar)))  # Client mulai dari gambar berbeda
+        self.terkirim = 0
+        self.jadwal_berikut = time.time()
+        self.request_ids = itertools.count(1)
+
+    def _lanjut(self):
+        if time.time() >= self.batas_waktu:
+            return False
+        return not self.args.jumlah or self.terkirim < self.args.jumlah
+
+    def _gambar_berikut(self):
+        nama, data = self.gambar[next(self.urutan) % len(self.gambar)]
+        if self.args.unik:
+            # Byte acak setelah akhir JPEG/PNG diabaikan decoder, tapi membuat hash cache berbeda
+            data = data + os.urandom(16)
+        self.terkirim += 1
+        return f"beban{self.nomor}_{self.terkirim}_{nama}", data
+
+    def _tunggu_jadwal(self):
+        if not self.args.laju:
+            return
+        jeda = self.jadwal_berikut - time.time()
+        if jeda > 0:
+            time.sleep(jeda)
+        self.jadwal_berikut = max(self.jadwal_berikut, time.time() - 1 / self.args.laju) + 1 / self.args.laju
+
+    def _auth(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.settimeout(TIMEOUT_SOCKET)
+        atur_buffer_socket(self.sock)
+        mulai = time.perf_counter()
+        self.sock.connect((self.args.host, self.args.port))
+
+        payload = hashlib.sha256(self.args.password.encode()).hexdigest()
+        if self.args.proto >= 2:
+            payload += f";proto={self.args.proto};respon={self.args.respon}"
+        payload = payload.encode()
+        kirim_bagian(self.sock, b'AUTH', PANJANG.pack(len(payload)), payload)
+
+        balasan = bytes(terima_tepat(self.sock, 8))
+        if balasan[:7] != b'AUTH_OK':
+            raise ConnectionError("Autentikasi ditolak")
+        versi, max_inflight, respon = 1, 1, 'gambar'
+        if balasan[7] != 0:
+            info_len = PANJANG.unpack(terima_tepat(self.sock, PANJANG.size))[0]
+            info = json.loads(bytes(terima_tepat(self.sock, info_len)).decode('utf-8'))
+            versi = info.get('proto', balasan[7])
+            max_inflight = max(1, info.get('max_inflight', 1))
+            respon = info.get('respon', 'gambar')
+        self.statistik.catat_auth(time.perf_counter() - mulai)
+        return versi, max_inflight, respon
+
+    def _dekripsi(self, payload, respon):
+        """Dekripsi nonce + ciphertext; kembalikan (hasil, durasi)"""
+        mulai = time.perf_counter()
+        view = memoryview(payload)
+        hasil = decrypt_AES_CTR(view[8:], bytes(view[:8]), KEY)
+        if respon == 'deteksi':
+            json.loads(bytes(hasil))  # Pastikan hasil benar-benar terdekripsi
+        return hasil, time.perf_counter() - mulai
+
+    def jalankan(self):
+        try:
+            versi, max_inflight, respon = self._auth()
+        except Exception as e:
+            self.statistik.catat_error(f"koneksi: {e}", koneksi=True)
+            return
+        try:
+            if versi >= 2:
+                self._loop_v2(min(max_inflight, self.args.inflight), respon)
+            else:
+                self._loop_v1(respon)
+        except Exception as e:
+            self.statistik.catat_error(f"koneksi terputus: {e}")
+        finally:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+
+    def _kirim_timing_v1(self, timing):
+        data = json.dumps(timing).encode('utf-8')
+        kirim_bagian(self.sock, b'TIMING', PANJANG.pack(len(data)), data)
+        if bytes(terima_tepat(self.sock, 3)) != b'ACK':
+            raise ConnectionError("Server tidak membalas ACK timing")
+
+    def _loop_v1(self, respon):
+        while self._lanjut():
+            self._tunggu_jadwal()
+            nama, data = self._gambar_berikut()
+            nama_bytes = nama.encode('utf-8')
+
+            mulai = time.perf_counter()
+            kirim_bagian(self.sock, HEADER_V1.pack(len(nama_bytes), len(data)), nama_bytes, data)
+            selesai_kirim = time.perf_counter()
+
+            panjang = PANJANG.unpack(terima_tepat(self.sock, PANJANG.size))[0]
+            if panjang == 0:
+                self.statistik.catat_busy()
+                self._kirim_timing_v1({'filename': nama, 'status': 'BUSY'})
+                time.sleep(JEDA_BUSY_V1)
+                continue
+            payload = terima_tepat(self.sock, panjang)
+            selesai_terima = time.perf_counter()
+
+            try:
+                hasil, waktu_dekripsi = self._dekripsi(payload, respon)
+            except ValueError as e:
+                self.statistik.catat_error(f"hasil tidak valid: {e}")
+                self._kirim_timing_v1({'filename': nama, 'status': 'ERROR'})
+                continue
+            self.statistik.catat_berhasil(
+                selesai_kirim - mulai, selesai_terima - selesai_kirim, waktu_dekripsi,
+                time.perf_counter() - mulai, len(data), panjang
+            )
+            self._kirim_timing_v1({
+                'filename': nama,
+                'waktu_dekripsi_client': round(waktu_dekripsi, 4),
+                'ukuran_hasil_kb': len(hasil) / 1024,
+                'waktu_simpan_client': 0.0
+            })
+
+    def _loop_v2(self, max_inflight, respon):
+        inflight = {}  # request_id -> (nama, waktu mulai kirim, waktu selesai kirim, ukuran)
+        while inflight or self._lanjut():
+            while len(inflight) < max_inflight and self._lanjut() and \
+                    (not self.args.laju or time.time() >= self.jadwal_berikut):
+                self._tunggu_jadwal()
+                nama, data = self._gambar_berikut()
+                nama_bytes = nama.encode('utf-8')
+                request_id = next(self.request_ids)
+                mulai = time.perf_counter()
+                kirim_frame(self.sock, b'FILE', request_id, PANJANG.pack(len(nama_bytes)), nama_bytes, data)
+                inflight[request_id] = (nama, mulai, time.perf_counter(), len(data))
+
+            if not inflight:
+                # Belum waktunya mengirim gambar berikutnya
+                time.sleep(max(0.0, min(self.jadwal_berikut, self.batas_waktu) - time.time()))
+                continue
+
+            tag, request_id, panjang = FRAME_V2.unpack(terima_tepat(self.sock, FRAME_V2.size))
+            payload = terima_tepat(self.sock, panjang)
+            selesai_terima = time.perf_counter()
+            if request_id not in inflight:
+                continue
+            nama, mulai, selesai_kirim, ukuran = inflight.pop(request_id)
+
+            if tag == b'HASL':
+                try:
+                    hasil, waktu_dekripsi = self._dekripsi(payload, respon)
+                except ValueError as e:
+                    self.statistik.catat_error(f"hasil tidak valid: {e}")
+                    continue
+                self.statistik.catat_berhasil(
+                    selesai_kirim - mulai, selesai_terima - selesai_kirim, waktu_dekripsi,
+                    time.perf_counter() - mulai, ukuran, panjang
+                )
+                kirim_frame(self.sock, b'TIME', request_id, json.dumps({
+                    'filename': nama,
+                    'waktu_dekripsi_client': round(waktu_dekripsi, 4),
+                    'ukuran_hasil_kb': len(hasil) / 1024,
+                    'waktu_simpan_client': 0.0
+                }).encode('utf-8'))
+            elif tag == b'BUSY':
+                self.statistik.catat_busy()
+                try:
+                    saran = json.loads(bytes(payload).decode('utf-8')).get('retry_after_ms', 0) / 1000
+                except ValueError:
+                    saran = 0
+                self.jadwal_berikut = max(self.jadwal_berikut, time.time() + saran)
+            else:
+                self.statistik.catat_error(f"{tag.decode('ascii', 'replace')}: {bytes(payload).decode('utf-8', 'replace')}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generator beban protokol JagaPadi")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=12345)
+    parser.add_argument('--password', default='jagapadi2024')
+    parser.add_argument('--klien', type=int, default=10, help="Jumlah client simulasi bersamaan")
+    parser.add_argument('--durasi', type=float, default=30, help="Lama uji (detik)")
+    parser.add_argument('--jumlah', type=int, default=0, help="Gambar maksimum per client (0 = sampai durasi habis)")
+    parser.add_argument('--laju', type=float, default=0, help="Gambar per detik per client (0 = secepatnya)")
+    parser.add_argument('--ramp', type=float, default=0, help="Sebar waktu mulai client selama n detik")
+    parser.add_argument('--folder', default='original_images', help="Folder gambar yang diunggah")
+    parser.add_argument('--maks-gambar', type=int, default=100, help="Jumlah gambar yang dimuat dari folder")
+    parser.add_argument('--proto', type=int, default=2, choices=[1, 2])
+    parser.add_argument('--respon', default='gambar', choices=['gambar', 'deteksi'])
+    parser.add_argument('--inflight', type=int, default=4, help="Gambar dalam perjalanan per koneksi v2")
+    parser.add_argument('--unik', action='store_true', help="Buat setiap upload unik agar tidak dilayani cache hasil")
+    parser.add_argument('--output', help="Simpan laporan JSON ke file ini juga")
+    args = parser.parse_args()
+
+    gambar = muat_gambar(args.folder, args.maks_gambar)
+    if not gambar:
+        log(f"[!] Tidak ada gambar di {args.folder}")
+        sys.exit(1)
+
+    konfigurasi = {kunci: nilai for kunci, nilai in vars(args).items() if kunci != 'password'}
+    konfigurasi['jumlah_gambar'] = len(gambar)
+    statistik = Statistik()
+
+    log(f"[+] {args.klien} client ke {args.host}:{args.port}, {len(gambar)} gambar, durasi {args.durasi}s")
+    mulai = time.time()
+    batas_waktu = mulai + args.ramp + args.durasi
+    threads = []
+    for nomor in range(args.klien):
+        klien = KlienSimulasi(nomor, args, gambar, statistik, batas_waktu)
+        thread = threading.Thread(target=klien.jalankan, name=f"klien-{nomor}", daemon=True)
+        threads.append(thread)
+        thread.start()
+        if args.ramp and nomor < args.klien - 1:
+            time.sleep(args.ramp / (args.klien - 1))
+    for thread in threads:
+        thread.join()
+    durasi = time.time() - mulai
+
+    laporan = json.dumps(statistik.laporan(durasi, konfigurasi), indent=2)
+    print(laporan)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(laporan + "\n")
+        log(f"[+] Laporan disimpan ke {args.output}")
+
+if __name__ == '__main__':
+    main()
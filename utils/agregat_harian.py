@@ -0,0 +1,277 @@
+"""
+Agregat harian dan per client yang diperbarui setiap kali satu file dicatat.
+
+Setiap kolom timing menyimpan jumlah, total, total kuadrat, min/max dan sketsa kuantil
+ringkas (bucket logaritmik dengan galat relatif tetap), sehingga summary harian dan
+laporan performa client dihasilkan dalam waktu konstan tanpa membaca ulang log.
+Agregat di-snapshot ke file JSON secara berkala agar tetap ada setelah restart.
+"""
+import os
+import json
+import math
+import time
+import threading
+from datetime import datetime, timedelta
+
+# Galat relatif sketsa kuantil (0.02 = estimasi p95 meleset maksimal 2%)
+AKURASI_SKETSA = 0.02
+NILAI_MIN_SKETSA = 1e-6   # Nilai <= ini dihitung di bucket nol
+
+# Kolom yang diagregasi: nama -> hanya hitung nilai > 0 (kolom yang opsional dari client)
+KOLOM_AGREGAT = {
+    'waktu_terima': False,
+    'waktu_antri': False,
+    'waktu_deteksi': False,
+    'waktu_enkripsi': False,
+    'waktu_kirim': False,
+    'confidence': True,
+    'waktu_dekripsi_client': True,
+    'waktu_simpan_client': True
+}
+
+class SketsaKuantil:
+    """Histogram bucket logaritmik (gaya DDSketch) untuk estimasi p50/p95/p99"""
+
+    def __init__(self, akurasi=AKURASI_SKETSA):
+        self.akurasi = akurasi
+        self.gamma = (1 + akurasi) / (1 - akurasi)
+        self.log_gamma = math.log(self.gamma)
+        self.bucket = {}
+        self.nol = 0
+        self.jumlah = 0
+
+    def tambah(self, nilai):
+        self.jumlah += 1
+        if nilai <= NILAI_MIN_SKETSA:
+            self.nol += 1
+            return
+        indeks = math.ceil(math.log(nilai) / self.log_gamma)
+        self.bucket[indeks] = self.bucket.get(indeks, 0) + 1
+
+    def kuantil(self, q):
+        if self.jumlah == 0:
+            return 0.0
+        target = q * (self.jumlah - 1)
+        terhitung = self.nol
+        if terhitung > target:
+            return 0.0
+        for indeks in sorted(self.bucket):
+            terhitung += self.bucket[indeks]
+            if terhitung > target:
+                return 2 * self.gamma ** indeks / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bucket) / (self.gamma + 1)
+
+    def ke_dict(self):
+        return {'akurasi': self.akurasi, 'nol': self.nol, 'jumlah': self.jumlah,
+                'bucket': {str(k): v for k, v in self.bucket.items()}}
+
+    @classmethod
+    def dari_dict(cls, data):
+        sketsa = cls(data['akurasi'])
+        sketsa.nol = data['nol']
+        sketsa.jumlah = data['jumlah']
+        sketsa.bucket = {int(k): v for k, v in data['bucket'].items()}
+        return sketsa
+
+class StatistikKolom:
+    """Jumlah, total, total kuadrat, min/max dan sketsa kuantil satu kolom"""
+
+    def __init__(self):
+        self.jumlah = 0
+        self.total = 0.0
+        self.total_kuadrat = 0.0
+        self.minimum = None
+        self.maksimum = None
+        self.sketsa = SketsaKuantil()
+
+    def tambah(self, nilai):
+        self.jumlah += 1
+        self.total += nilai
+        self.total_kuadrat += nilai * nilai
+        self.minimum = nilai if self.minimum is None else min(self.minimum, nilai)
+        self.maksimum = nilai if self.maksimum is None else max(self.maksimum, nilai)
+        self.sketsa.tambah(nilai)
+
+    def ringkasan(self):
+        rata = self.total / self.jumlah if self.jumlah else 0.0
+        varians = self.total_kuadrat / self.jumlah - rata * rata if self.jumlah else 0.0
+        return {
+            'jumlah': self.jumlah,
+            'total': self.total,
+            'rata': rata,
+            'std': math.sqrt(max(varians, 0.0)),
+            'min': self.minimum or 0.0,
+            'max': self.maksimum or 0.0,
+            'p50': self.sketsa.kuantil(0.50),
+            'p95': self.sketsa.kuantil(0.95),
+            'p99': self.sketsa.kuantil(0.99)
+        }
+
+    def ke_dict(self):
+        return {'jumlah': self.jumlah, 'total': self.total, 'total_kuadrat': self.total_kuadrat,
+                'min': self.minimum, 'max': self.maksimum, 'sketsa': self.sketsa.ke_dict()}
+
+    @classmethod
+    def dari_dict(cls, data):
+        kolom = cls()
+        kolom.jumlah = data['jumlah']
+        kolom.total = data['total']
+        kolom.total_kuadrat = data['total_kuadrat']
+        kolom.minimum = data['min']
+        kolom.maksimum = data['max']
+        kolom.sketsa = SketsaKuantil.dari_dict(data['sketsa'])
+        return kolom
+
+class AgregatGrup:
+    """Agregat untuk satu hari (keseluruhan) atau satu client pada satu hari"""
+
+    def __init__(self):
+        self.total_sessions = 0
+        self.total_files = 0
+        self.total_detections = 0
+        self.cache_hit = 0
+        self.kolom = {nama: StatistikKolom() for nama in KOLOM_AGREGAT}
+
+    def tambah(self, file_log):
+        self.total_files += 1
+        if file_log['labels']:
+            self.total_detections += 1
+        if file_log.get('cache_hit'):
+            self.cache_hit += 1
+        for nama, hanya_positif in KOLOM_AGREGAT.items():
+            nilai = file_log.get(nama, 0) or 0
+            if hanya_positif and nilai <= 0:
+                continue
+            self.kolom[nama].tambah(nilai)
+
+    def ke_dict(self):
+        return {'total_sessions': self.total_sessions, 'total_files': self.total_files,
+                'total_detections': self.total_detections, 'cache_hit': self.cache_hit,
+                'kolom': {nama: kolom.ke_dict() for nama, kolom in self.kolom.items()}}
+
+    @classmethod
+    def dari_dict(cls, data):
+        grup = cls()
+        grup.total_sessions = data['total_sessions']
+        grup.total_files = data['total_files']
+        grup.total_detections = data['total_detections']
+        grup.cache_hit = data['cache_hit']
+        for nama, kolom in data['kolom'].items():
+            if nama in grup.kolom:
+                grup.kolom[nama] = StatistikKolom.dari_dict(kolom)
+        return grup
+
+class AgregatHarian:
+    """
+    Agregat per hari ('YYYY-MM-DD') berisi grup keseluruhan dan grup per client IP.
+    Snapshot JSON ditulis setiap `snapshot_detik` detik saat ada data baru dan saat simpan().
+    """
+
+    def __init__(self, path_snapshot, snapshot_detik=30.0, hari_maks=31):
+        self.path_snapshot = path_snapshot
+        self.snapshot_detik = snapshot_detik
+        self.hari_maks = hari_maks
+        self.lock = threading.Lock()
+        self.hari = {}
+        self.kotor = False
+        self.terakhir_snapshot = time.time()
+        self._muat()
+
+    def _grup(self, tanggal, client_ip):
+        hari = self.hari.get(tanggal)
+        if hari is None:
+            hari = self.hari[tanggal] = {'semua': AgregatGrup(), 'client': {}}
+            self._buang_hari_lama()
+        client = hari['client'].get(client_ip)
+        if client is None:
+            client = hari['client'][client_ip] = AgregatGrup()
+        return hari['semua'], client
+
+    def _buang_hari_lama(self):
+        batas = (datetime.now() - timedelta(days=self.hari_maks)).strftime('%Y-%m-%d')
+        for tanggal in [t for t in self.hari if t < batas]:
+            del self.hari[tanggal]
+
+    def tambah(self, client_ip, file_log, waktu=None):
+        """Masukkan satu entri file ke agregat hari ini"""
+        tanggal = (waktu or datetime.now()).strftime('%Y-%m-%d')
+        with self.lock:
+            for grup in self._grup(tanggal, client_ip):
+                grup.tambah(file_log)
+            self._tandai_kotor()
+
+    def tambah_sesi(self, client_ip, waktu=None):
+        """Hitung satu session yang mencatat minimal satu file"""
+        tanggal = (waktu or datetime.now()).strftime('%Y-%m-%d')
+        with self.lock:
+            for grup in self._grup(tanggal, client_ip):
+                grup.total_sessions += 1
+            self._tandai_kotor()
+
+    def _tandai_kotor(self):
+        self.kotor = True
+        if time.time() - self.terakhir_snapshot >= self.snapshot_detik:
+            self._snapshot()
+
+    def ringkasan(self, tanggal=None):
+        """
+        Ringkasan satu hari (default hari ini).
+
+        Returns:
+            dict atau None jika belum ada data untuk hari tersebut
+        """
+        tanggal = tanggal or datetime.now().strftime('%Y-%m-%d')
+        with self.lock:
+            hari = self.hari.get(tanggal)
+            if hari is None:
+                return None
+            return {
+                'tanggal': tanggal,
+                'semua': _ringkas_grup(hari['semua']),
+                'client': {ip: _ringkas_grup(grup) for ip, grup in hari['client'].items()}
+            }
+
+    def simpan(self):
+        """Tulis snapshot sekarang jika ada perubahan sejak snapshot terakhir"""
+        with self.lock:
+            if self.kotor:
+                self._snapshot()
+
+    def _snapshot(self):
+        data = {tanggal: {'semua': hari['semua'].ke_dict(),
+                          'client': {ip: grup.ke_dict() for ip, grup in hari['client'].items()}}
+                for tanggal, hari in self.hari.items()}
+        sementara = self.path_snapshot + ".tmp"
+        try:
+            with open(sementara, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(sementara, self.path_snapshot)
+        except OSError as e:
+            print(f"[!] Gagal menyimpan snapshot agregat: {e}")
+            return
+        self.kotor = False
+        self.terakhir_snapshot = time.time()
+
+    def _muat(self):
+        if not os.path.exists(self.path_snapshot):
+            return
+        try:
+            with open(self.path_snapshot, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.hari = {tanggal: {'semua': AgregatGrup.dari_dict(hari['semua']),
+                                   'client': {ip: AgregatGrup.dari_dict(grup) for ip, grup in hari['client'].items()}}
+                         for tanggal, hari in data.items()}
+            self._buang_hari_lama()
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[!] Snapshot agregat tidak bisa dibaca, mulai dari kosong: {e}")
+            self.hari = {}
+
+def _ringkas_grup(grup):
+    return {
+        'total_sessions': grup.total_sessions,
+        'total_files': grup.total_files,
+        'total_detections': grup.total_detections,
+        'detection_rate': grup.total_detections / grup.total_files * 100 if grup.total_files else 0.0,
+        'cache_hit': grup.cache_hit,
+        'kolom': {nama: kolom.ringkasan() for nama, kolom in grup.kolom.items()}
+    }
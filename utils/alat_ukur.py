@@ -0,0 +1,33 @@
+"""
+Alat bantu bersama untuk skrip pengukuran JagaPadi (uji_beban.py, benchmark_backend.py,
+benchmark_mikro.py): log progres, persentil latensi dan pemuatan gambar uji dari folder.
+"""
+import os
+import sys
+
+EKSTENSI_GAMBAR = ('.jpg', '.jpeg', '.png')
+
+def log(pesan):
+    # Progres ke stderr agar stdout hanya berisi laporan JSON
+    print(pesan, file=sys.stderr, flush=True)
+
+def persentil(nilai, q):
+    """Persentil q (0..1) dari list nilai; 0.0 bila kosong"""
+    if not nilai:
+        return 0.0
+    urut = sorted(nilai)
+    return urut[min(len(urut) - 1, int(q * len(urut)))]
+
+def muat_gambar(folder, jumlah, ubah=None):
+    """
+    Muat maksimum `jumlah` gambar (urut nama) dari folder.
+    Returns:
+        list: (nama file, bytes gambar atau ubah(bytes) bila ubah diberikan)
+    """
+    daftar = sorted(f for f in os.listdir(folder) if f.lower().endswith(EKSTENSI_GAMBAR))[:jumlah]
+    gambar = []
+    for nama in daftar:
+        with open(os.path.join(folder, nama), 'rb') as f:
+            data = f.read()
+        gambar.append((nama, ubah(data) if ubah else data))
+    return gambar
@@ -0,0 +1,191 @@
+"""
+Antrian job upload di background untuk web client JagaPadi.
+
+/api/upload hanya memasukkan gambar ke antrian terbatas dan langsung mengembalikan job ID;
+worker mengirim gambar ke server AI (lewat pool koneksi JagaPadiClient), sehingga thread
+Flask tidak tertahan selama deteksi. Setiap perubahan status job menaikkan nomor versi
+sehingga pemanggil bisa menunggu perubahan (long-poll / Server-Sent Events) tanpa polling.
+"""
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+STATUS_ANTRI = 'antri'
+STATUS_DIPROSES = 'diproses'
+STATUS_SELESAI = 'selesai'
+STATUS_GAGAL = 'gagal'
+
+class AntrianPenuh(Exception):
+    """Antrian job penuh, upload ditolak alih-alih ditahan"""
+
+class AntrianJob:
+    """
+    Antrian job terbatas + worker thread.
+
+    `proses(filename, data)` mengembalikan dict hasil untuk job yang berhasil dan
+    melempar exception jika gagal (pesan exception menjadi pesan job).
+    """
+
+    def __init__(self, proses, jumlah_worker=4, antrian_maks=32, simpan_maks=50):
+        self._proses = proses
+        self.antrian = queue.Queue(maxsize=antrian_maks)
+        self.simpan_maks = simpan_maks
+
+        self._kondisi = threading.Condition()
+        self._jobs = OrderedDict()   # job_id -> job (urutan masuk)
+        self._data = {}              # job_id -> bytes gambar yang belum diproses
+        self._versi = 0
+
+        self.diterima = 0
+        self.ditolak = 0
+        self.selesai = 0
+        self.gagal = 0
+
+        self.threads = [
+            threading.Thread(target=self._loop, name=f"job-{i}", daemon=True)
+            for i in range(jumlah_worker)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def kirim(self, filename, data):
+        """
+        Masukkan satu gambar ke antrian tanpa menunggu.
+
+        Returns:
+            dict: snapshot job (status 'antri')
+
+        Raises:
+            AntrianPenuh: antrian sudah berisi antrian_maks job
+        """
+        job_id = uuid.uuid4().hex[:12]
+        with self._kondisi:
+            job = {
+                'id': job_id,
+                'filename': filename,
+                'ukuran': len(data),
+                'status': STATUS_ANTRI,
+                'pesan': None,
+                'dibuat': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'waktu_antri': None,
+                'waktu_proses': None,
+                'hasil': None,
+                '_masuk': time.monotonic(),
+                '_mulai': None
+            }
+            try:
+                self.antrian.put_nowait(job_id)
+            except queue.Full:
+                self.ditolak += 1
+                raise AntrianPenuh(f"Antrian penuh ({self.antrian.maxsize} gambar), coba lagi sebentar")
+            self.diterima += 1
+            self._jobs[job_id] = job
+            self._data[job_id] = data
+            self._ubah(job)
+            self._pangkas()
+            return self._snapshot(job)
+
+    def ambil(self, job_id):
+        """Snapshot job, atau None jika tidak dikenal / sudah dipangkas"""
+        with self._kondisi:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def daftar(self):
+        with self._kondisi:
+            return [self._snapshot(job) for job in self._jobs.values()]
+
+    def tunggu_selesai(self, job_id, timeout=None):
+        """Tunggu sampai job selesai/gagal; mengembalikan snapshot terakhir (None jika tidak dikenal)"""
+        with self._kondisi:
+            self._kondisi.wait_for(
+                lambda: job_id not in self._jobs or self._jobs[job_id]['status'] in (STATUS_SELESAI, STATUS_GAGAL),
+                timeout
+            )
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def tunggu_perubahan(self, versi, timeout=None):
+        """
+        Tunggu sampai ada job yang berubah setelah `versi`. Versi di atas versi terbaru
+        (Last-Event-ID dari proses client sebelum restart) dianggap 0 agar tidak menunggu selamanya.
+
+        Returns:
+            tuple: (versi terbaru, list snapshot job yang berubah; kosong jika timeout)
+        """
+        with self._kondisi:
+            if versi > self._versi:
+                versi = 0
+            self._kondisi.wait_for(lambda: self._versi > versi, timeout)
+            berubah = sorted(
+                (self._snapshot(job) for job in self._jobs.values() if job['versi'] > versi),
+                key=lambda job: job['versi']
+            )
+            return self._versi, berubah
+
+    def statistik(self):
+        with self._kondisi:
+            return {
+                'antrian': self.antrian.qsize(),
+                'antrian_maks': self.antrian.maxsize,
+                'worker': len(self.threads),
+                'diterima': self.diterima,
+                'ditolak': self.ditolak,
+                'selesai': self.selesai,
+                'gagal': self.gagal
+            }
+
+    def _loop(self):
+        while True:
+            job_id = self.antrian.get()
+            with self._kondisi:
+                job = self._jobs.get(job_id)
+                data = self._data.pop(job_id, None)
+                if job is None or data is None:
+                    continue
+                job['status'] = STATUS_DIPROSES
+                job['_mulai'] = time.monotonic()
+                job['waktu_antri'] = round(job['_mulai'] - job['_masuk'], 4)
+                self._ubah(job)
+
+            try:
+                hasil, pesan, status = self._proses(job['filename'], data), None, STATUS_SELESAI
+            except Exception as e:
+                hasil, pesan, status = None, str(e), STATUS_GAGAL
+
+            with self._kondisi:
+                job['status'] = status
+                job['pesan'] = pesan
+                job['hasil'] = hasil
+                job['waktu_proses'] = round(time.monotonic() - job['_mulai'], 4)
+                if status == STATUS_SELESAI:
+                    self.selesai += 1
+                else:
+                    self.gagal += 1
+                self._ubah(job)
+
+    def _ubah(self, job):
+        """Tandai job berubah dan bangunkan semua yang menunggu (dipanggil dengan lock)"""
+        self._versi += 1
+        job['versi'] = self._versi
+        self._kondisi.notify_all()
+
+    def _pangkas(self):
+        """Buang job selesai/gagal paling lama jika jumlah job melebihi simpan_maks"""
+        lebih = len(self._jobs) - self.simpan_maks
+        if lebih <= 0:
+            return
+        for job_id in [j for j, job in self._jobs.items() if job['status'] in (STATUS_SELESAI, STATUS_GAGAL)][:lebih]:
+            del self._jobs[job_id]
+
+    def _snapshot(self, job):
+        """Salinan job untuk JSON (tanpa field internal) beserta posisi di antrian"""
+        snapshot = {k: v for k, v in job.items() if not k.startswith('_')}
+        if job['status'] == STATUS_ANTRI:
+            snapshot['posisi'] = sum(
+                1 for j in self._jobs.values() if j['status'] == STATUS_ANTRI and j['_masuk'] < job['_masuk']
+            ) + 1
+        return snapshot
@@ -0,0 +1,169 @@
+"""
+Cache hasil deteksi berbasis hash konten upload.
+
+Kunci cache adalah SHA-256 dari identitas model + bytes gambar yang diupload, sehingga
+upload ulang foto yang sama tidak perlu melewati YOLO lagi. Tier memori berupa LRU
+yang dibatasi total byte, tier disk opsional dibatasi ukuran folder (LRU berdasarkan mtime).
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+def buat_kunci(data, identitas_model):
+    """Kunci cache: SHA-256 dari identitas model dan bytes gambar"""
+    h = hashlib.sha256(identitas_model.encode('utf-8'))
+    h.update(data)
+    return h.hexdigest()
+
+def _ukuran_entri(entri):
+    # Perkiraan kasar: bytes gambar hasil + metadata
+    return len(entri['data_hasil']) + 256
+
+class CacheHasil:
+    """
+    Cache dua tingkat untuk hasil deteksi.
+
+    Entri berupa dict: {'labels': list, 'confidence': float, 'data_hasil': bytes}
+    """
+
+    def __init__(self, maks_bytes_memori, folder_disk=None, maks_bytes_disk=0):
+        self.maks_bytes_memori = maks_bytes_memori
+        self.folder_disk = folder_disk
+        self.maks_bytes_disk = maks_bytes_disk
+        self.lock = threading.Lock()
+
+        self.memori = OrderedDict()
+        self.ukuran_memori = 0
+
+        # Index tier disk: kunci -> ukuran file, urut dari yang paling lama dipakai
+        self.disk = OrderedDict()
+        self.ukuran_disk = 0
+
+        self.hit_memori = 0
+        self.hit_disk = 0
+        self.miss = 0
+
+        if self.folder_disk:
+            os.makedirs(self.folder_disk, exist_ok=True)
+            self._muat_index_disk()
+
+    def _path_disk(self, kunci):
+        return os.path.join(self.folder_disk, f"{kunci}.cache")
+
+    def _muat_index_disk(self):
+        entri_disk = []
+        for nama in os.listdir(self.folder_disk):
+            if nama.endswith(".cache"):
+                stat = os.stat(os.path.join(self.folder_disk, nama))
+                entri_disk.append((stat.st_mtime, nama[:-len(".cache")], stat.st_size))
+        for _, kunci, ukuran in sorted(entri_disk):
+            self.disk[kunci] = ukuran
+            self.ukuran_disk += ukuran
+
+    def ambil(self, kunci):
+        """Cari entri di memori lalu di disk. Kembalikan entri atau None"""
+        with self.lock:
+            entri = self.memori.get(kunci)
+            if entri is not None:
+                self.memori.move_to_end(kunci)
+                self.hit_memori += 1
+                return entri
+            ada_di_disk = kunci in self.disk
+
+        if ada_di_disk:
+            entri = self._baca_disk(kunci)
+            if entri is not None:
+                with self.lock:
+                    self.hit_disk += 1
+                    if kunci in self.disk:
+                        self.disk.move_to_end(kunci)
+                self._simpan_memori(kunci, entri)
+                return entri
+
+        with self.lock:
+            self.miss += 1
+        return None
+
+    def simpan(self, kunci, entri):
+        """Simpan entri ke tier memori (tier disk lewat simpan_disk, sebaiknya di background)"""
+        self._simpan_memori(kunci, entri)
+
+    def _simpan_memori(self, kunci, entri):
+        ukuran = _ukuran_entri(entri)
+        if ukuran > self.maks_bytes_memori:
+            return
+        with self.lock:
+            lama = self.memori.pop(kunci, None)
+            if lama is not None:
+                self.ukuran_memori -= _ukuran_entri(lama)
+            self.memori[kunci] = entri
+            self.ukuran_memori += ukuran
+            while self.ukuran_memori > self.maks_bytes_memori:
+                _, dibuang = self.memori.popitem(last=False)
+                self.ukuran_memori -= _ukuran_entri(dibuang)
+
+    def simpan_disk(self, kunci, entri):
+        """
+        Tulis entri ke tier disk dan buang entri paling lama jika melebihi batas ukuran.
+        Format file: >I panjang metadata JSON + JSON + bytes gambar hasil.
+        """
+        if not self.folder_disk:
+            return
+        meta = json.dumps({'labels': entri['labels'], 'confidence': entri['confidence']}).encode('utf-8')
+        path = self._path_disk(kunci)
+        sementara = path + ".tmp"
+        try:
+            with open(sementara, "wb") as f:
+                f.write(len(meta).to_bytes(4, 'big'))
+                f.write(meta)
+                f.write(entri['data_hasil'])
+            os.replace(sementara, path)
+        except OSError as e:
+            print(f"[!] Gagal menulis cache disk {kunci[:12]}: {e}")
+            return
+
+        ukuran = os.path.getsize(path)
+        dihapus = []
+        with self.lock:
+            self.ukuran_disk += ukuran - self.disk.pop(kunci, 0)
+            self.disk[kunci] = ukuran
+            while self.ukuran_disk > self.maks_bytes_disk and len(self.disk) > 1:
+                kunci_lama, ukuran_lama = self.disk.popitem(last=False)
+                self.ukuran_disk -= ukuran_lama
+                dihapus.append(kunci_lama)
+        for kunci_lama in dihapus:
+            try:
+                os.remove(self._path_disk(kunci_lama))
+            except OSError:
+                pass
+
+    def _baca_disk(self, kunci):
+        path = self._path_disk(kunci)
+        try:
+            with open(path, "rb") as f:
+                panjang_meta = int.from_bytes(f.read(4), 'big')
+                meta = json.loads(f.read(panjang_meta).decode('utf-8'))
+                data_hasil = f.read()
+            os.utime(path)  # Tandai baru dipakai untuk urutan LRU setelah restart
+        except (OSError, ValueError):
+            with self.lock:
+                self.ukuran_disk -= self.disk.pop(kunci, 0)
+            return None
+        return {'labels': meta['labels'], 'confidence': meta['confidence'], 'data_hasil': data_hasil}
+
+    def statistik(self):
+        """Ringkasan hit/miss dan ukuran tiap tier"""
+        with self.lock:
+            total = self.hit_memori + self.hit_disk + self.miss
+            return {
+                'hit_memori': self.hit_memori,
+                'hit_disk': self.hit_disk,
+                'miss': self.miss,
+                'hit_rate': (self.hit_memori + self.hit_disk) / total if total else 0.0,
+                'entri_memori': len(self.memori),
+                'bytes_memori': self.ukuran_memori,
+                'entri_disk': len(self.disk),
+                'bytes_disk': self.ukuran_disk
+            }
@@ -0,0 +1,111 @@
+"""
+Database deteksi berbasis SQLite (mode WAL) pengganti scan penuh detection_database.csv.
+
+Tabel `deteksi` memiliki kolom yang sama dengan CSV dan diindeks pada timestamp dan
+client_ip, sehingga statistik harian/per client menjadi range query yang biayanya
+bergantung pada jumlah baris di rentang tersebut, bukan ukuran seluruh riwayat.
+CSV lama diimpor otomatis saat database pertama kali dibuat.
+"""
+import os
+import csv
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+NAMA_DB = "detection_database.db"
+NAMA_CSV = "detection_database.csv"
+UKURAN_BATCH_IMPOR = 5000
+
+# Kolom tabel deteksi (urutan sama dengan CSV_FIELDNAMES di utils.logger)
+KOLOM = [
+    ('timestamp', 'TEXT'), ('client_ip', 'TEXT'), ('filename', 'TEXT'), ('labels', 'TEXT'),
+    ('size_ori_kb', 'REAL'), ('size_enc_kb', 'REAL'), ('waktu_terima', 'REAL'), ('waktu_deteksi', 'REAL'),
+    ('waktu_enkripsi', 'REAL'), ('waktu_kirim', 'REAL'), ('kecepatan_terima', 'REAL'),
+    ('kecepatan_kirim', 'REAL'), ('confidence', 'REAL'), ('waktu_dekripsi_client', 'REAL'),
+    ('ukuran_hasil_client_kb', 'REAL'), ('waktu_simpan_client', 'REAL'), ('waktu_antri', 'REAL'),
+    ('cache_hit', 'INTEGER')
+]
+NAMA_KOLOM = [nama for nama, _ in KOLOM]
+
+_SQL_INSERT = f"INSERT INTO deteksi ({', '.join(NAMA_KOLOM)}) VALUES ({', '.join(':' + nama for nama in NAMA_KOLOM)})"
+
+# Satu koneksi per file database, dipakai bersama oleh semua thread
+_koneksi = {}
+_lock = threading.Lock()
+
+def _buka(folder):
+    path = os.path.join(folder, NAMA_DB)
+    conn = _koneksi.get(path)
+    if conn is not None:
+        return conn
+
+    os.makedirs(folder, exist_ok=True)
+    db_baru = not os.path.exists(path)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"CREATE TABLE IF NOT EXISTS deteksi ({', '.join(f'{nama} {tipe}' for nama, tipe in KOLOM)})")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_deteksi_timestamp ON deteksi (timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_deteksi_client ON deteksi (client_ip, timestamp)")
+    conn.commit()
+    _koneksi[path] = conn
+
+    csv_path = os.path.join(folder, NAMA_CSV)
+    if db_baru and os.path.exists(csv_path):
+        jumlah = _impor_csv(conn, csv_path)
+        print(f"[LOG] {jumlah} baris {NAMA_CSV} diimpor ke {NAMA_DB}")
+    return conn
+
+def _baris_db(row):
+    # Kolom kosong/tidak ada di CSV lama disimpan sebagai NULL
+    return {nama: (row.get(nama) if row.get(nama) != '' else None) for nama in NAMA_KOLOM}
+
+def _impor_csv(conn, csv_path):
+    jumlah = 0
+    with open(csv_path, 'r', newline='', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        batch = []
+        for row in reader:
+            batch.append(_baris_db(row))
+            if len(batch) >= UKURAN_BATCH_IMPOR:
+                with conn:
+                    conn.executemany(_SQL_INSERT, batch)
+                jumlah += len(batch)
+                batch = []
+        if batch:
+            with conn:
+                conn.executemany(_SQL_INSERT, batch)
+            jumlah += len(batch)
+    return jumlah
+
+def impor_csv(csv_path, folder="logs"):
+    """
+    Impor detection_database.csv (atau CSV lain dengan header yang sama) ke database.
+
+    Returns:
+        int: jumlah baris yang diimpor
+    """
+    with _lock:
+        return _impor_csv(_buka(folder), csv_path)
+
+def simpan_baris(rows, folder="logs"):
+    """Simpan baris log (dict dengan kolom CSV_FIELDNAMES) dalam satu transaksi"""
+    with _lock:
+        conn = _buka(folder)
+        with conn:
+            conn.executemany(_SQL_INSERT, [_baris_db(row) for row in rows])
+
+def rentang_hari(tanggal=None):
+    """Batas timestamp [awal, akhir) untuk satu hari, format sama dengan kolom timestamp"""
+    tanggal = tanggal or datetime.now()
+    awal = tanggal.replace(hour=0, minute=0, second=0, microsecond=0)
+    akhir = awal + timedelta(days=1)
+    return awal.strftime('%Y-%m-%d %H:%M:%S'), akhir.strftime('%Y-%m-%d %H:%M:%S')
+
+def query(sql, params=(), folder="logs"):
+    """Jalankan query baca dan kembalikan semua baris sebagai list of sqlite3.Row"""
+    with _lock:
+        conn = _buka(folder)
+        cursor = conn.execute(sql, params)
+        cursor.row_factory = sqlite3.Row
+        return cursor.fetchall()
@@ -0,0 +1,127 @@
+"""
+Tracing per upload lintas client (Raspberry Pi) dan server inferensi JagaPadi.
+
+Client membuat trace ID untuk setiap upload dan mengirimkannya di header frame FILE
+(protokol v2 dengan opsi AUTH "jejak=1") atau di JSON TIMING (protokol v1). Setiap sisi
+mencatat span dengan jam monotonic, relatif terhadap awal transfer di sisinya sendiri,
+sehingga selisih jam dinding antar mesin tidak memengaruhi durasi. Server menggabungkan
+span client (dikirim lewat TIME/TIMING) dengan span miliknya dan menulis satu baris JSONL
+per upload; ekspor_chrome() mengubah baris-baris tersebut menjadi trace JSON Chrome/Perfetto.
+"""
+import os
+import json
+import threading
+from datetime import datetime
+
+UKURAN_ID = 8   # Byte trace ID di header frame FILE (16 karakter hex)
+
+# Urutan tahap untuk tampilan, sesuai alur satu upload
+TAHAP_CLIENT = ('upload', 'respon', 'dekripsi', 'simpan')
+TAHAP_SERVER = ('terima', 'antri', 'deteksi', 'enkripsi', 'kirim')
+
+def buat_id_jejak():
+    """Trace ID acak 64-bit dalam bentuk hex"""
+    return os.urandom(UKURAN_ID).hex()
+
+def id_ke_bytes(trace_id):
+    return bytes.fromhex(trace_id)
+
+def bytes_ke_id(data):
+    return bytes(data).hex()
+
+def span_relatif(span, awal):
+    """
+    Ubah span {nama: (mulai, selesai)} dari jam monotonic menjadi detik relatif terhadap `awal`
+    """
+    return {nama: [round(mulai - awal, 6), round(selesai - awal, 6)] for nama, (mulai, selesai) in span.items()}
+
+def path_jejak(folder, tanggal=None):
+    """File JSONL jejak harian di folder log"""
+    return os.path.join(folder, f"jejak_{(tanggal or datetime.now()).strftime('%Y%m%d')}.jsonl")
+
+class PenulisJejak:
+    """
+    Penulis file JSONL jejak harian. Record ditulis langsung (bukan lewat antrian arsip yang
+    bisa membuang tugas saat penuh) ke handle file yang tetap terbuka dan di-buffer per baris,
+    sehingga satu record = satu write() tanpa open/close dan tidak ada record yang hilang.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.lock = threading.Lock()
+        self._path = None
+        self._file = None
+
+    def tulis(self, record):
+        """Tambahkan satu record jejak (satu upload) sebagai satu baris JSON"""
+        baris = json.dumps(record, separators=(',', ':')) + "\n"
+        path = path_jejak(self.folder)
+        with self.lock:
+            if path != self._path:
+                # Hari berganti (atau penulisan pertama): pindah ke file jejak baru
+                if self._file is not None:
+                    self._file.close()
+                self._file = open(path, 'a', encoding='utf-8', buffering=1)
+                self._path = path
+            self._file.write(baris)
+
+    def tutup(self):
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._path = None
+
+def baca_jejak(paths):
+    """Baca record dari satu atau beberapa file JSONL; baris rusak dilewati"""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for baris in f:
+                try:
+                    yield json.loads(baris)
+                except ValueError:
+                    continue
+
+def durasi_total(record):
+    """Durasi end-to-end record (detik): span terakhir yang selesai di sisi mana pun"""
+    akhir = [selesai for sisi in ('client', 'server') for _, selesai in (record.get(sisi) or {}).values()]
+    return max(akhir) if akhir else 0.0
+
+def ekspor_chrome(records):
+    """
+    Susun trace JSON Chrome/Perfetto dari record jejak.
+
+    Setiap upload mendapat satu baris (tid) di proses 'client' dan 'server'. Awal upload
+    client disejajarkan dengan awal terima di server; jam dinding server hanya dipakai
+    untuk mengurutkan upload satu sama lain.
+
+    Returns:
+        dict: {'traceEvents': [...], 'displayTimeUnit': 'ms'}
+    """
+    events = [
+        {'ph': 'M', 'name': 'process_name', 'pid': 1, 'args': {'name': 'client'}},
+        {'ph': 'M', 'name': 'process_name', 'pid': 2, 'args': {'name': 'server'}},
+    ]
+    for baris, record in enumerate(records, 1):
+        dasar = record['waktu'] * 1e6
+        label = f"{record['filename']} [{record['trace_id']}]"
+        args = {
+            'trace_id': record['trace_id'],
+            'filename': record['filename'],
+            'client_ip': record.get('client_ip'),
+            'cache_hit': record.get('cache_hit', False)
+        }
+        for pid, sisi, urutan in ((1, 'client', TAHAP_CLIENT), (2, 'server', TAHAP_SERVER)):
+            span = record.get(sisi) or {}
+            if not span:
+                continue
+            events.append({'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': baris, 'args': {'name': label}})
+            for nama in sorted(span, key=lambda n: urutan.index(n) if n in urutan else len(urutan)):
+                mulai, selesai = span[nama]
+                events.append({
+                    'name': nama, 'cat': sisi, 'ph': 'X', 'pid': pid, 'tid': baris,
+                    'ts': round(dasar + mulai * 1e6, 1),
+                    'dur': round(max(0.0, selesai - mulai) * 1e6, 1),
+                    'args': args
+                })
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
@@ -1,134 +1,436 @@
 import os
 import csv
+import time
+import shutil
+import itertools
+import threading
+import weakref
 from datetime import datetime
 
-def tulis_log_txt(log_data, waktu_disc, durasi):
+from utils import database_deteksi
+from utils.agregat_harian import AgregatHarian
+
+# Kolom database CSV (kolom baru selalu ditambahkan di akhir)
+CSV_FIELDNAMES = [
+    'timestamp', 'client_ip', 'filename', 'labels', 
+    'size_ori_kb', 'size_enc_kb', 'waktu_terima', 'waktu_deteksi', 
+    'waktu_enkripsi', 'waktu_kirim', 'kecepatan_terima', 
+    'kecepatan_kirim', 'confidence', 'waktu_dekripsi_client',
+    'ukuran_hasil_client_kb', 'waktu_simpan_client', 'waktu_antri',
+    'cache_hit'
+]
+
+# Buffer log session di-flush ke disk setiap N baris atau setiap N detik
+LOG_FLUSH_BARIS = 20
+LOG_FLUSH_DETIK = 5.0
+
+# Session yang terbuka lama tanpa baris baru (koneksi pool client) tetap di-flush oleh thread
+# perawat; file session_*.txt sementara diperbarui setiap N detik selama ada baris baru
+LOG_SNAPSHOT_TXT_DETIK = 300.0
+
+# Baris log selalu disimpan ke database SQLite (utils.database_deteksi); salinan CSV
+# tetap ditulis untuk analisis di spreadsheet, set False untuk menonaktifkan
+LOG_TULIS_CSV = True
+
+# Agregat harian/per client di-snapshot ke logs/agregat_harian.json setiap N detik
+AGREGAT_SNAPSHOT_DETIK = 30.0
+AGREGAT_HARI_MAKS = 31
+
+# detection_database.csv dipakai bersama oleh semua session
+_csv_lock = threading.Lock()
+_nomor_sesi = itertools.count(1)
+
+# Session yang belum ditutup, diperiksa berkala oleh thread perawat (dibuat saat pertama dipakai)
+_sesi_terbuka = weakref.WeakSet()
+_sesi_lock = threading.Lock()
+_perawat_sesi = None
+
+# Satu AgregatHarian per folder log, dibuat saat pertama dipakai
+_agregat = {}
+_agregat_lock = threading.Lock()
+
+def ambil_agregat(folder="logs"):
+    """Agregat harian untuk folder log (dimuat dari snapshot jika ada)"""
+    with _agregat_lock:
+        agregat = _agregat.get(folder)
+        if agregat is None:
+            os.makedirs(folder, exist_ok=True)
+            agregat = _agregat[folder] = AgregatHarian(
+                os.path.join(folder, "agregat_harian.json"),
+                snapshot_detik=AGREGAT_SNAPSHOT_DETIK,
+                hari_maks=AGREGAT_HARI_MAKS
+            )
+        return agregat
+
+def simpan_agregat():
+    """Tulis snapshot semua agregat harian (panggil saat server shutdown)"""
+    with _agregat_lock:
+        daftar = list(_agregat.values())
+    for agregat in daftar:
+        agregat.simpan()
+
+def _daftarkan_sesi(sesi):
+    global _perawat_sesi
+    with _sesi_lock:
+        _sesi_terbuka.add(sesi)
+        if _perawat_sesi is None:
+            _perawat_sesi = threading.Thread(target=_rawat_sesi, name="log-sesi", daemon=True)
+            _perawat_sesi.start()
+
+def _lepas_sesi(sesi):
+    with _sesi_lock:
+        _sesi_terbuka.discard(sesi)
+
+def _rawat_sesi():
+    """Flush session yang idle setiap LOG_FLUSH_DETIK, walaupun tidak ada baris baru masuk"""
+    while True:
+        time.sleep(LOG_FLUSH_DETIK)
+        with _sesi_lock:
+            daftar = list(_sesi_terbuka)
+        for sesi in daftar:
+            try:
+                sesi.rawat()
+            except Exception as e:
+                print(f"[LOG] Gagal flush session {sesi.ip}: {e}")
+
+def _baris_txt(file_log):
+    """Format satu baris tabel DETAIL TRANSFER FILE"""
+    # Potong nama file jika terlalu panjang
+    filename = file_log['filename']
+    if len(filename) > 23:
+        filename = filename[:20] + "..."
+    
+    # Format label (gabung dengan koma jika multiple)
+    labels_str = ", ".join(file_log['labels']) if file_log['labels'] else ""
+    if len(labels_str) > 18:
+        labels_str = labels_str[:15] + "..."
+    
+    # Format angka dengan presisi yang sesuai
+    size_ori = f"{file_log['size_ori']:.2f}"
+    size_enc = f"{file_log['size_enc']:.2f}"
+    waktu_terima = f"{file_log.get('waktu_terima', 0):.4f}"
+    waktu_det = f"{file_log['waktu_deteksi']:.4f}"
+    waktu_antri = f"{file_log.get('waktu_antri', 0):.4f}"
+    waktu_enc = f"{file_log['waktu_enkripsi']:.4f}"
+    waktu_kirim = f"{file_log.get('waktu_kirim', 0):.4f}"
+    kec_masuk = f"{file_log.get('kecepatan_terima', 0):.1f}"
+    kec_keluar = f"{file_log.get('kecepatan_kirim', 0):.1f}"
+    
+    # Format timing client
+    waktu_dekripsi_client = f"{file_log.get('waktu_dekripsi_client', 0):.4f}"
+    waktu_simpan_client = f"{file_log.get('waktu_simpan_client', 0):.4f}"
+    
+    return f"{filename:<25} | {labels_str:<20} | {size_ori:>12} | {size_enc:>15} | {waktu_terima:>12} | {waktu_det:>13} | {waktu_antri:>12} | {waktu_enc:>14} | {waktu_kirim:>12} | {kec_masuk:>16} | {kec_keluar:>17} | {waktu_dekripsi_client:>20} | {waktu_simpan_client:>18}\n"
+
+def _baris_csv(client_ip, file_log):
+    """Susun satu baris detection_database.csv"""
+    return {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'client_ip': client_ip,
+        'filename': file_log['filename'],
+        'labels': "|".join(file_log['labels']) if file_log['labels'] else "",
+        'size_ori_kb': round(file_log['size_ori'], 2),
+        'size_enc_kb': round(file_log['size_enc'], 2),
+        'waktu_terima': round(file_log.get('waktu_terima', 0), 4),
+        'waktu_deteksi': round(file_log['waktu_deteksi'], 4),
+        'waktu_enkripsi': round(file_log['waktu_enkripsi'], 4),
+        'waktu_kirim': round(file_log.get('waktu_kirim', 0), 4),
+        'kecepatan_terima': round(file_log.get('kecepatan_terima', 0), 1),
+        'kecepatan_kirim': round(file_log.get('kecepatan_kirim', 0), 1),
+        'confidence': round(file_log['confidence'], 3),
+        'waktu_dekripsi_client': round(file_log.get('waktu_dekripsi_client', 0), 4),
+        'ukuran_hasil_client_kb': round(file_log.get('ukuran_hasil_client_kb', 0), 2),
+        'waktu_simpan_client': round(file_log.get('waktu_simpan_client', 0), 4),
+        'waktu_antri': round(file_log.get('waktu_antri', 0), 4),
+        'cache_hit': 1 if file_log.get('cache_hit') else 0
+    }
+
+def _migrasi_header_csv(csv_path, header_lama):
     """
-    Menulis log session dalam format TXT yang mudah dibaca
-    
-    Args:
-        log_data: dict berisi data client dan file logs
-        waktu_disc: datetime waktu disconnect
-        durasi: float durasi koneksi dalam detik
+    Tulis ulang database CSV lama dengan header CSV_FIELDNAMES (sekali saja), agar kolom
+    baru tidak terbuang. Baris lama diberi nilai kosong untuk kolom yang belum ada;
+    kolom tak dikenal di file lama dipertahankan di akhir.
     """
-    # Format nama file log berdasarkan waktu connect
-    connect_time_str = log_data['connect_time'].strftime("%Y%m%d_%H%M%S")
-    log_filename = f"session_{connect_time_str}.txt"
-    log_path = os.path.join("logs", log_filename)
-    
-    # Hitung statistik session
-    jumlah_file = len(log_data['file_logs'])
-    jumlah_deteksi = sum(1 for file_log in log_data['file_logs'] if file_log['labels'])
-    
-    # Hitung rata-rata confidence (hanya file yang ada deteksi)
-    confidence_values = [file_log['confidence'] for file_log in log_data['file_logs'] if file_log['confidence'] > 0]
-    rata_conf = sum(confidence_values) / len(confidence_values) if confidence_values else 0.0
-    
-    # Hitung statistik timing dekripsi client
-    client_decrypt_times = [file_log.get('waktu_dekripsi_client', 0) for file_log in log_data['file_logs'] if file_log.get('waktu_dekripsi_client', 0) > 0]
-    rata_decrypt_client = sum(client_decrypt_times) / len(client_decrypt_times) if client_decrypt_times else 0.0
-    total_decrypt_client = sum(client_decrypt_times)
-    
-    # Hitung statistik timing simpan client
-    client_save_times = [file_log.get('waktu_simpan_client', 0) for file_log in log_data['file_logs'] if file_log.get('waktu_simpan_client', 0) > 0]
-    rata_save_client = sum(client_save_times) / len(client_save_times) if client_save_times else 0.0
-    total_save_client = sum(client_save_times)
-    
-    with open(log_path, 'w', encoding='utf-8') as f:
-        # Header session
-        f.write("=" * 80 + "\n")
-        f.write(f"IP Client             : {log_data['ip']}\n")
-        f.write(f"Connected             : {log_data['connect_time'].strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Disconnected          : {waktu_disc.strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Total Waktu Session   : {durasi:.2f} detik\n")
-        f.write(f"Jumlah File           : {jumlah_file}\n")
-        f.write(f"Jumlah Deteksi        : {jumlah_deteksi}\n")
-        f.write(f"Rata-rata Confidence  : {rata_conf:.3f}\n")
-        f.write("=" * 80 + "\n")
+    fieldnames = CSV_FIELDNAMES + [kolom for kolom in header_lama if kolom not in CSV_FIELDNAMES]
+    sementara = csv_path + ".tmp"
+    with open(csv_path, 'r', newline='', encoding='utf-8') as lama, \
+            open(sementara, 'w', newline='', encoding='utf-8') as baru:
+        writer = csv.DictWriter(baru, fieldnames=fieldnames, restval='')
+        writer.writeheader()
+        writer.writerows(csv.DictReader(lama))
+    os.replace(sementara, csv_path)
+    print(f"[LOG] Header {os.path.basename(csv_path)} dimigrasi ke {len(fieldnames)} kolom")
+    return fieldnames
+
+def _tulis_baris_csv(csv_path, rows):
+    """Tambahkan baris ke database CSV, tulis header jika file baru"""
+    with _csv_lock:
+        # Cek apakah file CSV sudah ada (untuk header)
+        file_exists = os.path.exists(csv_path)
+
+        fieldnames = CSV_FIELDNAMES
+        if file_exists:
+            with open(csv_path, 'r', newline='', encoding='utf-8') as csvfile:
+                header_lama = next(csv.reader(csvfile), None)
+            if header_lama and any(kolom not in header_lama for kolom in CSV_FIELDNAMES):
+                # Database dari versi sebelumnya: tambahkan kolom baru ke header
+                fieldnames = _migrasi_header_csv(csv_path, header_lama)
+            elif header_lama:
+                # Pakai header file agar kolom tidak bergeser pada database yang sudah ada
+                fieldnames = header_lama
+
+        with open(csv_path, 'a', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+
+            # Tulis header jika file baru
+            if not file_exists:
+                writer.writeheader()
+
+            writer.writerows(rows)
+
+def _simpan_baris(folder, rows):
+    """Simpan baris log ke database (lebih dulu, agar impor CSV lama tidak dobel) lalu ke CSV"""
+    database_deteksi.simpan_baris(rows, folder)
+    if LOG_TULIS_CSV:
+        _tulis_baris_csv(os.path.join(folder, "detection_database.csv"), rows)
+
+class LogSesi:
+    """
+    Logger session inkremental.
+
+    Setiap entri file langsung ditambahkan lewat tambah() dan di-flush secara berkala ke
+    detection_database.csv serta ke file sementara session (.part), sehingga memori per
+    session tetap O(1) dan baris yang sudah di-flush tidak hilang jika server crash.
+    Statistik session disimpan sebagai agregat berjalan; tutup() menyusun file
+    session_*.txt final dengan format yang sama seperti tulis_log_txt. Selama session
+    terbuka, thread perawat mem-flush baris yang tertahan lebih dari flush_detik dan
+    memperbarui session_*.txt sementara setiap LOG_SNAPSHOT_TXT_DETIK.
+    """
+
+    def __init__(self, ip, connect_time, folder="logs", tulis_csv=True,
+                 flush_baris=LOG_FLUSH_BARIS, flush_detik=LOG_FLUSH_DETIK):
+        self.ip = ip
+        self.connect_time = connect_time
+        self.folder = folder
+        self.tulis_csv = tulis_csv
+        self.flush_baris = flush_baris
+        self.flush_detik = flush_detik
+        self.lock = threading.Lock()
+
+        # Buffer baris yang belum ditulis ke disk
+        self.buffer_txt = []
+        self.buffer_csv = []
+        self.terakhir_flush = time.time()
+        self.path_part = None
+        self.terakhir_snapshot = time.time()
+        self.jumlah_file_snapshot = 0
+        self.ditutup = False
+
+        # Agregat berjalan untuk header dan summary session
+        self.jumlah_file = 0
+        self.jumlah_deteksi = 0
+        self.jumlah_cache_hit = 0
+        self.total_conf = 0.0
+        self.jumlah_conf = 0
+        self.total_decrypt_client = 0.0
+        self.jumlah_decrypt_client = 0
+        self.total_save_client = 0.0
+        self.jumlah_save_client = 0
+        self.total_server_receive = 0.0
+        self.total_server_detect = 0.0
+        self.total_server_encrypt = 0.0
+        self.total_server_send = 0.0
+
+        _daftarkan_sesi(self)
+
+    def tambah(self, file_log):
+        """Catat satu entri file (dict dari buat_file_log)"""
+        with self.lock:
+            self.jumlah_file += 1
+            if file_log['labels']:
+                self.jumlah_deteksi += 1
+            if file_log.get('cache_hit'):
+                self.jumlah_cache_hit += 1
+            if file_log['confidence'] > 0:
+                self.total_conf += file_log['confidence']
+                self.jumlah_conf += 1
+            if file_log.get('waktu_dekripsi_client', 0) > 0:
+                self.total_decrypt_client += file_log['waktu_dekripsi_client']
+                self.jumlah_decrypt_client += 1
+            if file_log.get('waktu_simpan_client', 0) > 0:
+                self.total_save_client += file_log['waktu_simpan_client']
+                self.jumlah_save_client += 1
+            self.total_server_receive += file_log.get('waktu_terima', 0)
+            self.total_server_detect += file_log['waktu_deteksi']
+            self.total_server_encrypt += file_log['waktu_enkripsi']
+            self.total_server_send += file_log.get('waktu_kirim', 0)
+
+            self.buffer_txt.append(_baris_txt(file_log))
+            if self.tulis_csv:
+                self.buffer_csv.append(_baris_csv(self.ip, file_log))
+                ambil_agregat(self.folder).tambah(self.ip, file_log)
+
+            if (len(self.buffer_txt) >= self.flush_baris
+                    or time.time() - self.terakhir_flush >= self.flush_detik):
+                self._flush()
+
+    def flush(self):
+        """Tulis semua baris yang masih di buffer ke disk"""
+        with self.lock:
+            self._flush()
+
+    def rawat(self):
+        """
+        Dipanggil berkala oleh thread perawat: flush baris yang sudah menunggu flush_detik
+        dan tulis ulang session_*.txt sementara jika ada baris baru sejak snapshot terakhir
+        """
+        with self.lock:
+            if self.ditutup:
+                return
+            sekarang = time.time()
+            if self.buffer_txt and sekarang - self.terakhir_flush >= self.flush_detik:
+                self._flush()
+            if (self.jumlah_file > self.jumlah_file_snapshot
+                    and sekarang - self.terakhir_snapshot >= LOG_SNAPSHOT_TXT_DETIK):
+                self._flush()
+                waktu = datetime.now()
+                self._tulis_txt(waktu, (waktu - self.connect_time).total_seconds(), selesai=False)
+                self.terakhir_snapshot = sekarang
+                self.jumlah_file_snapshot = self.jumlah_file
+
+    def _flush(self):
+        if self.buffer_txt:
+            if self.path_part is None:
+                connect_time_str = self.connect_time.strftime("%Y%m%d_%H%M%S")
+                self.path_part = os.path.join(self.folder, f"session_{connect_time_str}_{next(_nomor_sesi)}.part")
+            with open(self.path_part, 'a', encoding='utf-8') as f:
+                f.write("".join(self.buffer_txt))
+            self.buffer_txt.clear()
+        if self.buffer_csv:
+            _simpan_baris(self.folder, self.buffer_csv)
+            self.buffer_csv.clear()
+        self.terakhir_flush = time.time()
+
+    def tutup(self, waktu_disc, durasi):
+        """
+        Flush sisa buffer lalu tulis log session dalam format TXT yang mudah dibaca
+        
+        Args:
+            waktu_disc: datetime waktu disconnect
+            durasi: float durasi koneksi dalam detik
         
-        # Statistik Timing Client (jika ada data)
-        if client_decrypt_times or client_save_times:
-            f.write("STATISTIK TIMING CLIENT:\n")
-            f.write("-" * 50 + "\n")
-            if client_decrypt_times:
-                f.write(f"Rata-rata Dekripsi Client : {rata_decrypt_client:.4f} detik\n")
-                f.write(f"Total Dekripsi Client     : {total_decrypt_client:.4f} detik\n")
-            if client_save_times:
-                f.write(f"Rata-rata Simpan Client   : {rata_save_client:.4f} detik\n")
-                f.write(f"Total Simpan Client       : {total_save_client:.4f} detik\n")
-            f.write("-" * 50 + "\n")
+        Returns:
+            int: jumlah file yang tercatat di session (0 = tidak ada file log)
+        """
+        _lepas_sesi(self)
+        with self.lock:
+            self.ditutup = True
+            self._flush()
+            if self.jumlah_file == 0:
+                return 0
+            if self.tulis_csv:
+                ambil_agregat(self.folder).tambah_sesi(self.ip)
+            self._tulis_txt(waktu_disc, durasi)
+            os.remove(self.path_part)
+            self.path_part = None
+            return self.jumlah_file
+
+    def _tulis_txt(self, waktu_disc, durasi, selesai=True):
+        # Format nama file log berdasarkan waktu connect
+        connect_time_str = self.connect_time.strftime("%Y%m%d_%H%M%S")
+        log_filename = f"session_{connect_time_str}.txt"
+        log_path = os.path.join(self.folder, log_filename)
+        
+        jumlah_file = self.jumlah_file
+        rata_conf = self.total_conf / self.jumlah_conf if self.jumlah_conf else 0.0
+        rata_decrypt_client = self.total_decrypt_client / self.jumlah_decrypt_client if self.jumlah_decrypt_client else 0.0
+        rata_save_client = self.total_save_client / self.jumlah_save_client if self.jumlah_save_client else 0.0
+        total_decrypt_client = self.total_decrypt_client
+        total_save_client = self.total_save_client
+        ada_timing_client = self.jumlah_decrypt_client or self.jumlah_save_client
         
-        # Detail transfer file
-        if jumlah_file > 0:
+        with open(log_path, 'w', encoding='utf-8') as f:
+            # Header session
+            f.write("=" * 80 + "\n")
+            f.write(f"IP Client             : {self.ip}\n")
+            f.write(f"Connected             : {self.connect_time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+            if selesai:
+                f.write(f"Disconnected          : {waktu_disc.strftime('%Y-%m-%d %H:%M:%S')}\n")
+            else:
+                f.write(f"Disconnected          : - (masih terhubung, snapshot {waktu_disc.strftime('%Y-%m-%d %H:%M:%S')})\n")
+            f.write(f"Total Waktu Session   : {durasi:.2f} detik\n")
+            f.write(f"Jumlah File           : {jumlah_file}\n")
+            f.write(f"Jumlah Deteksi        : {self.jumlah_deteksi}\n")
+            f.write(f"Rata-rata Confidence  : {rata_conf:.3f}\n")
+            f.write(f"Cache Hit / Miss      : {self.jumlah_cache_hit} / {jumlah_file - self.jumlah_cache_hit}\n")
+            f.write("=" * 80 + "\n")
+            
+            # Statistik Timing Client (jika ada data)
+            if ada_timing_client:
+                f.write("STATISTIK TIMING CLIENT:\n")
+                f.write("-" * 50 + "\n")
+                if self.jumlah_decrypt_client:
+                    f.write(f"Rata-rata Dekripsi Client : {rata_decrypt_client:.4f} detik\n")
+                    f.write(f"Total Dekripsi Client     : {total_decrypt_client:.4f} detik\n")
+                if self.jumlah_save_client:
+                    f.write(f"Rata-rata Simpan Client   : {rata_save_client:.4f} detik\n")
+                    f.write(f"Total Simpan Client       : {total_save_client:.4f} detik\n")
+                f.write("-" * 50 + "\n")
+            
+            # Detail transfer file
             f.write("DETAIL TRANSFER FILE:\n")
-            f.write("-" * 250 + "\n")
+            f.write("-" * 265 + "\n")
             
             # Header tabel dengan kolom tambahan untuk client timing
-            header = f"{'Nama File':<25} | {'Label Deteksi':<20} | {'Uk. Asli (KB)':>12} | {'Uk. Enkripsi (KB)':>15} | {'W. Terima (s)':>12} | {'W. Deteksi (s)':>13} | {'W. Enkripsi (s)':>14} | {'W. Kirim (s)':>12} | {'Kec. Masuk (KB/s)':>16} | {'Kec. Keluar (KB/s)':>17} | {'W. Dekripsi Client (s)':>20} | {'W. Simpan Client (s)':>18}"
+            header = f"{'Nama File':<25} | {'Label Deteksi':<20} | {'Uk. Asli (KB)':>12} | {'Uk. Enkripsi (KB)':>15} | {'W. Terima (s)':>12} | {'W. Deteksi (s)':>13} | {'W. Antri (s)':>12} | {'W. Enkripsi (s)':>14} | {'W. Kirim (s)':>12} | {'Kec. Masuk (KB/s)':>16} | {'Kec. Keluar (KB/s)':>17} | {'W. Dekripsi Client (s)':>20} | {'W. Simpan Client (s)':>18}"
             f.write(header + "\n")
-            f.write("-" * 250 + "\n")
+            f.write("-" * 265 + "\n")
             
-            # Data setiap file
-            for file_log in log_data['file_logs']:
-                # Potong nama file jika terlalu panjang
-                filename = file_log['filename']
-                if len(filename) > 23:
-                    filename = filename[:20] + "..."
-                
-                # Format label (gabung dengan koma jika multiple)
-                labels_str = ", ".join(file_log['labels']) if file_log['labels'] else ""
-                if len(labels_str) > 18:
-                    labels_str = labels_str[:15] + "..."
-                
-                # Format angka dengan presisi yang sesuai
-                size_ori = f"{file_log['size_ori']:.2f}"
-                size_enc = f"{file_log['size_enc']:.2f}"
-                waktu_terima = f"{file_log.get('waktu_terima', 0):.4f}"
-                waktu_det = f"{file_log['waktu_deteksi']:.4f}"
-                waktu_enc = f"{file_log['waktu_enkripsi']:.4f}"
-                waktu_kirim = f"{file_log.get('waktu_kirim', 0):.4f}"
-                kec_masuk = f"{file_log.get('kecepatan_terima', 0):.1f}"
-                kec_keluar = f"{file_log.get('kecepatan_kirim', 0):.1f}"
-                
-                # Format timing client
-                waktu_dekripsi_client = f"{file_log.get('waktu_dekripsi_client', 0):.4f}"
-                waktu_simpan_client = f"{file_log.get('waktu_simpan_client', 0):.4f}"
-                
-                # Tulis baris data
-                row = f"{filename:<25} | {labels_str:<20} | {size_ori:>12} | {size_enc:>15} | {waktu_terima:>12} | {waktu_det:>13} | {waktu_enc:>14} | {waktu_kirim:>12} | {kec_masuk:>16} | {kec_keluar:>17} | {waktu_dekripsi_client:>20} | {waktu_simpan_client:>18}"
-                f.write(row + "\n")
-        
-        f.write("\n")
-        
-        # Summary timing jika ada data client
-        if client_decrypt_times or client_save_times:
-            f.write("SUMMARY TIMING LENGKAP:\n")
-            f.write("-" * 60 + "\n")
+            # Data setiap file disalin dari file .part tanpa dimuat ke memori
+            with open(self.path_part, 'r', encoding='utf-8') as part:
+                shutil.copyfileobj(part, f)
             
-            # Hitung total waktu server
-            total_server_detect = sum(file_log['waktu_deteksi'] for file_log in log_data['file_logs'])
-            total_server_encrypt = sum(file_log['waktu_enkripsi'] for file_log in log_data['file_logs'])
-            total_server_receive = sum(file_log.get('waktu_terima', 0) for file_log in log_data['file_logs'])
-            total_server_send = sum(file_log.get('waktu_kirim', 0) for file_log in log_data['file_logs'])
-            
-            f.write(f"TOTAL SERVER PROCESSING:\n")
-            f.write(f"  - Terima data      : {total_server_receive:.4f} detik\n")
-            f.write(f"  - Deteksi YOLO     : {total_server_detect:.4f} detik\n")
-            f.write(f"  - Enkripsi AES     : {total_server_encrypt:.4f} detik\n")
-            f.write(f"  - Kirim hasil      : {total_server_send:.4f} detik\n")
-            f.write(f"  - TOTAL SERVER     : {total_server_receive + total_server_detect + total_server_encrypt + total_server_send:.4f} detik\n")
             f.write("\n")
             
-            if client_decrypt_times or client_save_times:
+            # Summary timing jika ada data client
+            if ada_timing_client:
+                f.write("SUMMARY TIMING LENGKAP:\n")
+                f.write("-" * 60 + "\n")
+                
+                total_server = self.total_server_receive + self.total_server_detect + self.total_server_encrypt + self.total_server_send
+                
+                f.write(f"TOTAL SERVER PROCESSING:\n")
+                f.write(f"  - Terima data      : {self.total_server_receive:.4f} detik\n")
+                f.write(f"  - Deteksi YOLO     : {self.total_server_detect:.4f} detik\n")
+                f.write(f"  - Enkripsi AES     : {self.total_server_encrypt:.4f} detik\n")
+                f.write(f"  - Kirim hasil      : {self.total_server_send:.4f} detik\n")
+                f.write(f"  - TOTAL SERVER     : {total_server:.4f} detik\n")
+                f.write("\n")
+                
                 f.write(f"TOTAL CLIENT PROCESSING:\n")
                 f.write(f"  - Dekripsi AES     : {total_decrypt_client:.4f} detik\n")
                 f.write(f"  - Simpan file      : {total_save_client:.4f} detik\n")
                 f.write(f"  - TOTAL CLIENT     : {total_decrypt_client + total_save_client:.4f} detik\n")
                 f.write("\n")
                 
-                f.write(f"TOTAL KESELURUHAN   : {total_server_receive + total_server_detect + total_server_encrypt + total_server_send + total_decrypt_client + total_save_client:.4f} detik\n")
-            
-            f.write("-" * 60 + "\n")
+                f.write(f"TOTAL KESELURUHAN   : {total_server + total_decrypt_client + total_save_client:.4f} detik\n")
+                
+                f.write("-" * 60 + "\n")
+
+def tulis_log_txt(log_data, waktu_disc, durasi):
+    """
+    Menulis log session dalam format TXT yang mudah dibaca
+    
+    Args:
+        log_data: dict berisi data client dan file logs
+        waktu_disc: datetime waktu disconnect
+        durasi: float durasi koneksi dalam detik
+    """
+    sesi = LogSesi(log_data['ip'], log_data['connect_time'], tulis_csv=False,
+                   flush_baris=len(log_data['file_logs']) + 1)
+    for file_log in log_data['file_logs']:
+        sesi.tambah(file_log)
+    sesi.tutup(waktu_disc, durasi)
 
 def tulis_log_csv(log_data):
     """
@@ -137,101 +439,53 @@ def tulis_log_csv(log_data):
     Args:
         log_data: dict berisi data client dan file logs
     """
-    csv_path = os.path.join("logs", "detection_database.csv")
+    _simpan_baris("logs", [_baris_csv(log_data['ip'], file_log) for file_log in log_data['file_logs']])
     
-    # Cek apakah file CSV sudah ada (untuk header)
-    file_exists = os.path.exists(csv_path)
-    
-    with open(csv_path, 'a', newline='', encoding='utf-8') as csvfile:
-        fieldnames = [
-            'timestamp', 'client_ip', 'filename', 'labels', 
-            'size_ori_kb', 'size_enc_kb', 'waktu_terima', 'waktu_deteksi', 
-            'waktu_enkripsi', 'waktu_kirim', 'kecepatan_terima', 
-            'kecepatan_kirim', 'confidence', 'waktu_dekripsi_client',
-            'ukuran_hasil_client_kb', 'waktu_simpan_client'
-        ]
-        
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        # Tulis header jika file baru
-        if not file_exists:
-            writer.writeheader()
-        
-        # Tulis data setiap file
-        for file_log in log_data['file_logs']:
-            writer.writerow({
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'client_ip': log_data['ip'],
-                'filename': file_log['filename'],
-                'labels': "|".join(file_log['labels']) if file_log['labels'] else "",
-                'size_ori_kb': round(file_log['size_ori'], 2),
-                'size_enc_kb': round(file_log['size_enc'], 2),
-                'waktu_terima': round(file_log.get('waktu_terima', 0), 4),
-                'waktu_deteksi': round(file_log['waktu_deteksi'], 4),
-                'waktu_enkripsi': round(file_log['waktu_enkripsi'], 4),
-                'waktu_kirim': round(file_log.get('waktu_kirim', 0), 4),
-                'kecepatan_terima': round(file_log.get('kecepatan_terima', 0), 1),
-                'kecepatan_kirim': round(file_log.get('kecepatan_kirim', 0), 1),
-                'confidence': round(file_log['confidence'], 3),
-                'waktu_dekripsi_client': round(file_log.get('waktu_dekripsi_client', 0), 4),
-                'ukuran_hasil_client_kb': round(file_log.get('ukuran_hasil_client_kb', 0), 2),
-                'waktu_simpan_client': round(file_log.get('waktu_simpan_client', 0), 4)
-            })
+    agregat = ambil_agregat("logs")
+    for file_log in log_data['file_logs']:
+        agregat.tambah(log_data['ip'], file_log)
+    if log_data['file_logs']:
+        agregat.tambah_sesi(log_data['ip'])
 
 def buat_log_summary_harian():
     """
-    Membuat summary log harian dari semua session
+    Membuat summary log harian dari agregat harian (waktu konstan, tanpa scan log)
     """
     today = datetime.now().strftime("%Y%m%d")
     summary_path = os.path.join("logs", f"daily_summary_{today}.txt")
     
-    # Scan semua file log hari ini
-    log_files = []
-    for filename in os.listdir("logs"):
-        if filename.startswith("session_") and filename.startswith(f"session_{today}"):
-            log_files.append(filename)
-    
-    if not log_files:
+    ringkasan = ambil_agregat("logs").ringkasan()
+    if ringkasan is None:
         return
     
-    # Hitung statistik harian
-    total_sessions = len(log_files)
-    total_files = 0
-    total_detections = 0
-    unique_ips = set()
-    total_client_decrypt_time = 0
-    total_client_save_time = 0
-    client_processes = 0
-    
-    # Baca CSV untuk statistik detail
-    csv_path = os.path.join("logs", "detection_database.csv")
-    if os.path.exists(csv_path):
-        with open(csv_path, 'r', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if row['timestamp'].startswith(today.replace('', '-')):
-                    total_files += 1
-                    if row['labels']:
-                        total_detections += 1
-                    unique_ips.add(row['client_ip'])
-                    
-                    # Statistik client timing
-                    if row.get('waktu_dekripsi_client') and float(row['waktu_dekripsi_client']) > 0:
-                        total_client_decrypt_time += float(row['waktu_dekripsi_client'])
-                        client_processes += 1
-                    if row.get('waktu_simpan_client') and float(row['waktu_simpan_client']) > 0:
-                        total_client_save_time += float(row['waktu_simpan_client'])
+    semua = ringkasan['semua']
+    kolom = semua['kolom']
+    total_files = semua['total_files']
+    total_detections = semua['total_detections']
+    client_processes = kolom['waktu_dekripsi_client']['jumlah']
+    total_client_decrypt_time = kolom['waktu_dekripsi_client']['total']
+    total_client_save_time = kolom['waktu_simpan_client']['total']
     
     # Tulis summary
     with open(summary_path, 'w', encoding='utf-8') as f:
         f.write("=" * 60 + "\n")
         f.write(f"DAILY SUMMARY - {today}\n")
         f.write("=" * 60 + "\n")
-        f.write(f"Total Sessions     : {total_sessions}\n")
-        f.write(f"Unique IPs         : {len(unique_ips)}\n")
+        f.write(f"Total Sessions     : {semua['total_sessions']}\n")
+        f.write(f"Unique IPs         : {len(ringkasan['client'])}\n")
         f.write(f"Total Files        : {total_files}\n")
         f.write(f"Total Detections   : {total_detections}\n")
-        f.write(f"Detection Rate     : {(total_detections/total_files*100):.1f}%\n" if total_files > 0 else "Detection Rate     : 0.0%\n")
+        f.write(f"Detection Rate     : {semua['detection_rate']:.1f}%\n")
+        f.write(f"Cache Hit          : {semua['cache_hit']}\n")
+        f.write("-" * 60 + "\n")
+        
+        # Statistik timing server (rata-rata, std dan kuantil dari sketsa)
+        f.write("SERVER TIMING STATISTICS (detik):\n")
+        f.write(f"{'Tahap':<16} {'Rata':>8} {'Std':>8} {'p50':>8} {'p95':>8} {'p99':>8}\n")
+        for nama, label in [('waktu_terima', 'Terima'), ('waktu_antri', 'Antri'), ('waktu_deteksi', 'Deteksi'),
+                            ('waktu_enkripsi', 'Enkripsi'), ('waktu_kirim', 'Kirim')]:
+            stat = kolom[nama]
+            f.write(f"{label:<16} {stat['rata']:>8.4f} {stat['std']:>8.4f} {stat['p50']:>8.4f} {stat['p95']:>8.4f} {stat['p99']:>8.4f}\n")
         f.write("-" * 60 + "\n")
         
         # Statistik Client Processing
@@ -271,131 +525,101 @@ def cleanup_old_logs(days_to_keep=30):
 # Fungsi utility untuk membaca log
 def baca_statistik_hari_ini():
     """
-    Membaca statistik hari ini dari CSV
+    Membaca statistik hari ini dari agregat harian. Jika agregat hari ini belum ada
+    (misalnya snapshot hilang), statistik dihitung dari database deteksi.
     
     Returns:
         dict: statistik hari ini
     """
-    today = datetime.now().strftime("%Y-%m-%d")
-    csv_path = os.path.join("logs", "detection_database.csv")
-    
-    stats = {
-        'total_files': 0,
-        'total_detections': 0,
-        'avg_confidence': 0.0,
-        'avg_detection_time': 0.0,
-        'unique_ips': set(),
-        'avg_client_decrypt_time': 0.0,
-        'avg_client_save_time': 0.0,
-        'total_client_decrypt_time': 0.0,
-        'total_client_save_time': 0.0,
-        'files_with_client_data': 0
+    ringkasan = ambil_agregat("logs").ringkasan()
+    if ringkasan is None:
+        return _baca_statistik_hari_ini_db()
+    
+    semua = ringkasan['semua']
+    kolom = semua['kolom']
+    return {
+        'total_files': semua['total_files'],
+        'total_detections': semua['total_detections'],
+        'avg_confidence': kolom['confidence']['rata'],
+        'avg_detection_time': kolom['waktu_deteksi']['rata'],
+        'unique_ips': len(ringkasan['client']),
+        'avg_client_decrypt_time': kolom['waktu_dekripsi_client']['rata'],
+        'avg_client_save_time': kolom['waktu_simpan_client']['rata'],
+        'total_client_decrypt_time': kolom['waktu_dekripsi_client']['total'],
+        'total_client_save_time': kolom['waktu_simpan_client']['total'],
+        'files_with_client_data': kolom['waktu_dekripsi_client']['jumlah'],
+        'p95_detection_time': kolom['waktu_deteksi']['p95']
     }
-    
-    if not os.path.exists(csv_path):
-        return stats
-    
-    confidence_values = []
-    detection_times = []
-    client_decrypt_times = []
-    client_save_times = []
-    
-    with open(csv_path, 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            if row['timestamp'].startswith(today):
-                stats['total_files'] += 1
-                stats['unique_ips'].add(row['client_ip'])
-                
-                if row['labels']:
-                    stats['total_detections'] += 1
-                    if float(row['confidence']) > 0:
-                        confidence_values.append(float(row['confidence']))
-                
-                detection_times.append(float(row['waktu_deteksi']))
-                
-                # Statistik client
-                if row.get('waktu_dekripsi_client') and float(row['waktu_dekripsi_client']) > 0:
-                    client_decrypt_times.append(float(row['waktu_dekripsi_client']))
-                    stats['files_with_client_data'] += 1
-                
-                if row.get('waktu_simpan_client') and float(row['waktu_simpan_client']) > 0:
-                    client_save_times.append(float(row['waktu_simpan_client']))
-    
-    # Hitung rata-rata
-    if confidence_values:
-        stats['avg_confidence'] = sum(confidence_values) / len(confidence_values)
-    
-    if detection_times:
-        stats['avg_detection_time'] = sum(detection_times) / len(detection_times)
-    
-    if client_decrypt_times:
-        stats['avg_client_decrypt_time'] = sum(client_decrypt_times) / len(client_decrypt_times)
-        stats['total_client_decrypt_time'] = sum(client_decrypt_times)
-    
-    if client_save_times:
-        stats['avg_client_save_time'] = sum(client_save_times) / len(client_save_times)
-        stats['total_client_save_time'] = sum(client_save_times)
-    
-    stats['unique_ips'] = len(stats['unique_ips'])
-    
-    return stats
+
+def _baca_statistik_hari_ini_db():
+    """Statistik hari ini lewat range query pada database deteksi"""
+    row = database_deteksi.query("""
+        SELECT COUNT(*) AS total_files,
+               COALESCE(SUM(labels != ''), 0) AS total_detections,
+               AVG(CASE WHEN labels != '' AND confidence > 0 THEN confidence END) AS avg_confidence,
+               AVG(waktu_deteksi) AS avg_detection_time,
+               COUNT(DISTINCT client_ip) AS unique_ips,
+               AVG(CASE WHEN waktu_dekripsi_client > 0 THEN waktu_dekripsi_client END) AS avg_client_decrypt_time,
+               AVG(CASE WHEN waktu_simpan_client > 0 THEN waktu_simpan_client END) AS avg_client_save_time,
+               SUM(CASE WHEN waktu_dekripsi_client > 0 THEN waktu_dekripsi_client END) AS total_client_decrypt_time,
+               SUM(CASE WHEN waktu_simpan_client > 0 THEN waktu_simpan_client END) AS total_client_save_time,
+               COALESCE(SUM(waktu_dekripsi_client > 0), 0) AS files_with_client_data
+        FROM deteksi WHERE timestamp >= ? AND timestamp < ?
+    """, database_deteksi.rentang_hari())[0]
+    
+    # AVG/SUM bernilai NULL jika tidak ada baris yang cocok
+    return {kolom: (row[kolom] if row[kolom] is not None else 0.0) for kolom in row.keys()}
 
 def baca_analisis_performa_client():
     """
-    Membaca dan menganalisis performa client dari log
+    Membaca dan menganalisis performa client dari agregat harian
+    (fallback ke database deteksi jika agregat hari ini belum ada)
     
     Returns:
         dict: analisis performa client
     """
-    today = datetime.now().strftime("%Y-%m-%d")
-    csv_path = os.path.join("logs", "detection_database.csv")
+    ringkasan = ambil_agregat("logs").ringkasan()
+    if ringkasan is None:
+        return _baca_analisis_performa_client_db()
     
     client_stats = {}
+    for client_ip, grup in ringkasan['client'].items():
+        kolom = grup['kolom']
+        client_stats[client_ip] = {
+            'total_files': grup['total_files'],
+            'total_detections': grup['total_detections'],
+            'avg_decrypt_time': kolom['waktu_dekripsi_client']['rata'],
+            'avg_save_time': kolom['waktu_simpan_client']['rata'],
+            'avg_confidence': kolom['confidence']['rata'],
+            'detection_rate': grup['detection_rate'],
+            'p95_decrypt_time': kolom['waktu_dekripsi_client']['p95'],
+            'p95_detection_time': kolom['waktu_deteksi']['p95']
+        }
+    
+    return client_stats
+
+def _baca_analisis_performa_client_db():
+    """Analisis performa per client lewat range query pada database deteksi"""
+    rows = database_deteksi.query("""
+        SELECT client_ip,
+               COUNT(*) AS total_files,
+               COALESCE(SUM(labels != ''), 0) AS total_detections,
+               AVG(CASE WHEN waktu_dekripsi_client > 0 THEN waktu_dekripsi_client END) AS avg_decrypt_time,
+               AVG(CASE WHEN waktu_simpan_client > 0 THEN waktu_simpan_client END) AS avg_save_time,
+               AVG(CASE WHEN labels != '' AND confidence > 0 THEN confidence END) AS avg_confidence
+        FROM deteksi WHERE timestamp >= ? AND timestamp < ?
+        GROUP BY client_ip
+    """, database_deteksi.rentang_hari())
     
-    if not os.path.exists(csv_path):
-        return client_stats
-    
-    with open(csv_path, 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            if row['timestamp'].startswith(today):
-                client_ip = row['client_ip']
-                
-                if client_ip not in client_stats:
-                    client_stats[client_ip] = {
-                        'total_files': 0,
-                        'total_detections': 0,
-                        'decrypt_times': [],
-                        'save_times': [],
-                        'confidence_values': []
-                    }
-                
-                client_stats[client_ip]['total_files'] += 1
-                
-                if row['labels']:
-                    client_stats[client_ip]['total_detections'] += 1
-                    if float(row['confidence']) > 0:
-                        client_stats[client_ip]['confidence_values'].append(float(row['confidence']))
-                
-                if row.get('waktu_dekripsi_client') and float(row['waktu_dekripsi_client']) > 0:
-                    client_stats[client_ip]['decrypt_times'].append(float(row['waktu_dekripsi_client']))
-                
-                if row.get('waktu_simpan_client') and float(row['waktu_simpan_client']) > 0:
-                    client_stats[client_ip]['save_times'].append(float(row['waktu_simpan_client']))
-    
-    # Hitung statistik per client
-    for client_ip in client_stats:
-        stats = client_stats[client_ip]
-        
-        stats['avg_decrypt_time'] = sum(stats['decrypt_times']) / len(stats['decrypt_times']) if stats['decrypt_times'] else 0
-        stats['avg_save_time'] = sum(stats['save_times']) / len(stats['save_times']) if stats['save_times'] else 0
-        stats['avg_confidence'] = sum(stats['confidence_values']) / len(stats['confidence_values']) if stats['confidence_values'] else 0
-        stats['detection_rate'] = (stats['total_detections'] / stats['total_files'] * 100) if stats['total_files'] > 0 else 0
-        
-        # Bersihkan list yang tidak diperlukan untuk output
-        del stats['decrypt_times']
-        del stats['save_times']
-        del stats['confidence_values']
-    
-    return client_stats
\ No newline at end of file
+    client_stats = {}
+    for row in rows:
+        client_stats[row['client_ip']] = {
+            'total_files': row['total_files'],
+            'total_detections': row['total_detections'],
+            'avg_decrypt_time': row['avg_decrypt_time'] or 0,
+            'avg_save_time': row['avg_save_time'] or 0,
+            'avg_confidence': row['avg_confidence'] or 0,
+            'detection_rate': (row['total_detections'] / row['total_files'] * 100) if row['total_files'] > 0 else 0
+        }
+    
+    return client_stats
@@ -0,0 +1,187 @@
+"""
+Metrik live server JagaPadi: counter, gauge dan histogram latensi in-process.
+
+Pencatatan dibuat ringan untuk jalur panas: setiap thread diberi salah satu dari
+JUMLAH_SHARD shard secara bergiliran, sehingga lock per shard hampir tidak pernah
+diperebutkan dan memori tetap terbatas walaupun thread koneksi datang dan pergi.
+Metrik bisa diekspos dalam format teks Prometheus lewat HTTP lokal opsional.
+"""
+import bisect
+import itertools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Batas bucket histogram latensi (detik), gaya Prometheus
+BUCKET_LATENSI = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                  1.0, 2.5, 5.0, 10.0, 30.0)
+
+JUMLAH_SHARD = 16
+
+_registry = []
+_registry_lock = threading.Lock()
+
+# Nomor shard per thread, dibagikan bergiliran saat thread pertama kali mencatat
+_lokal = threading.local()
+_giliran = itertools.count()
+
+def _indeks_shard():
+    indeks = getattr(_lokal, 'indeks', None)
+    if indeks is None:
+        indeks = _lokal.indeks = next(_giliran) % JUMLAH_SHARD
+    return indeks
+
+class _Sharded:
+    """Basis metrik dengan JUMLAH_SHARD shard state, masing-masing dengan lock sendiri"""
+
+    def __init__(self, nama, deskripsi):
+        self.nama = nama
+        self.deskripsi = deskripsi
+        self._shards = [self._shard_baru() for _ in range(JUMLAH_SHARD)]
+        self._locks = [threading.Lock() for _ in range(JUMLAH_SHARD)]
+        with _registry_lock:
+            _registry.append(self)
+
+    def _shard_baru(self):
+        raise NotImplementedError
+
+    def _semua_shard(self):
+        salinan = []
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                salinan.append(list(shard))
+        return salinan
+
+class Counter(_Sharded):
+    """Counter yang hanya bertambah"""
+    tipe = 'counter'
+
+    def _shard_baru(self):
+        return [0]
+
+    def tambah(self, nilai=1):
+        indeks = _indeks_shard()
+        with self._locks[indeks]:
+            self._shards[indeks][0] += nilai
+
+    def nilai(self):
+        return sum(shard[0] for shard in self._semua_shard())
+
+    def baris_prometheus(self):
+        return [f"{self.nama} {self.nilai()}"]
+
+class Gauge(Counter):
+    """Nilai yang bisa naik turun (misalnya koneksi aktif)"""
+    tipe = 'gauge'
+
+    def kurang(self, nilai=1):
+        self.tambah(-nilai)
+
+class Histogram(_Sharded):
+    """Histogram bucket tetap; kuantil diestimasi dengan interpolasi linear di dalam bucket"""
+    tipe = 'histogram'
+
+    def __init__(self, nama, deskripsi, bucket=BUCKET_LATENSI):
+        self.bucket = tuple(bucket)
+        super().__init__(nama, deskripsi)
+
+    def _shard_baru(self):
+        # [hitungan per bucket..., hitungan +Inf, jumlah, total]
+        return [0] * (len(self.bucket) + 3)
+
+    def catat(self, nilai):
+        posisi = bisect.bisect_left(self.bucket, nilai)
+        indeks = _indeks_shard()
+        with self._locks[indeks]:
+            shard = self._shards[indeks]
+            shard[posisi] += 1
+            shard[-2] += 1
+            shard[-1] += nilai
+
+    def _gabung(self):
+        total = [0] * (len(self.bucket) + 3)
+        for shard in self._semua_shard():
+            for i, nilai in enumerate(shard):
+                total[i] += nilai
+        return total
+
+    def ringkasan(self):
+        """dict jumlah, rata-rata, p50, p95, p99"""
+        data = self._gabung()
+        jumlah = data[-2]
+        hasil = {'jumlah': jumlah, 'rata': data[-1] / jumlah if jumlah else 0.0}
+        for q in (0.50, 0.95, 0.99):
+            hasil[f'p{int(q * 100)}'] = self._kuantil(data, q)
+        return hasil
+
+    def _kuantil(self, data, q):
+        jumlah = data[-2]
+        if jumlah == 0:
+            return 0.0
+        target = q * jumlah
+        kumulatif = 0
+        batas_bawah = 0.0
+        for i, batas in enumerate(self.bucket):
+            if kumulatif + data[i] >= target and data[i]:
+                return batas_bawah + (batas - batas_bawah) * (target - kumulatif) / data[i]
+            kumulatif += data[i]
+            batas_bawah = batas
+        return self.bucket[-1]  # Di atas bucket terbesar
+
+    def baris_prometheus(self):
+        data = self._gabung()
+        baris = []
+        kumulatif = 0
+        for i, batas in enumerate(self.bucket):
+            kumulatif += data[i]
+            baris.append(f'{self.nama}_bucket{{le="{batas}"}} {kumulatif}')
+        kumulatif += data[len(self.bucket)]
+        baris.append(f'{self.nama}_bucket{{le="+Inf"}} {kumulatif}')
+        baris.append(f"{self.nama}_sum {data[-1]}")
+        baris.append(f"{self.nama}_count {data[-2]}")
+        return baris
+
+def format_prometheus():
+    """Semua metrik terdaftar dalam format teks Prometheus"""
+    with _registry_lock:
+        daftar = list(_registry)
+    baris = []
+    for metrik in daftar:
+        baris.append(f"# HELP {metrik.nama} {metrik.deskripsi}")
+        baris.append(f"# TYPE {metrik.nama} {metrik.tipe}")
+        baris.extend(metrik.baris_prometheus())
+    return "\n".join(baris) + "\n"
+
+def ringkasan_teks():
+    """Ringkasan metrik untuk perintah 'stats' di terminal"""
+    with _registry_lock:
+        daftar = list(_registry)
+    baris = []
+    for metrik in daftar:
+        if isinstance(metrik, Histogram):
+            r = metrik.ringkasan()
+            baris.append(f"{metrik.nama:<40} n={r['jumlah']:<7} rata={r['rata']:.4f}s p50={r['p50']:.4f}s p95={r['p95']:.4f}s p99={r['p99']:.4f}s")
+        else:
+            baris.append(f"{metrik.nama:<40} {metrik.nilai()}")
+    return "\n".join(baris)
+
+class _HandlerMetrik(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = format_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Jangan banjiri terminal server dengan log scrape
+
+def mulai_server_metrik(host, port):
+    """Jalankan endpoint /metrics di thread daemon. Kembalikan objek server (untuk shutdown)"""
+    server = ThreadingHTTPServer((host, port), _HandlerMetrik)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrik", daemon=True).start()
+    return server
@@ -0,0 +1,112 @@
+"""
+Tahap persistensi di background untuk server JagaPadi.
+
+Penulisan ke disk (gambar asli, hasil deteksi, file clipper, cache disk) dimasukkan ke
+antrian terbatas dan dikerjakan oleh thread penulis setelah respons dikirim ke client,
+sehingga latensi disk (kartu SD, NFS) tidak menambah latensi per gambar. Jika antrian
+penuh, tugas dibuang dan dihitung alih-alih memblokir jalur permintaan; pembuangan
+dilaporkan paling sering sekali per INTERVAL_LAPORAN_BUANG agar log tidak banjir.
+"""
+import time
+import queue
+import threading
+
+_SELESAI = object()  # Penanda berhenti untuk thread penulis
+INTERVAL_LAPORAN_BUANG = 10  # detik antar baris log "tugas dibuang" saat antrian terus penuh
+
+class PenulisArsip:
+    """Antrian tugas tulis terbatas + thread penulis dengan flush saat shutdown"""
+
+    def __init__(self, antrian_maks=64, jumlah_thread=1):
+        self.antrian = queue.Queue(maxsize=antrian_maks)
+        self.lock = threading.Lock()
+        self.berhenti = False
+
+        self.diterima = 0
+        self.ditulis = 0
+        self.dibuang = 0
+        self.gagal = 0
+        self.kedalaman_maks = 0
+        self._buang_belum_dilaporkan = 0
+        self._laporan_buang_terakhir = None
+
+        self.threads = [
+            threading.Thread(target=self._loop, name=f"arsip-{i}", daemon=True)
+            for i in range(jumlah_thread)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def kirim(self, fungsi, *args):
+        """
+        Masukkan satu tugas tulis ke antrian tanpa menunggu.
+
+        Returns:
+            bool: False jika tugas dibuang (antrian penuh atau penulis sudah dihentikan)
+        """
+        with self.lock:
+            if self.berhenti:
+                self.dibuang += 1
+                return False
+            try:
+                self.antrian.put_nowait((fungsi, args))
+            except queue.Full:
+                self.dibuang += 1
+                jumlah = self._catat_buang()
+            else:
+                self.diterima += 1
+                self.kedalaman_maks = max(self.kedalaman_maks, self.antrian.qsize())
+                return True
+        if jumlah:
+            print(f"[!] Antrian arsip penuh, {jumlah} tugas dibuang sejak laporan terakhir "
+                  f"(terakhir: {getattr(fungsi, '__name__', fungsi)})")
+        return False
+
+    def _catat_buang(self):
+        """Dipanggil dengan lock. Kembalikan jumlah buangan yang perlu dilaporkan sekarang (0 = belum)"""
+        self._buang_belum_dilaporkan += 1
+        sekarang = time.monotonic()
+        if self._laporan_buang_terakhir is not None and \
+                sekarang - self._laporan_buang_terakhir < INTERVAL_LAPORAN_BUANG:
+            return 0
+        self._laporan_buang_terakhir = sekarang
+        jumlah, self._buang_belum_dilaporkan = self._buang_belum_dilaporkan, 0
+        return jumlah
+
+    def _loop(self):
+        while True:
+            tugas = self.antrian.get()
+            if tugas is _SELESAI:
+                return
+            fungsi, args = tugas
+            try:
+                fungsi(*args)
+                with self.lock:
+                    self.ditulis += 1
+            except Exception as e:
+                with self.lock:
+                    self.gagal += 1
+                print(f"[!] Gagal menulis arsip ({getattr(fungsi, '__name__', fungsi)}): {e}")
+
+    def hentikan(self):
+        """Tolak tugas baru, tulis semua tugas yang tersisa di antrian, lalu hentikan thread"""
+        with self.lock:
+            if self.berhenti:
+                return
+            self.berhenti = True
+        for _ in self.threads:
+            self.antrian.put(_SELESAI)  # Masuk setelah semua tugas tertunda (FIFO)
+        for thread in self.threads:
+            thread.join()
+
+    def statistik(self):
+        """Kedalaman antrian dan jumlah tugas yang ditulis/dibuang/gagal"""
+        with self.lock:
+            return {
+                'kedalaman': self.antrian.qsize(),
+                'kedalaman_maks': self.kedalaman_maks,
+                'diterima': self.diterima,
+                'ditulis': self.ditulis,
+                'dibuang': self.dibuang,
+                'gagal': self.gagal
+            }
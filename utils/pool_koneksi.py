@@ -0,0 +1,187 @@
+"""
+Pool koneksi terautentikasi ke server AI untuk client JagaPadi.
+
+Setiap upload meminjam satu koneksi yang sudah lolos AUTH, sehingga beberapa upload
+dari Pi yang sama (beberapa tab browser, thread Flask) berjalan paralel tanpa frame
+bercampur di satu socket dan tanpa biaya connect + AUTH per permintaan. Koneksi diperiksa
+sebelum dipinjamkan; thread perawat memeriksa koneksi idle secara berkala dan membuka
+ulang (AUTH ulang) koneksi yang sudah diputus server.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+class PoolKoneksi:
+    """
+    Pool koneksi dengan ukuran maksimum tetap.
+
+    `buat` adalah callable tanpa argumen yang mengembalikan koneksi baru yang sudah
+    terautentikasi (raise jika gagal). Koneksi harus punya method sehat() dan tutup().
+    """
+
+    def __init__(self, buat, ukuran, interval_cek=30.0):
+        self._buat = buat
+        self.ukuran = ukuran
+        self.interval_cek = interval_cek
+
+        self._kondisi = threading.Condition()
+        self._bebas = []    # Koneksi idle (LIFO: yang terakhir dipakai paling mungkin masih hidup)
+        self._jumlah = 0    # Koneksi hidup + yang sedang dibuat (idle + dipinjam)
+        self._ditutup = False
+
+        self.dibuat = 0
+        self.dibuang = 0
+        self.dipinjam = 0
+        self.menunggu = 0
+
+        self._perawat = threading.Thread(target=self._rawat, name="pool-perawat", daemon=True)
+        self._perawat.start()
+
+    def tambah(self, koneksi):
+        """Masukkan koneksi yang sudah dibuka di luar pool (mis. koneksi uji saat connect)"""
+        with self._kondisi:
+            if self._ditutup or self._jumlah >= self.ukuran:
+                koneksi.tutup()
+                return
+            self._jumlah += 1
+            self.dibuat += 1
+            self._bebas.append(koneksi)
+            self._kondisi.notify()
+
+    def isi(self):
+        """Buka koneksi sampai pool penuh; kegagalan dicetak dan dicoba lagi oleh perawat"""
+        while True:
+            with self._kondisi:
+                if self._ditutup or self._jumlah >= self.ukuran:
+                    return
+                self._jumlah += 1
+            koneksi = self._buka()
+            if koneksi is None:
+                return
+            self._kembalikan(koneksi)
+
+    @contextmanager
+    def pinjam(self, timeout=None):
+        """
+        Pinjam satu koneksi selama blok `with`. Jika blok melempar exception, status
+        protokol koneksi tidak lagi diketahui sehingga koneksi ditutup, bukan dikembalikan.
+
+        Raises:
+            TimeoutError: tidak ada koneksi bebas dalam `timeout` detik
+            ConnectionError: pool sudah ditutup
+        """
+        koneksi = self._ambil(timeout)
+        try:
+            yield koneksi
+        except BaseException:
+            self._buang(koneksi)
+            raise
+        self._kembalikan(koneksi)
+
+    def tutup(self):
+        """Tutup semua koneksi idle; koneksi yang sedang dipinjam ditutup saat dikembalikan"""
+        with self._kondisi:
+            self._ditutup = True
+            bebas, self._bebas = self._bebas, []
+            self._jumlah -= len(bebas)
+            self._kondisi.notify_all()
+        for koneksi in bebas:
+            koneksi.tutup()
+
+    def statistik(self):
+        with self._kondisi:
+            return {
+                'ukuran': self.ukuran,
+                'terbuka': self._jumlah,
+                'bebas': len(self._bebas),
+                'dibuat': self.dibuat,
+                'dibuang': self.dibuang,
+                'dipinjam': self.dipinjam,
+                'menunggu': self.menunggu
+            }
+
+    def _ambil(self, timeout):
+        batas = None if timeout is None else time.monotonic() + timeout
+        with self._kondisi:
+            while True:
+                if self._ditutup:
+                    raise ConnectionError("Pool koneksi sudah ditutup")
+                while self._bebas:
+                    koneksi = self._bebas.pop()
+                    if koneksi.sehat():
+                        self.dipinjam += 1
+                        return koneksi
+                    # Diputus server saat idle: buang, lalu coba koneksi lain atau buat baru
+                    self._jumlah -= 1
+                    self.dibuang += 1
+                    koneksi.tutup()
+                if self._jumlah < self.ukuran:
+                    self._jumlah += 1
+                    break
+                sisa = None if batas is None else batas - time.monotonic()
+                if sisa is not None and sisa <= 0:
+                    raise TimeoutError(f"Semua {self.ukuran} koneksi ke server sedang dipakai")
+                self.menunggu += 1
+                self._kondisi.wait(sisa)
+
+        # Connect + AUTH di luar lock agar peminjam lain tidak ikut menunggu
+        try:
+            koneksi = self._buat()
+        except BaseException:
+            with self._kondisi:
+                self._jumlah -= 1
+                self._kondisi.notify()
+            raise
+        with self._kondisi:
+            self.dibuat += 1
+            self.dipinjam += 1
+        return koneksi
+
+    def _kembalikan(self, koneksi):
+        with self._kondisi:
+            if not self._ditutup:
+                self._bebas.append(koneksi)
+                self._kondisi.notify()
+                return
+            self._jumlah -= 1
+        koneksi.tutup()
+
+    def _buang(self, koneksi):
+        koneksi.tutup()
+        with self._kondisi:
+            self._jumlah -= 1
+            self.dibuang += 1
+            self._kondisi.notify()
+
+    def _buka(self):
+        """Buat satu koneksi untuk slot yang sudah dipesan (_jumlah sudah ditambah)"""
+        try:
+            koneksi = self._buat()
+        except Exception as e:
+            with self._kondisi:
+                self._jumlah -= 1
+                self._kondisi.notify()
+            print(f"[!] Pool koneksi: gagal membuka koneksi ke server: {e}")
+            return None
+        with self._kondisi:
+            self.dibuat += 1
+        return koneksi
+
+    def _rawat(self):
+        """Periksa koneksi idle secara berkala dan buka ulang yang sudah putus"""
+        while True:
+            time.sleep(self.interval_cek)
+            with self._kondisi:
+                if self._ditutup:
+                    return
+                putus = [k for k in self._bebas if not k.sehat()]
+                for koneksi in putus:
+                    self._bebas.remove(koneksi)
+                    self._jumlah -= 1
+                    self.dibuang += 1
+            for koneksi in putus:
+                koneksi.tutup()
+            if putus:
+                print(f"[!] Pool koneksi: {len(putus)} koneksi idle terputus, membuka ulang")
+            # Juga mengisi slot yang gagal dibuka sebelumnya (server sempat tidak terjangkau)
+            self.isi()
@@ -0,0 +1,124 @@
+"""
+Penyimpanan riwayat (history) client JagaPadi: ring buffer di memori + log JSONL append-only.
+
+Setiap item baru ditambahkan ke deque berukuran `retensi` dan ditulis sebagai satu baris
+di akhir file, sehingga biaya per upload tetap O(1) berapa pun panjang riwayatnya.
+Pembacaan (/api/history, paginasi) dilayani dari memori tanpa menyentuh disk. File log
+dipadatkan (ditulis ulang berisi `retensi` item terakhir) hanya setelah jumlah barisnya
+melewati `retensi` x FAKTOR_KOMPAKSI. File JSON lama (list) diimpor otomatis satu kali.
+"""
+import os
+import json
+import threading
+from collections import deque
+from itertools import islice
+
+FAKTOR_KOMPAKSI = 2
+
+class PenyimpanRiwayat:
+    """Riwayat item (dict) dengan retensi tetap; aman dipakai dari banyak thread"""
+
+    def __init__(self, path, retensi=5000, path_lama=None):
+        self.path = str(path)
+        self.retensi = retensi
+        self.lock = threading.Lock()
+        self.items = deque(maxlen=retensi)
+        self.versi = 0  # Naik setiap riwayat berubah (dasar ETag /api/history)
+        # Acak per proses: versi mulai lagi dari 0 setelah restart, ETag lama tidak boleh cocok
+        self.token = os.urandom(4).hex()
+
+        baru = not os.path.exists(self.path)
+        self.jumlah_baris, rusak = self._muat()
+        if rusak:
+            # Tanpa ini, item berikutnya di-append ke sisa baris terpotong dan ikut rusak
+            print(f"[!] Baris rusak di {os.path.basename(self.path)} dibuang, riwayat ditulis ulang")
+            self._tulis_ulang()
+        if baru and path_lama and os.path.exists(path_lama):
+            self._impor_lama(str(path_lama))
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def tambah(self, item):
+        """Tambahkan satu item di akhir riwayat (memori + satu baris di log)"""
+        baris = json.dumps(item, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.items.append(item)
+            self.versi += 1
+            self._file.write(baris)
+            self._file.flush()
+            self.jumlah_baris += 1
+            if self.jumlah_baris > self.retensi * FAKTOR_KOMPAKSI:
+                self._kompaksi()
+
+    def semua(self):
+        with self.lock:
+            return list(self.items)
+
+    def halaman(self, offset=0, limit=50):
+        """
+        Satu halaman riwayat, dihitung dari item terbaru.
+
+        Returns:
+            tuple: (list item urut kronologis, total item yang tersimpan)
+        """
+        with self.lock:
+            total = len(self.items)
+            terbaru = list(islice(reversed(self.items), offset, offset + limit))
+        terbaru.reverse()
+        return terbaru, total
+
+    def hapus(self):
+        """Kosongkan riwayat di memori dan di disk"""
+        with self.lock:
+            self.items.clear()
+            self.versi += 1
+            self._file.close()
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self.jumlah_baris = 0
+
+    def _muat(self):
+        """
+        Baca log ke ring buffer; baris rusak (mis. terpotong saat listrik mati) dilewati.
+
+        Returns:
+            tuple: (jumlah baris, ada baris rusak atau file tidak diakhiri newline)
+        """
+        if not os.path.exists(self.path):
+            return 0, False
+        jumlah = 0
+        rusak = False
+        with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+            for baris in f:
+                jumlah += 1
+                if not baris.endswith("\n"):
+                    rusak = True
+                try:
+                    self.items.append(json.loads(baris))
+                except ValueError:
+                    rusak = True
+        return jumlah, rusak
+
+    def _impor_lama(self, path_lama):
+        try:
+            with open(path_lama, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[!] Gagal mengimpor riwayat lama {path_lama}: {e}")
+            return
+        self.items.extend(data)
+        self._tulis_ulang()
+        print(f"[+] {len(self.items)} item riwayat diimpor dari {os.path.basename(path_lama)}")
+
+    def _tulis_ulang(self):
+        """Tulis isi ring buffer ke file sementara lalu ganti file log secara atomik"""
+        sementara = self.path + ".tmp"
+        with open(sementara, 'w', encoding='utf-8') as f:
+            for item in self.items:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        os.replace(sementara, self.path)
+        self.jumlah_baris = len(self.items)
+
+    def _kompaksi(self):
+        # Dipanggil dengan lock; file append lama ditutup karena inode-nya diganti
+        self._file.close()
+        self._tulis_ulang()
+        self._file = open(self.path, 'a', encoding='utf-8')
@@ -0,0 +1,120 @@
+"""
+Transport berbingkai (framed) yang dipakai bersama oleh client dan server JagaPadi.
+
+Penerimaan langsung ke bytearray yang dialokasikan sekali (recv_into + memoryview),
+pengiriman beberapa bagian sekaligus dengan sendmsg (scatter-gather) tanpa
+menggabungkan bytes terlebih dahulu.
+"""
+import socket
+import struct
+
+# Ukuran buffer kernel socket (0/None = pakai default OS)
+UKURAN_SO_RCVBUF = 4 * 1024 * 1024
+UKURAN_SO_SNDBUF = 4 * 1024 * 1024
+
+# Batas jumlah buffer per panggilan sendmsg (IOV_MAX Linux = 1024)
+MAKS_IOV = 64
+
+# Format header protokol
+HEADER_V1 = struct.Struct('>II')     # panjang nama file, panjang data
+PANJANG = struct.Struct('>I')        # prefix panjang (hasil v1, payload AUTH, TIMING)
+FRAME_V2 = struct.Struct('>4sII')    # tag, request_id, panjang payload
+
+def atur_buffer_socket(sock, rcvbuf=UKURAN_SO_RCVBUF, sndbuf=UKURAN_SO_SNDBUF):
+    """
+    Atur ukuran buffer kernel socket. Untuk socket server panggil sebelum listen()
+    agar socket hasil accept() mewarisi ukuran yang sama.
+    """
+    try:
+        if rcvbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        if sndbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf)
+    except OSError as e:
+        print(f"[!] Gagal mengatur buffer socket: {e}")
+
+def atur_keepalive(sock, idle=30, interval=10, jumlah=3):
+    """
+    Aktifkan TCP keepalive agar koneksi idle yang putus (NAT/firewall, server mati
+    tanpa FIN) terdeteksi: probe pertama setelah `idle` detik, lalu tiap `interval`
+    detik, koneksi dianggap putus setelah `jumlah` probe tidak terjawab.
+    Opsi per-socket hanya diatur bila tersedia di OS.
+    """
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        for opsi, nilai in (('TCP_KEEPIDLE', idle), ('TCP_KEEPINTVL', interval), ('TCP_KEEPCNT', jumlah)):
+            if hasattr(socket, opsi):
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, opsi), nilai)
+    except OSError as e:
+        print(f"[!] Gagal mengatur keepalive socket: {e}")
+
+def terima_tepat(sock, size, should_stop=None):
+    """
+    Terima tepat `size` byte ke satu bytearray yang dialokasikan sekali.
+
+    Args:
+        sock: socket sumber
+        size: jumlah byte yang harus diterima
+        should_stop: callable opsional; bila diberikan, socket.timeout tidak dianggap
+            error melainkan kesempatan untuk mengecek apakah penerimaan harus dihentikan
+
+    Returns:
+        bytearray: data yang diterima
+
+    Raises:
+        ConnectionError: koneksi ditutup atau should_stop() bernilai True
+    """
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    diterima = 0
+    while diterima < size:
+        try:
+            n = sock.recv_into(view[diterima:], size - diterima)
+        except socket.timeout:
+            if should_stop is None:
+                raise
+            if should_stop():
+                raise ConnectionError("Penerimaan dihentikan")
+            continue
+        if n == 0:
+            raise ConnectionError("Koneksi terputus")
+        diterima += n
+    return buffer
+
+def kirim_bagian(sock, *parts):
+    """
+    Kirim beberapa buffer secara berurutan tanpa menggabungkannya.
+    Memakai sendmsg (scatter-gather) bila tersedia, fallback ke sendall per bagian.
+    """
+    if not hasattr(sock, 'sendmsg'):
+        # Windows tidak punya sendmsg
+        for part in parts:
+            sock.sendall(part)
+        return
+
+    views = [memoryview(part).cast('B') for part in parts if len(part)]
+    while views:
+        terkirim = sock.sendmsg(views[:MAKS_IOV])
+        # Majukan daftar buffer sesuai jumlah byte yang sudah terkirim
+        while terkirim:
+            if terkirim >= len(views[0]):
+                terkirim -= len(views[0])
+                views.pop(0)
+            else:
+                views[0] = views[0][terkirim:]
+                terkirim = 0
+
+def kirim_frame(sock, tag, request_id, *payload):
+    """Kirim satu frame protokol v2 (header + bagian-bagian payload)"""
+    panjang = sum(len(part) for part in payload)
+    kirim_bagian(sock, FRAME_V2.pack(tag, request_id, panjang), *payload)
+
+def terima_frame(sock, should_stop=None):
+    """
+    Terima satu frame protokol v2.
+
+    Returns:
+        tuple: (tag, request_id, payload bytearray)
+    """
+    tag, request_id, panjang = FRAME_V2.unpack(terima_tepat(sock, FRAME_V2.size, should_stop))
+    return tag, request_id, terima_tepat(sock, panjang, should_stop)